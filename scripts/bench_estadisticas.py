@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark: filtros por período en las consultas de estadísticas sobre "Cuota".
+
+Crea un esquema aparte (bench_estadisticas) con una copia de la estructura de "Cuota",
+lo llena con N cuotas sintéticas (1M por defecto) y compara, para cada endpoint de
+estadísticas, la consulta vieja (EXTRACT(MONTH/YEAR FROM ...)) contra la nueva
+(rango semiabierto [inicio, fin) de utils/periodo.py), primero sin índices y después
+con los índices de scripts/migrations/003_cuota_indices_periodo.sql.
+
+Por cada caso imprime el nodo principal del plan (EXPLAIN ANALYZE) y la mediana de latencia.
+No toca los datos reales; el esquema se borra al terminar (salvo --conservar).
+
+    python scripts/bench_estadisticas.py --cuotas 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from datetime import date
+
+import asyncpg
+from dotenv import load_dotenv
+
+env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
+load_dotenv(env_path)
+
+ESQUEMA = "bench_estadisticas"
+
+SEED = '''
+    INSERT INTO "Cuota" (
+        "idCuota", dni, pagada, monto, "fechaComienzo", "fechaFin", mes,
+        "nombreTrabajo", "nombreSuscripcion", titular, "fechaDePago", "metodoDePago", periodo
+    )
+    SELECT
+        g,
+        (30000000 + g % $2)::text,
+        x.pagada,
+        round((20000 + random() * 15000)::numeric, 2),
+        x.comienzo,
+        x.comienzo + 29,
+        to_char(x.comienzo, 'FMMonth'),
+        'Musculación',
+        '3 días a la semana',
+        CASE WHEN g % 5 = 0 THEN 'Administración' ELSE 'Empleado ' || (g % 5) END,
+        CASE WHEN x.pagada THEN x.comienzo + (random() * 20)::int END,
+        CASE WHEN x.pagada THEN (CASE WHEN g % 2 = 0 THEN 'Efectivo' ELSE 'Transferencia' END) END,
+        date_trunc('month', x.comienzo)::date
+    FROM generate_series(1, $1) g,
+    LATERAL (
+        SELECT DATE '2016-01-01' + (g % 3650) AS comienzo, random() < 0.85 AS pagada
+    ) x
+'''
+
+INDICES = [
+    'CREATE INDEX "idx_cuota_pagada_fechaDePago" ON "Cuota" (pagada, "fechaDePago")',
+    'CREATE INDEX "idx_cuota_dni_pagada" ON "Cuota" (dni, pagada)',
+    'CREATE INDEX "idx_cuota_fechaComienzo" ON "Cuota" ("fechaComienzo")',
+]
+
+RECAUDACION = '''
+    SELECT titular, SUM(monto),
+        SUM(CASE WHEN "metodoDePago" ILIKE '%efectivo%' THEN monto ELSE 0 END),
+        SUM(CASE WHEN "metodoDePago" ILIKE '%transferencia%' THEN monto ELSE 0 END)
+    FROM "Cuota"
+    WHERE pagada = true AND {filtro}
+    GROUP BY titular
+'''
+
+# (endpoint, consulta vieja, consulta nueva, parámetros viejos, parámetros nuevos)
+def casos(mes: int, anio: int, dnis: list):
+    inicio = date(anio, mes, 1)
+    fin = date(anio + (mes == 12), mes % 12 + 1, 1)
+    seis_meses = date(anio - (mes <= 6), (mes - 7) % 12 + 1, 1)
+    return [
+        (
+            "/admin/recaudacion",
+            RECAUDACION.format(filtro='EXTRACT(MONTH FROM "fechaDePago") = $1 AND EXTRACT(YEAR FROM "fechaDePago") = $2'),
+            RECAUDACION.format(filtro='"fechaDePago" >= $1 AND "fechaDePago" < $2'),
+            (mes, anio), (inicio, fin),
+        ),
+        (
+            "/admin/rendimiento-staff (recaudado)",
+            '''SELECT titular, SUM(monto) FROM "Cuota"
+               WHERE pagada = TRUE AND EXTRACT(MONTH FROM "fechaDePago") = $1
+                 AND EXTRACT(YEAR FROM "fechaDePago") = $2 AND titular = ANY($3::text[])
+               GROUP BY titular''',
+            '''SELECT titular, SUM(monto) FROM "Cuota"
+               WHERE pagada = TRUE AND "fechaDePago" >= $1 AND "fechaDePago" < $2
+                 AND titular = ANY($3::text[])
+               GROUP BY titular''',
+            (mes, anio, ["Empleado 1", "Empleado 2"]), (inicio, fin, ["Empleado 1", "Empleado 2"]),
+        ),
+        (
+            "/admin/rendimiento-staff (pendientes)",
+            'SELECT COUNT(*) FROM "Cuota" WHERE pagada = FALSE AND dni = ANY($1::text[])',
+            'SELECT COUNT(*) FROM "Cuota" WHERE pagada = FALSE AND dni = ANY($1::text[])',
+            (dnis,), (dnis,),
+        ),
+        (
+            "/admin/turnos-mensual",
+            '''SELECT EXTRACT(YEAR FROM "fechaComienzo")::int, EXTRACT(MONTH FROM "fechaComienzo")::int, COUNT(DISTINCT dni)
+               FROM "Cuota" WHERE "fechaComienzo" >= $1 GROUP BY 1, 2''',
+            '''SELECT EXTRACT(YEAR FROM "fechaComienzo")::int, EXTRACT(MONTH FROM "fechaComienzo")::int, COUNT(DISTINCT dni)
+               FROM "Cuota" WHERE "fechaComienzo" >= $1 AND "fechaComienzo" < $2 GROUP BY 1, 2''',
+            (seis_meses,), (seis_meses, fin),
+        ),
+    ]
+
+def nodos(plan: dict) -> str:
+    """Resume el plan como 'Nodo(indice) > Hijo ...' para ver si aparece Seq Scan o Index Scan."""
+    nombre = plan["Node Type"]
+    if "Index Name" in plan:
+        nombre += f'({plan["Index Name"]})'
+    hijos = [nodos(h) for h in plan.get("Plans", [])]
+    return nombre + (f" > {' + '.join(hijos)}" if hijos else "")
+
+async def medir(conn, query: str, params: tuple, repeticiones: int):
+    explain = await conn.fetchval(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}", *params)
+    plan = json.loads(explain)[0]["Plan"]
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        await conn.fetch(query, *params)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return nodos(plan), statistics.median(tiempos)
+
+async def correr_fase(conn, nombre: str, lista_casos, repeticiones: int):
+    print(f"\n=== {nombre} ===")
+    for endpoint, vieja, nueva, p_vieja, p_nueva in lista_casos:
+        plan_v, ms_v = await medir(conn, vieja, p_vieja, repeticiones)
+        plan_n, ms_n = await medir(conn, nueva, p_nueva, repeticiones)
+        print(f"{endpoint}")
+        print(f"    EXTRACT : {ms_v:9.1f}ms  {plan_v}")
+        print(f"    rango   : {ms_n:9.1f}ms  {plan_n}")
+
+async def main(args):
+    dsn = args.dsn or os.getenv("DATABASE_URL")
+    if not dsn:
+        print("DATABASE_URL no encontrado en .env (o usar --dsn)")
+        return
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute(f'DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE; CREATE SCHEMA {ESQUEMA}')
+        # Misma estructura que "Cuota" pero sin defaults, FKs, índices ni triggers del esquema real
+        await conn.execute(f'CREATE TABLE {ESQUEMA}."Cuota" (LIKE public."Cuota")')
+        await conn.execute(f'SET search_path TO {ESQUEMA}')
+
+        print(f"Generando {args.cuotas} cuotas sintéticas ({args.alumnos} alumnos)...")
+        inicio = time.perf_counter()
+        await conn.execute(SEED, args.cuotas, args.alumnos)
+        await conn.execute('ANALYZE "Cuota"')
+        print(f"Listo en {time.perf_counter() - inicio:.1f}s")
+
+        dnis = [str(30000000 + i) for i in range(0, args.alumnos, max(1, args.alumnos // 200))]
+        lista_casos = casos(args.mes, args.anio, dnis)
+
+        await correr_fase(conn, "Sin índices", lista_casos, args.repeticiones)
+
+        for ddl in INDICES:
+            await conn.execute(ddl)
+        await conn.execute('ANALYZE "Cuota"')
+        await correr_fase(conn, "Con índices de 003_cuota_indices_periodo.sql", lista_casos, args.repeticiones)
+    finally:
+        if not args.conservar:
+            await conn.execute(f'DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE')
+        await conn.close()
+
+if __name__ == "__main__":
+    hoy = date.today()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", help="DSN de Postgres (por defecto DATABASE_URL del .env)")
+    parser.add_argument("--cuotas", type=int, default=1_000_000)
+    parser.add_argument("--alumnos", type=int, default=20_000)
+    parser.add_argument("--mes", type=int, default=hoy.month)
+    parser.add_argument("--anio", type=int, default=2024)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--conservar", action="store_true", help="No borrar el esquema de prueba al terminar")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latencia de un endpoint no relacionado durante una ráfaga de logins.
+
+Mide p50/p95/p99 de un endpoint liviano (por defecto GET /suscripciones/) mientras
+se disparan muchos POST /auth/login en paralelo contra la API ya levantada.
+
+Para comparar ANTES y DESPUÉS del pool de hashing, correrlo contra ambas versiones
+de la API con los mismos parámetros (un solo worker de uvicorn para que se note el
+bloqueo del event loop):
+
+    uvicorn main:app --workers 1
+    python scripts/bench_login_storm.py --usuario admin --password admin123
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[idx]
+
+async def sondear(client: httpx.AsyncClient, path: str, fin: float, latencias: list):
+    """Pide el endpoint de sondeo en bucle hasta que termine la ráfaga."""
+    while time.perf_counter() < fin:
+        inicio = time.perf_counter()
+        await client.get(path)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        await asyncio.sleep(0.01)
+
+async def login(client: httpx.AsyncClient, usuario: str, password: str, estados: dict):
+    resp = await client.post("/auth/login", data={"username": usuario, "password": password})
+    estados[resp.status_code] = estados.get(resp.status_code, 0) + 1
+
+async def main(args):
+    limites = httpx.Limits(max_connections=args.logins + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limites) as client:
+        # 1. Línea base sin carga
+        base = []
+        await sondear(client, args.probe, time.perf_counter() + 3, base)
+
+        # 2. Ráfaga de logins + sondeo concurrente
+        bajo_carga = []
+        estados = {}
+        inicio = time.perf_counter()
+        sonda = asyncio.create_task(sondear(client, args.probe, inicio + args.duracion, bajo_carga))
+
+        for _ in range(args.oleadas):
+            await asyncio.gather(*[
+                login(client, args.usuario, args.password, estados) for _ in range(args.logins)
+            ])
+        await sonda
+        total = time.perf_counter() - inicio
+
+    print(f"--- Benchmark login storm contra {args.base_url} ---")
+    print(f"Logins: {args.logins * args.oleadas} en {total:.1f}s | Respuestas: {estados}")
+    for nombre, datos in (("Sin carga", base), ("Durante ráfaga", bajo_carga)):
+        if not datos:
+            continue
+        print(
+            f"{nombre:>15} {args.probe}: n={len(datos)} "
+            f"p50={statistics.median(datos):.1f}ms "
+            f"p95={percentil(datos, 95):.1f}ms "
+            f"p99={percentil(datos, 99):.1f}ms "
+            f"max={max(datos):.1f}ms"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--usuario", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--probe", default="/suscripciones/", help="Endpoint no relacionado a medir")
+    parser.add_argument("--logins", type=int, default=50, help="Logins concurrentes por oleada")
+    parser.add_argument("--oleadas", type=int, default=4)
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos de sondeo durante la ráfaga")
+    asyncio.run(main(parser.parse_args()))
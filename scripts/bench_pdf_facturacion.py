@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latencia del event loop mientras se generan reportes de facturación en PDF.
+
+Arma un reporte sintético de N filas (2.000 por defecto) y lo genera varias veces en
+paralelo de tres formas, mientras una sonda simula requests concurrentes (una cada 10 ms)
+y mide cuánto tardan en ser atendidos:
+
+    inline    reportlab directo en el event loop (como antes de utils/pdf.py)
+    hilo      asyncio.to_thread (reportlab no libera el GIL: sigue compitiendo con el loop)
+    procesos  utils/pdf.renderizar_pdf (ProcessPoolExecutor acotado)
+
+Por cada modo imprime el tiempo total de generación y p50/p95/p99/máx de la sonda.
+Usa el .env del proyecto para la configuración del pool (PDF_WORKERS, etc.).
+
+    python scripts/bench_pdf_facturacion.py --filas 2000 --reportes 4
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, time as hora, timedelta
+
+from dotenv import load_dotenv
+
+RAIZ = os.path.join(os.path.dirname(__file__), '..')
+load_dotenv(os.path.join(RAIZ, '.env'))
+sys.path.insert(0, os.path.join(RAIZ, 'src'))
+
+from utils.pdf import renderizar_pdf, shutdown_pdf_executor  # noqa: E402
+from utils.pdf_plantillas import reporte_facturacion  # noqa: E402
+
+INTERVALO_SONDA = 0.010
+
+def reporte_sintetico(filas: int) -> dict:
+    inicio = date(2025, 3, 1)
+    detalles = [
+        {
+            "idCuota": i,
+            "dni": str(30000000 + i),
+            "alumno": f"Alumno {i}",
+            "monto": round(random.uniform(20000, 35000), 2),
+            "fechaPago": inicio + timedelta(days=i % 15),
+            "horaDePago": hora(8 + i % 12, i % 60),
+            "metodoDePago": random.choice(["qr", "transferencia"]),
+            "concepto": f"Marzo - {random.choice(['2 días', '3 días', '5 días'])} a la semana",
+        }
+        for i in range(filas)
+    ]
+    return {
+        "idFacturacion": 1,
+        "fechaInicio": inicio,
+        "fechaFin": inicio + timedelta(days=14),
+        "fechaGeneracion": datetime(2025, 3, 15, 23, 30),
+        "montoTotal": sum(d["monto"] for d in detalles),
+        "cantidadCuotas": filas,
+        "titular": "Administración",
+        "detalles": detalles,
+    }
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[idx]
+
+async def sonda(fin: asyncio.Event, latencias: list):
+    """Un 'request' cada 10 ms: mide cuánto tarda el loop en atenderlo."""
+    while not fin.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(INTERVALO_SONDA)
+        latencias.append((time.perf_counter() - inicio - INTERVALO_SONDA) * 1000)
+
+async def generar(modo: str, reporte: dict) -> bytes:
+    if modo == "inline":
+        return reporte_facturacion(reporte)
+    if modo == "hilo":
+        return await asyncio.to_thread(reporte_facturacion, reporte)
+    return await renderizar_pdf(reporte_facturacion, reporte)
+
+async def medir(modo: str, reporte: dict, cantidad: int):
+    fin = asyncio.Event()
+    latencias = []
+    tarea = asyncio.create_task(sonda(fin, latencias))
+    await asyncio.sleep(0.2)
+
+    inicio = time.perf_counter()
+    pdfs = await asyncio.gather(*(generar(modo, reporte) for _ in range(cantidad)))
+    total = time.perf_counter() - inicio
+
+    fin.set()
+    await tarea
+    kb = statistics.mean(len(p) for p in pdfs) / 1024
+    print(
+        f"{modo:9s} {total:7.2f}s  ({kb:.0f} KB c/u)   sonda p50={percentil(latencias, 50):7.1f}ms "
+        f"p95={percentil(latencias, 95):7.1f}ms p99={percentil(latencias, 99):7.1f}ms máx={max(latencias):7.1f}ms"
+    )
+
+async def main(args):
+    reporte = reporte_sintetico(args.filas)
+    # Arranca los procesos antes de medir (spawn tarda en importar reportlab)
+    await renderizar_pdf(reporte_facturacion, reporte_sintetico(10))
+
+    print(f"{args.reportes} reportes de {args.filas} filas en paralelo\n")
+    for modo in args.modos:
+        await medir(modo, reporte, args.reportes)
+    shutdown_pdf_executor()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=2000)
+    parser.add_argument("--reportes", type=int, default=4, help="Reportes generados en paralelo por modo")
+    parser.add_argument("--modos", nargs="+", default=["inline", "hilo", "procesos"],
+                        choices=["inline", "hilo", "procesos"])
+    asyncio.run(main(parser.parse_args()))
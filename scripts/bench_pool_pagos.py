@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: agotamiento del pool de conexiones con llamadas lentas a Mercado Pago.
+
+Dispara muchos POST /pagos/crear-preferencia/{id_cuota} en paralelo contra la API, con la
+API de MP falsa respondiendo lento, y mientras tanto sondea un endpoint que solo consulta la
+base (por defecto GET /pagos/{id_cuota}/estado). Si los handlers retienen la conexión mientras
+esperan a MP, el sondeo se queda sin conexiones: sube su latencia y aparecen 503
+(DB_POOL_ACQUIRE_TIMEOUT). Con la conexión diferida (core/session.ConexionDiferida) el
+sondeo no debería notar la carga.
+
+    python scripts/fake_mercadopago.py --puerto 8090 --latencia 2
+    # backend con MP_API_URL=http://localhost:8090 y un solo worker de uvicorn
+    python scripts/bench_pool_pagos.py --usuario 40111222 --password secreto --cuota 123
+
+Para comparar ANTES y DESPUÉS, correrlo contra ambas versiones con los mismos parámetros.
+Con --admin-usuario/--admin-password también muestra GET /diagnostico/db al final.
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[idx]
+
+async def token(client: httpx.AsyncClient, usuario: str, password: str) -> str:
+    resp = await client.post("/auth/login", data={"username": usuario, "password": password})
+    resp.raise_for_status()
+    return resp.json()["access_token"]
+
+async def sondear(client: httpx.AsyncClient, path: str, fin: float, latencias: list, estados: dict):
+    """Pide el endpoint de sondeo en bucle hasta que termine la ráfaga."""
+    while time.perf_counter() < fin:
+        inicio = time.perf_counter()
+        resp = await client.get(path)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        estados[resp.status_code] = estados.get(resp.status_code, 0) + 1
+        await asyncio.sleep(0.05)
+
+async def preferencia(client: httpx.AsyncClient, path: str, headers: dict, estados: dict):
+    resp = await client.post(path, json={"monto_final": 1000.0}, headers=headers)
+    estados[resp.status_code] = estados.get(resp.status_code, 0) + 1
+
+async def main(args):
+    limites = httpx.Limits(max_connections=args.concurrencia + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120, limits=limites) as client:
+        headers = {"Authorization": f"Bearer {await token(client, args.usuario, args.password)}"}
+        sonda_path = args.probe or f"/pagos/{args.cuota}/estado"
+        pref_path = f"/pagos/crear-preferencia/{args.cuota}"
+
+        # 1. Línea base sin carga
+        base, estados_base = [], {}
+        await sondear(client, sonda_path, time.perf_counter() + 3, base, estados_base)
+
+        # 2. Ráfaga de preferencias (cada una espera a MP) + sondeo concurrente
+        bajo_carga, estados_sonda, estados_pref = [], {}, {}
+        inicio = time.perf_counter()
+        sonda = asyncio.create_task(
+            sondear(client, sonda_path, inicio + args.duracion, bajo_carga, estados_sonda)
+        )
+        pendientes = set()
+        while time.perf_counter() < inicio + args.duracion:
+            while len(pendientes) < args.concurrencia:
+                t = asyncio.create_task(preferencia(client, pref_path, headers, estados_pref))
+                pendientes.add(t)
+                t.add_done_callback(pendientes.discard)
+            await asyncio.sleep(0.05)
+        await sonda
+        if pendientes:
+            await asyncio.wait(pendientes)
+
+        metricas = None
+        if args.admin_usuario:
+            admin = {"Authorization": f"Bearer {await token(client, args.admin_usuario, args.admin_password)}"}
+            metricas = (await client.get("/diagnostico/db", headers=admin)).json()
+
+    print(f"--- Benchmark pool vs. Mercado Pago lento contra {args.base_url} ---")
+    print(f"Preferencias ({args.concurrencia} en paralelo): {estados_pref}")
+    for nombre, datos, estados in (("Sin carga", base, estados_base), ("Durante ráfaga", bajo_carga, estados_sonda)):
+        if not datos:
+            continue
+        print(
+            f"{nombre:>15} {sonda_path}: n={len(datos)} {estados} "
+            f"p50={percentil(datos, 50):.1f}ms "
+            f"p95={percentil(datos, 95):.1f}ms "
+            f"p99={percentil(datos, 99):.1f}ms "
+            f"max={max(datos):.1f}ms"
+        )
+    if metricas:
+        print(
+            f"Pool (pid {metricas['pid']}): máx={metricas['maximo']} timeouts={metricas['timeoutsAdquisicion']} "
+            f"espera p95={metricas['esperaP95Ms']:.1f}ms p99={metricas['esperaP99Ms']:.1f}ms máx={metricas['esperaMaxMs']:.1f}ms"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--usuario", required=True, help="Alumno dueño de la cuota")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--cuota", type=int, required=True, help="idCuota impaga del alumno")
+    parser.add_argument("--probe", help="Endpoint que solo consulta la base (por defecto /pagos/{cuota}/estado)")
+    parser.add_argument("--concurrencia", type=int, default=40, help="Preferencias en curso a la vez")
+    parser.add_argument("--duracion", type=float, default=15.0, help="Segundos de ráfaga")
+    parser.add_argument("--admin-usuario", help="Para leer GET /diagnostico/db al final")
+    parser.add_argument("--admin-password")
+    asyncio.run(main(parser.parse_args()))
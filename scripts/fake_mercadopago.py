@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Servidor falso de la API de Mercado Pago para probar pagos en local.
+
+Implementa lo que usa el backend (utils/mercadopago.py):
+    POST /checkout/preferences      -> crea la preferencia (guarda external_reference)
+    GET  /v1/payments/{id}          -> estado del pago
+y un atajo para simular que el alumno paga:
+    POST /_fake/pagar/{idCuota}?estado=approved&reintentos=3
+que crea el pago y dispara el webhook al backend `reintentos` veces en paralelo,
+como hace MP en los picos de principio de mes.
+
+    python scripts/fake_mercadopago.py --puerto 8090 --backend http://localhost:8000 --latencia 0.5
+    # en el .env del backend: MP_API_URL=http://localhost:8090
+"""
+
+import argparse
+import asyncio
+import itertools
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+
+app = FastAPI(title="Mercado Pago (falso)")
+
+pagos = {}
+ids = itertools.count(9_000_000_001)
+config = argparse.Namespace(backend="http://localhost:8000", latencia=0.0)
+
+@app.post("/checkout/preferences", status_code=201)
+async def crear_preferencia(request: Request):
+    datos = await request.json()
+    await asyncio.sleep(config.latencia)
+    id_pref = f"pref-{next(ids)}"
+    return {
+        "id": id_pref,
+        "external_reference": datos.get("external_reference"),
+        "init_point": f"http://localhost/checkout/{id_pref}",
+        "sandbox_init_point": f"http://localhost/sandbox/checkout/{id_pref}",
+    }
+
+@app.get("/v1/payments/{payment_id}")
+async def obtener_pago(payment_id: str):
+    await asyncio.sleep(config.latencia)
+    pago = pagos.get(payment_id)
+    if pago is None:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    return pago
+
+@app.post("/_fake/pagar/{id_cuota}")
+async def pagar(id_cuota: int, estado: str = "approved", monto: float = 0.0,
+                owner: str = "administrador", reintentos: int = 1):
+    payment_id = str(next(ids))
+    pagos[payment_id] = {
+        "id": int(payment_id),
+        "status": estado,
+        "external_reference": str(id_cuota),
+        "transaction_amount": monto,
+    }
+    url = f"{config.backend}/pagos/webhook?owner={owner}"
+    cuerpo = {"type": "payment", "data": {"id": payment_id}}
+    async with httpx.AsyncClient(timeout=10) as cliente:
+        respuestas = await asyncio.gather(
+            *(cliente.post(url, json=cuerpo) for _ in range(reintentos)),
+            return_exceptions=True
+        )
+    return {
+        "paymentId": payment_id,
+        "webhooks": [getattr(r, "status_code", repr(r)) for r in respuestas],
+    }
+
+@app.post("/_fake/pagos/{payment_id}/estado")
+async def cambiar_estado(payment_id: str, estado: str):
+    """Cambia el estado de un pago existente (ej. de 'pending' a 'approved') sin notificar."""
+    if payment_id not in pagos:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    pagos[payment_id]["status"] = estado
+    return pagos[payment_id]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--puerto", type=int, default=8090)
+    parser.add_argument("--backend", default="http://localhost:8000", help="URL base del backend (para los webhooks)")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos de demora por llamada a la API")
+    args = parser.parse_args()
+    config.backend, config.latencia = args.backend.rstrip("/"), args.latencia
+    uvicorn.run(app, host="127.0.0.1", port=args.puerto)
@@ -71,12 +71,19 @@ async def generar_cuotas():
                 nueva_fecha_fin = nueva_fecha_inicio + timedelta(days=30)
                 nombre_mes = calendar.month_name[nueva_fecha_inicio.month].capitalize()
 
-                await conn.execute('''
-                    INSERT INTO "Cuota" (dni, pagada, monto, "fechaComienzo", "fechaFin", mes, "nombreTrabajo", "nombreSuscripcion")
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                ''', dni_alumno, False, datos_alumno['precio'], nueva_fecha_inicio, nueva_fecha_fin, nombre_mes, datos_alumno['nombreTrabajo'], datos_alumno['nombreSuscripcion'])
-                
-                cuotas_generadas += 1
+                # "Cuota" está particionada por mes: la partición del período puede no existir aún
+                periodo = nueva_fecha_inicio.replace(day=1)
+                await conn.execute('SELECT cuota_crear_particion($1)', periodo)
+
+                resultado = await conn.execute('''
+                    INSERT INTO "Cuota" (dni, pagada, monto, "fechaComienzo", "fechaFin", mes, "nombreTrabajo", "nombreSuscripcion", periodo)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                    ON CONFLICT (dni, periodo) DO NOTHING
+                ''', dni_alumno, False, datos_alumno['precio'], nueva_fecha_inicio, nueva_fecha_fin, nombre_mes, datos_alumno['nombreTrabajo'], datos_alumno['nombreSuscripcion'], periodo)
+
+                # Con ON CONFLICT DO NOTHING la cuota del mes puede ya existir ("INSERT 0 0")
+                if resultado == "INSERT 0 1":
+                    cuotas_generadas += 1
 
         print(f"🎉 Proceso finalizado. Se generaron {cuotas_generadas} nuevas cuotas.")
 
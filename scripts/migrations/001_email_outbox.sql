@@ -0,0 +1,22 @@
+-- 001_email_outbox.sql
+-- Cola persistente de emails (outbox). Los servicios insertan aquí y vuelven enseguida;
+-- el sender en segundo plano (utils/email.py -> EmailOutboxSender) los envía por lotes.
+
+CREATE TABLE IF NOT EXISTS "EmailOutbox" (
+    "idEmail"          BIGSERIAL PRIMARY KEY,
+    destinatario       VARCHAR(120) NOT NULL,
+    asunto             VARCHAR(200) NOT NULL,
+    cuerpo             TEXT NOT NULL,
+    estado             VARCHAR(10) NOT NULL DEFAULT 'pendiente'
+                       CHECK (estado IN ('pendiente', 'enviando', 'enviado', 'fallido')),
+    intentos           INTEGER NOT NULL DEFAULT 0,
+    "ultimoError"      TEXT,
+    "proximoIntento"   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    "fechaCreacion"    TIMESTAMPTZ NOT NULL DEFAULT now(),
+    "fechaEnvio"       TIMESTAMPTZ
+);
+
+-- Índice parcial: el sender solo mira lo que falta enviar
+CREATE INDEX IF NOT EXISTS "idx_emailoutbox_pendientes"
+    ON "EmailOutbox" ("proximoIntento")
+    WHERE estado IN ('pendiente', 'enviando');
@@ -0,0 +1,159 @@
+-- 002_kpi_cuota_snapshot.sql
+-- Snapshot incremental de KPIs de cuotas para el dashboard (/admin/kpis).
+-- Los contadores se mantienen con triggers a nivel sentencia sobre "Cuota", así cubren
+-- todas las vías de escritura: generación masiva, pagos (webhook/manual), modificar_cuota,
+-- eliminar_cuota y los CASCADE al borrar una Persona.
+-- Reconciliación completa: SELECT kpi_cuota_reconstruir();  (o `python mantenimiento.py kpis-reconstruir`)
+
+-- Contadores por mes calendario
+--   generadas/montoGenerado -> por mes de "fechaComienzo"
+--   pagadas/montoPagado     -> por mes de "fechaDePago" (solo cuotas pagadas)
+CREATE TABLE IF NOT EXISTS "KpiCuotaMensual" (
+    anio                INTEGER NOT NULL,
+    mes                 INTEGER NOT NULL,
+    generadas           INTEGER NOT NULL DEFAULT 0,
+    "montoGenerado"     NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    pagadas             INTEGER NOT NULL DEFAULT 0,
+    "montoPagado"       NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (anio, mes)
+);
+
+-- Cuotas IMPAGAS agrupadas por fecha de vencimiento.
+-- "Vencidas a hoy" = suma de las filas con "fechaFin" < hoy (una fila por fecha de vencimiento).
+CREATE TABLE IF NOT EXISTS "KpiCuotaVencimiento" (
+    "fechaFin"          DATE PRIMARY KEY,
+    cantidad            INTEGER NOT NULL DEFAULT 0,
+    monto               NUMERIC(14, 2) NOT NULL DEFAULT 0
+);
+
+-- Aplica (signo = 1) o revierte (signo = -1) el aporte de un conjunto de cuotas a los contadores
+CREATE OR REPLACE FUNCTION kpi_cuota_aplicar(signo INTEGER, filas "Cuota"[]) RETURNS void AS $$
+BEGIN
+    IF filas IS NULL OR cardinality(filas) = 0 THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO "KpiCuotaMensual" (anio, mes, generadas, "montoGenerado")
+    SELECT
+        EXTRACT(YEAR FROM f."fechaComienzo")::INTEGER,
+        EXTRACT(MONTH FROM f."fechaComienzo")::INTEGER,
+        signo * COUNT(*),
+        signo * COALESCE(SUM(f.monto), 0)
+    FROM unnest(filas) f
+    WHERE f."fechaComienzo" IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT (anio, mes) DO UPDATE SET
+        generadas = "KpiCuotaMensual".generadas + EXCLUDED.generadas,
+        "montoGenerado" = "KpiCuotaMensual"."montoGenerado" + EXCLUDED."montoGenerado";
+
+    INSERT INTO "KpiCuotaMensual" (anio, mes, pagadas, "montoPagado")
+    SELECT
+        EXTRACT(YEAR FROM f."fechaDePago")::INTEGER,
+        EXTRACT(MONTH FROM f."fechaDePago")::INTEGER,
+        signo * COUNT(*),
+        signo * COALESCE(SUM(f.monto), 0)
+    FROM unnest(filas) f
+    WHERE f.pagada = TRUE AND f."fechaDePago" IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT (anio, mes) DO UPDATE SET
+        pagadas = "KpiCuotaMensual".pagadas + EXCLUDED.pagadas,
+        "montoPagado" = "KpiCuotaMensual"."montoPagado" + EXCLUDED."montoPagado";
+
+    INSERT INTO "KpiCuotaVencimiento" ("fechaFin", cantidad, monto)
+    SELECT
+        f."fechaFin",
+        signo * COUNT(*),
+        signo * COALESCE(SUM(f.monto), 0)
+    FROM unnest(filas) f
+    WHERE COALESCE(f.pagada, FALSE) = FALSE AND f."fechaFin" IS NOT NULL
+    GROUP BY 1
+    ON CONFLICT ("fechaFin") DO UPDATE SET
+        cantidad = "KpiCuotaVencimiento".cantidad + EXCLUDED.cantidad,
+        monto = "KpiCuotaVencimiento".monto + EXCLUDED.monto;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger a nivel sentencia: un solo UPSERT por mes aunque la generación masiva inserte miles de filas
+CREATE OR REPLACE FUNCTION kpi_cuota_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM kpi_cuota_aplicar(1, ARRAY(SELECT n::"Cuota" FROM nuevas n));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM kpi_cuota_aplicar(-1, ARRAY(SELECT v::"Cuota" FROM viejas v));
+    ELSE
+        -- Solo las filas donde cambió algo que afecta a los KPIs (ej: marcar facturado no cuenta)
+        PERFORM kpi_cuota_aplicar(-1, ARRAY(
+            SELECT v::"Cuota"
+            FROM viejas v JOIN nuevas n ON v."idCuota" = n."idCuota"
+            WHERE (v.pagada, v.monto, v."fechaComienzo", v."fechaFin", v."fechaDePago")
+                IS DISTINCT FROM (n.pagada, n.monto, n."fechaComienzo", n."fechaFin", n."fechaDePago")
+        ));
+        PERFORM kpi_cuota_aplicar(1, ARRAY(
+            SELECT n::"Cuota"
+            FROM viejas v JOIN nuevas n ON v."idCuota" = n."idCuota"
+            WHERE (v.pagada, v.monto, v."fechaComienzo", v."fechaFin", v."fechaDePago")
+                IS DISTINCT FROM (n.pagada, n.monto, n."fechaComienzo", n."fechaFin", n."fechaDePago")
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS "trg_kpi_cuota_insert" ON "Cuota";
+DROP TRIGGER IF EXISTS "trg_kpi_cuota_update" ON "Cuota";
+DROP TRIGGER IF EXISTS "trg_kpi_cuota_delete" ON "Cuota";
+
+CREATE TRIGGER "trg_kpi_cuota_insert" AFTER INSERT ON "Cuota"
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION kpi_cuota_trigger();
+
+CREATE TRIGGER "trg_kpi_cuota_update" AFTER UPDATE ON "Cuota"
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION kpi_cuota_trigger();
+
+CREATE TRIGGER "trg_kpi_cuota_delete" AFTER DELETE ON "Cuota"
+    REFERENCING OLD TABLE AS viejas
+    FOR EACH STATEMENT EXECUTE FUNCTION kpi_cuota_trigger();
+
+-- Reconstrucción completa desde "Cuota" (reconciliación). Bloquea escrituras en "Cuota" mientras corre.
+CREATE OR REPLACE FUNCTION kpi_cuota_reconstruir() RETURNS void AS $$
+BEGIN
+    LOCK TABLE "Cuota" IN SHARE MODE;
+
+    TRUNCATE "KpiCuotaMensual", "KpiCuotaVencimiento";
+
+    -- Agregados directos sobre la tabla (sin armar arrays en memoria)
+    INSERT INTO "KpiCuotaMensual" (anio, mes, generadas, "montoGenerado", pagadas, "montoPagado")
+    SELECT
+        COALESCE(g.anio, p.anio),
+        COALESCE(g.mes, p.mes),
+        COALESCE(g.cantidad, 0),
+        COALESCE(g.monto, 0),
+        COALESCE(p.cantidad, 0),
+        COALESCE(p.monto, 0)
+    FROM (
+        SELECT EXTRACT(YEAR FROM "fechaComienzo")::INTEGER AS anio,
+               EXTRACT(MONTH FROM "fechaComienzo")::INTEGER AS mes,
+               COUNT(*) AS cantidad, COALESCE(SUM(monto), 0) AS monto
+        FROM "Cuota"
+        WHERE "fechaComienzo" IS NOT NULL
+        GROUP BY 1, 2
+    ) g
+    FULL OUTER JOIN (
+        SELECT EXTRACT(YEAR FROM "fechaDePago")::INTEGER AS anio,
+               EXTRACT(MONTH FROM "fechaDePago")::INTEGER AS mes,
+               COUNT(*) AS cantidad, COALESCE(SUM(monto), 0) AS monto
+        FROM "Cuota"
+        WHERE pagada = TRUE AND "fechaDePago" IS NOT NULL
+        GROUP BY 1, 2
+    ) p ON g.anio = p.anio AND g.mes = p.mes;
+
+    INSERT INTO "KpiCuotaVencimiento" ("fechaFin", cantidad, monto)
+    SELECT "fechaFin", COUNT(*), COALESCE(SUM(monto), 0)
+    FROM "Cuota"
+    WHERE COALESCE(pagada, FALSE) = FALSE AND "fechaFin" IS NOT NULL
+    GROUP BY "fechaFin";
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT kpi_cuota_reconstruir();
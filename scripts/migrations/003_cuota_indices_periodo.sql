@@ -0,0 +1,18 @@
+-- 003_cuota_indices_periodo.sql
+-- Índices para los filtros por período de las estadísticas (utils/periodo.py).
+-- Las consultas filtran con rangos semiabiertos [inicio, fin) sobre la columna de fecha,
+-- así estos índices reemplazan los seq scan que provocaba EXTRACT(MONTH/YEAR FROM ...).
+-- CONCURRENTLY no bloquea las escrituras sobre "Cuota"; correr fuera de una transacción:
+--     psql "$DATABASE_URL" -f scripts/migrations/003_cuota_indices_periodo.sql
+
+-- Recaudación mensual y recaudado por titular (pagada = TRUE AND "fechaDePago" en rango)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_cuota_pagada_fechaDePago"
+    ON "Cuota" (pagada, "fechaDePago");
+
+-- Cuotas pendientes por alumno (rendimiento del staff, perfil del alumno)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_cuota_dni_pagada"
+    ON "Cuota" (dni, pagada);
+
+-- Gráfico de alumnos por turno (últimos meses por "fechaComienzo")
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_cuota_fechaComienzo"
+    ON "Cuota" ("fechaComienzo");
@@ -0,0 +1,11 @@
+-- 004_alumno_listado_keyset.sql
+-- Índices para el listado paginado de alumnos (GET /alumnos/paginado).
+-- Correr fuera de una transacción (CONCURRENTLY).
+
+-- Orden y cursor keyset (apellido, nombre, dni)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_persona_apellido_nombre_dni"
+    ON "Persona" (apellido, nombre, dni);
+
+-- Agregado de turno por alumno (MIN("nroGrupo") por dni)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_asiste_dni_nroGrupo"
+    ON "Asiste" (dni, "nroGrupo");
@@ -0,0 +1,105 @@
+-- 005_pertenece_ocupacion.sql
+-- Contador de ocupación por cupo (nroGrupo, dia): "Pertenece".inscritos = filas de "Asiste" de ese cupo.
+-- Lo mantienen triggers sobre "Asiste" (a nivel sentencia), así cubre todas las vías de escritura:
+-- inscripción, reemplazo de horarios, migración de nroGrupo, desactivar/eliminar alumno y los CASCADE.
+-- Verificación / reparación: `python mantenimiento.py ocupacion-verificar [--reparar]`
+
+ALTER TABLE "Pertenece" ADD COLUMN IF NOT EXISTS inscritos INTEGER NOT NULL DEFAULT 0;
+
+-- Suma `delta` inscritos a cada cupo. Bloquea primero los cupos en orden fijo para no
+-- generar deadlocks con el motor de inscripción (que también bloquea ordenado).
+CREATE OR REPLACE FUNCTION pertenece_ocupacion_aplicar(deltas JSONB) RETURNS void AS $$
+BEGIN
+    PERFORM 1
+    FROM "Pertenece" p
+    JOIN jsonb_to_recordset(deltas) AS d("nroGrupo" TEXT, dia TEXT, delta INTEGER)
+        ON p."nroGrupo" = d."nroGrupo" AND p.dia = d.dia
+    ORDER BY p."nroGrupo", p.dia
+    FOR UPDATE OF p;
+
+    UPDATE "Pertenece" p
+    SET inscritos = p.inscritos + d.delta
+    FROM jsonb_to_recordset(deltas) AS d("nroGrupo" TEXT, dia TEXT, delta INTEGER)
+    WHERE p."nroGrupo" = d."nroGrupo" AND p.dia = d.dia;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION asiste_ocupacion_trigger() RETURNS trigger AS $$
+DECLARE
+    deltas JSONB;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT jsonb_agg(x) INTO deltas FROM (
+            SELECT "nroGrupo", dia, COUNT(*) AS delta FROM nuevas GROUP BY "nroGrupo", dia
+        ) x;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT jsonb_agg(x) INTO deltas FROM (
+            SELECT "nroGrupo", dia, -COUNT(*) AS delta FROM viejas GROUP BY "nroGrupo", dia
+        ) x;
+    ELSE
+        SELECT jsonb_agg(x) INTO deltas FROM (
+            SELECT "nroGrupo", dia, SUM(delta) AS delta
+            FROM (
+                SELECT "nroGrupo", dia, 1 AS delta FROM nuevas
+                UNION ALL
+                SELECT "nroGrupo", dia, -1 AS delta FROM viejas
+            ) u
+            GROUP BY "nroGrupo", dia
+            HAVING SUM(delta) <> 0
+        ) x;
+    END IF;
+
+    IF deltas IS NOT NULL THEN
+        PERFORM pertenece_ocupacion_aplicar(deltas);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS "trg_asiste_ocupacion_insert" ON "Asiste";
+DROP TRIGGER IF EXISTS "trg_asiste_ocupacion_update" ON "Asiste";
+DROP TRIGGER IF EXISTS "trg_asiste_ocupacion_delete" ON "Asiste";
+
+CREATE TRIGGER "trg_asiste_ocupacion_insert" AFTER INSERT ON "Asiste"
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION asiste_ocupacion_trigger();
+
+CREATE TRIGGER "trg_asiste_ocupacion_update" AFTER UPDATE ON "Asiste"
+    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION asiste_ocupacion_trigger();
+
+CREATE TRIGGER "trg_asiste_ocupacion_delete" AFTER DELETE ON "Asiste"
+    REFERENCING OLD TABLE AS viejas
+    FOR EACH STATEMENT EXECUTE FUNCTION asiste_ocupacion_trigger();
+
+-- actualizar_horario_completo borra y vuelve a crear las filas de "Pertenece" con los alumnos
+-- ya cargados en "Asiste": al (re)crear un cupo se parte de la ocupación real.
+CREATE OR REPLACE FUNCTION pertenece_ocupacion_inicial() RETURNS trigger AS $$
+BEGIN
+    NEW.inscritos := (
+        SELECT COUNT(*) FROM "Asiste" a
+        WHERE a."nroGrupo" = NEW."nroGrupo" AND a.dia = NEW.dia
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS "trg_pertenece_ocupacion_inicial" ON "Pertenece";
+
+CREATE TRIGGER "trg_pertenece_ocupacion_inicial" BEFORE INSERT OR UPDATE OF "nroGrupo", dia ON "Pertenece"
+    FOR EACH ROW EXECUTE FUNCTION pertenece_ocupacion_inicial();
+
+-- Cupos cuyo contador no coincide con "Asiste"
+CREATE OR REPLACE VIEW "PerteneceOcupacionDesvio" AS
+SELECT p."nroGrupo", p.dia, p.inscritos AS registrado, COALESCE(a.cantidad, 0)::INTEGER AS real
+FROM "Pertenece" p
+LEFT JOIN (
+    SELECT "nroGrupo", dia, COUNT(*) AS cantidad FROM "Asiste" GROUP BY "nroGrupo", dia
+) a ON a."nroGrupo" = p."nroGrupo" AND a.dia = p.dia
+WHERE p.inscritos <> COALESCE(a.cantidad, 0);
+
+-- Carga inicial
+UPDATE "Pertenece" p
+SET inscritos = d.real
+FROM "PerteneceOcupacionDesvio" d
+WHERE d."nroGrupo" = p."nroGrupo" AND d.dia = p.dia;
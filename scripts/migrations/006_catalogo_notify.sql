@@ -0,0 +1,45 @@
+-- 006_catalogo_notify.sql
+-- Avisa a todos los workers que un catálogo cambió, para que invaliden su caché (utils/cache.py).
+-- pg_notify se entrega recién al confirmar la transacción y Postgres agrupa los avisos
+-- repetidos, así que una operación que toca muchas filas genera un solo aviso por catálogo.
+-- Los triggers son por fila a propósito: un INSERT ... ON CONFLICT DO NOTHING que no inserta
+-- nada (ej: actualizar_perfil_alumno con una provincia existente) no invalida la caché.
+-- Cubre cualquier vía de escritura (servicios, CASCADE, cambios manuales desde psql).
+
+CREATE OR REPLACE FUNCTION catalogo_notificar() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('catalogo_cambio', TG_ARGV[0]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS "trg_catalogo_horario" ON "Horario";
+DROP TRIGGER IF EXISTS "trg_catalogo_pertenece" ON "Pertenece";
+DROP TRIGGER IF EXISTS "trg_catalogo_dia" ON "Dia";
+DROP TRIGGER IF EXISTS "trg_catalogo_trabajo" ON "Trabajo";
+DROP TRIGGER IF EXISTS "trg_catalogo_suscripcion" ON "Suscripcion";
+DROP TRIGGER IF EXISTS "trg_catalogo_provincia" ON "Provincia";
+DROP TRIGGER IF EXISTS "trg_catalogo_localidad" ON "Localidad";
+
+CREATE TRIGGER "trg_catalogo_horario" AFTER INSERT OR UPDATE OR DELETE ON "Horario"
+    FOR EACH ROW EXECUTE FUNCTION catalogo_notificar('horarios');
+
+-- La ocupación ("inscritos") no forma parte del catálogo cacheado: se lee en vivo
+CREATE TRIGGER "trg_catalogo_pertenece"
+    AFTER INSERT OR DELETE OR UPDATE OF "nroGrupo", dia, "capacidadMax", "dniEmpleado" ON "Pertenece"
+    FOR EACH ROW EXECUTE FUNCTION catalogo_notificar('horarios');
+
+CREATE TRIGGER "trg_catalogo_dia" AFTER INSERT OR UPDATE OR DELETE ON "Dia"
+    FOR EACH ROW EXECUTE FUNCTION catalogo_notificar('horarios');
+
+CREATE TRIGGER "trg_catalogo_trabajo" AFTER INSERT OR UPDATE OR DELETE ON "Trabajo"
+    FOR EACH ROW EXECUTE FUNCTION catalogo_notificar('trabajos');
+
+CREATE TRIGGER "trg_catalogo_suscripcion" AFTER INSERT OR UPDATE OR DELETE ON "Suscripcion"
+    FOR EACH ROW EXECUTE FUNCTION catalogo_notificar('suscripciones');
+
+CREATE TRIGGER "trg_catalogo_provincia" AFTER INSERT OR UPDATE OR DELETE ON "Provincia"
+    FOR EACH ROW EXECUTE FUNCTION catalogo_notificar('ubicaciones');
+
+CREATE TRIGGER "trg_catalogo_localidad" AFTER INSERT OR UPDATE OR DELETE ON "Localidad"
+    FOR EACH ROW EXECUTE FUNCTION catalogo_notificar('ubicaciones');
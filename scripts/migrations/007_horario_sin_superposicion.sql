@@ -0,0 +1,25 @@
+-- 007_horario_sin_superposicion.sql
+-- Garantiza en la base que dos grupos no se superpongan en el horario (misma regla que
+-- check_horario_overlap: NewStart < OldEnd AND NewEnd > OldStart, rangos semiabiertos).
+--
+-- Antes de aplicarla, listar las superposiciones existentes y corregirlas:
+--   SELECT a."nroGrupo", b."nroGrupo"
+--   FROM "Horario" a JOIN "Horario" b ON a."nroGrupo" < b."nroGrupo"
+--   WHERE a."horaInicio" < b."horaFin" AND b."horaInicio" < a."horaFin";
+
+-- Tipo rango para horas del día (Postgres no trae uno para TIME)
+DO $$
+BEGIN
+    CREATE TYPE timerange AS RANGE (subtype = time);
+EXCEPTION
+    WHEN duplicate_object THEN NULL;
+END
+$$;
+
+ALTER TABLE "Horario" DROP CONSTRAINT IF EXISTS "horario_sin_superposicion";
+
+-- DEFERRABLE: actualizar_horario_completo crea el grupo con el nroGrupo nuevo antes de borrar
+-- el viejo (mismo horario); difiere el chequeo y lo fuerza antes de terminar la transacción.
+ALTER TABLE "Horario" ADD CONSTRAINT "horario_sin_superposicion"
+    EXCLUDE USING gist (timerange("horaInicio", "horaFin") WITH &&)
+    DEFERRABLE INITIALLY IMMEDIATE;
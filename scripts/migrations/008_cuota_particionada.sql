@@ -0,0 +1,101 @@
+-- 008_cuota_particionada.sql
+-- "Cuota" pasa a estar particionada por mes: la columna "periodo" (primer día del mes de la cuota)
+-- es la clave de partición y, junto con dni, la clave única que usa la generación masiva
+-- (INSERT ... ON CONFLICT (dni, periodo) DO NOTHING). La generación del mes y los filtros por
+-- "periodo" solo tocan la partición que corresponde.
+-- También crea "CuotaGeneracion", el registro de cada corrida de la generación masiva.
+--
+-- Reescribe la tabla completa: correr en una ventana sin tráfico, en una sola transacción
+-- (vuelve a aplicar 002 para atar los triggers de KPIs a la tabla nueva):
+--     psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -1 -f scripts/migrations/008_cuota_particionada.sql
+--
+-- Antes de aplicarla, revisar alumnos con más de una cuota en el mismo mes (rompen la clave única):
+--   SELECT dni, date_trunc('month', "fechaComienzo")::DATE AS periodo, COUNT(*)
+--   FROM "Cuota" GROUP BY 1, 2 HAVING COUNT(*) > 1;
+-- Si alguna vista o FK de otra tabla apunta a "Cuota", el DROP del paso 4 falla y no se aplica nada.
+
+-- 1. Período de las cuotas existentes
+ALTER TABLE "Cuota" ADD COLUMN IF NOT EXISTS periodo DATE;
+UPDATE "Cuota" SET periodo = date_trunc('month', "fechaComienzo")::DATE WHERE periodo IS NULL;
+ALTER TABLE "Cuota" ALTER COLUMN periodo SET NOT NULL;
+
+-- 2. Tabla particionada con la misma estructura (columnas, defaults, checks)
+ALTER TABLE "Cuota" RENAME TO "CuotaLegacy";
+
+CREATE TABLE "Cuota" (LIKE "CuotaLegacy" INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS)
+    PARTITION BY RANGE (periodo);
+
+-- Crea (si falta) la partición mensual que contiene `fecha`. La generación masiva la llama
+-- para el mes que genera y el siguiente, así el alta de particiones no depende de nadie.
+CREATE OR REPLACE FUNCTION cuota_crear_particion(fecha DATE) RETURNS TEXT AS $$
+DECLARE
+    inicio DATE := date_trunc('month', fecha)::DATE;
+    nombre TEXT := 'Cuota_' || to_char(inicio, 'YYYY_MM');
+BEGIN
+    IF to_regclass(quote_ident(nombre)) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF "Cuota" FOR VALUES FROM (%L) TO (%L)',
+            nombre, inicio, (inicio + INTERVAL '1 month')::DATE
+        );
+    END IF;
+    RETURN nombre;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT cuota_crear_particion(m::DATE)
+FROM generate_series(
+    COALESCE((SELECT MIN(periodo) FROM "CuotaLegacy"), date_trunc('month', CURRENT_DATE)::DATE),
+    date_trunc('month', CURRENT_DATE) + INTERVAL '1 month',
+    INTERVAL '1 month'
+) m;
+
+-- 3. Datos, secuencia de "idCuota" y FKs salientes (dni, "idFacturacion", ...)
+INSERT INTO "Cuota" SELECT * FROM "CuotaLegacy";
+
+DO $$
+DECLARE
+    secuencia TEXT := pg_get_serial_sequence('"CuotaLegacy"', 'idCuota');
+    fk RECORD;
+BEGIN
+    IF secuencia IS NOT NULL THEN
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY "Cuota"."idCuota"', secuencia);
+    END IF;
+
+    FOR fk IN
+        SELECT conname, pg_get_constraintdef(oid) AS definicion
+        FROM pg_constraint
+        WHERE conrelid = '"CuotaLegacy"'::regclass AND contype = 'f'
+    LOOP
+        EXECUTE format('ALTER TABLE "Cuota" ADD CONSTRAINT %I %s', fk.conname, fk.definicion);
+    END LOOP;
+END
+$$;
+
+-- 4. Quitar la tabla vieja (la función de KPIs quedó tipada con su fila)
+DROP FUNCTION IF EXISTS kpi_cuota_aplicar(INTEGER, "CuotaLegacy"[]);
+DROP TABLE "CuotaLegacy";
+
+-- 5. Claves e índices (los de 003 se crean en el padre y se propagan a cada partición).
+-- La PK empieza por "idCuota", así las búsquedas por id siguen usando índice en cada partición.
+ALTER TABLE "Cuota" ADD PRIMARY KEY ("idCuota", periodo);
+ALTER TABLE "Cuota" ADD CONSTRAINT "cuota_dni_periodo_key" UNIQUE (dni, periodo);
+
+CREATE INDEX IF NOT EXISTS "idx_cuota_pagada_fechaDePago" ON "Cuota" (pagada, "fechaDePago");
+CREATE INDEX IF NOT EXISTS "idx_cuota_dni_pagada" ON "Cuota" (dni, pagada);
+CREATE INDEX IF NOT EXISTS "idx_cuota_fechaComienzo" ON "Cuota" ("fechaComienzo");
+
+-- 6. Triggers y snapshot de KPIs sobre la tabla nueva
+\ir 002_kpi_cuota_snapshot.sql
+
+-- 7. Registro de corridas de la generación masiva
+CREATE TABLE IF NOT EXISTS "CuotaGeneracion" (
+    "idGeneracion"  SERIAL PRIMARY KEY,
+    periodo         DATE NOT NULL,
+    inicio          TIMESTAMPTZ NOT NULL DEFAULT now(),
+    fin             TIMESTAMPTZ,
+    generadas       INTEGER,
+    estado          VARCHAR(20) NOT NULL DEFAULT 'en_curso',   -- en_curso | ok | error
+    error           TEXT
+);
+
+CREATE INDEX IF NOT EXISTS "idx_cuotageneracion_inicio" ON "CuotaGeneracion" (inicio DESC);
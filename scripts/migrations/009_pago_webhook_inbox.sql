@@ -0,0 +1,25 @@
+-- 009_pago_webhook_inbox.sql
+-- Bandeja de entrada de notificaciones de pago de Mercado Pago. El webhook solo registra el
+-- aviso (deduplicado por pago y cuenta) y responde enseguida; PagoWebhookWorker
+-- (services/pagoServices.py) lo verifica contra la API de MP y actualiza la cuota.
+
+CREATE TABLE IF NOT EXISTS "PagoWebhookInbox" (
+    "idEvento"         BIGSERIAL PRIMARY KEY,
+    "paymentId"        VARCHAR(40) NOT NULL,
+    cuenta             VARCHAR(20) NOT NULL,          -- administrador | empleado (token con el que se verifica)
+    estado             VARCHAR(12) NOT NULL DEFAULT 'pendiente'
+                       CHECK (estado IN ('pendiente', 'procesando', 'procesado', 'descartado', 'fallido')),
+    intentos           INTEGER NOT NULL DEFAULT 0,
+    "ultimoError"      TEXT,
+    "estadoPago"       VARCHAR(30),                   -- status informado por MP en la última verificación
+    "idCuota"          INTEGER,
+    "proximoIntento"   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    "fechaRecepcion"   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    "fechaProceso"     TIMESTAMPTZ,
+    UNIQUE ("paymentId", cuenta)
+);
+
+-- Índice parcial: el worker solo mira lo que falta procesar
+CREATE INDEX IF NOT EXISTS "idx_pagowebhookinbox_pendientes"
+    ON "PagoWebhookInbox" ("proximoIntento")
+    WHERE estado IN ('pendiente', 'procesando');
@@ -0,0 +1,19 @@
+-- 010_cuota_pago_notify.sql
+-- Publica en el canal 'cuota_pago' cada cambio de "Cuota".pagada, venga del worker de webhooks,
+-- del pago manual, de modificar_cuota o de psql. Lo escucha PagoEstadoListener
+-- (utils/eventos_pago.py) en cada worker de uvicorn para avisar a los streams SSE abiertos
+-- (GET /pagos/{id_cuota}/estado/stream). El aviso se entrega al confirmarse la transacción.
+
+CREATE OR REPLACE FUNCTION cuota_pago_notificar() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('cuota_pago', json_build_object('idCuota', NEW."idCuota", 'pagada', NEW.pagada)::TEXT);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS "trg_cuota_pago_notificar" ON "Cuota";
+
+CREATE TRIGGER "trg_cuota_pago_notificar" AFTER UPDATE OF pagada ON "Cuota"
+    FOR EACH ROW
+    WHEN (OLD.pagada IS DISTINCT FROM NEW.pagada)
+    EXECUTE FUNCTION cuota_pago_notificar();
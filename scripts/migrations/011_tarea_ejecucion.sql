@@ -0,0 +1,20 @@
+-- 011_tarea_ejecucion.sql
+-- Historial de las tareas programadas (services/tareaServices.py): una fila por disparo y por
+-- nodo. Solo el nodo que obtiene el advisory lock de la tarea la ejecuta; el resto registra
+-- 'omitida'. Lo consulta GET /tareas/estado.
+
+CREATE TABLE IF NOT EXISTS "TareaEjecucion" (
+    "idEjecucion"   BIGSERIAL PRIMARY KEY,
+    tarea           VARCHAR(60) NOT NULL,
+    nodo            VARCHAR(120) NOT NULL,             -- host:pid del proceso que la disparó
+    inicio          TIMESTAMPTZ NOT NULL DEFAULT now(),
+    fin             TIMESTAMPTZ,
+    "duracionMs"    INTEGER,
+    filas           INTEGER,                           -- filas afectadas que informa la tarea
+    estado          VARCHAR(12) NOT NULL DEFAULT 'en_curso'
+                    CHECK (estado IN ('en_curso', 'ok', 'error', 'omitida', 'interrumpida')),
+    error           TEXT
+);
+
+CREATE INDEX IF NOT EXISTS "idx_tareaejecucion_tarea_inicio"
+    ON "TareaEjecucion" (tarea, inicio DESC);
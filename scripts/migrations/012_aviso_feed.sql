@@ -0,0 +1,32 @@
+-- 012_aviso_feed.sql
+-- Feed paginado de avisos (GET /avisos/feed) con ETag / Last-Modified.
+-- La versión del feed la mantiene un trigger sobre "Aviso" (a nivel sentencia), así cubre altas,
+-- ediciones y bajas: el endpoint lee una sola fila para decidir si responde 304.
+
+-- Orden y cursor keyset (fecha, hora, idAviso), del más nuevo al más viejo
+CREATE INDEX IF NOT EXISTS "idx_aviso_fecha_hora_id"
+    ON "Aviso" (fecha DESC, hora DESC, "idAviso" DESC);
+
+-- Fila única con la versión del feed y el momento de su último cambio
+CREATE TABLE IF NOT EXISTS "AvisoVersion" (
+    id          BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version     BIGINT NOT NULL DEFAULT 1,
+    modificado  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO "AvisoVersion" (id, modificado)
+SELECT TRUE, COALESCE(MAX(fecha + hora), now()) FROM "Aviso"
+ON CONFLICT (id) DO NOTHING;
+
+-- clock_timestamp() y no now(): el cambio se ve al confirmar, no al empezar la transacción
+CREATE OR REPLACE FUNCTION aviso_version_trigger() RETURNS trigger AS $$
+BEGIN
+    UPDATE "AvisoVersion" SET version = version + 1, modificado = clock_timestamp();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS "trg_aviso_version" ON "Aviso";
+
+CREATE TRIGGER "trg_aviso_version" AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Aviso"
+    FOR EACH STATEMENT EXECUTE FUNCTION aviso_version_trigger();
@@ -0,0 +1,9 @@
+-- 013_tarea_ejecucion_disparo.sql
+-- Cada disparo programado de una tarea se ejecuta una sola vez entre todos los nodos: el nodo
+-- que primero inserta la fila (tarea, programada) se queda con el disparo; los demás no corren.
+-- Las ejecuciones manuales (mantenimiento.py tarea-ejecutar) tienen programada NULL.
+
+ALTER TABLE "TareaEjecucion" ADD COLUMN IF NOT EXISTS programada TIMESTAMPTZ;
+
+ALTER TABLE "TareaEjecucion" DROP CONSTRAINT IF EXISTS "tareaejecucion_tarea_programada_key";
+ALTER TABLE "TareaEjecucion" ADD CONSTRAINT "tareaejecucion_tarea_programada_key" UNIQUE (tarea, programada);
@@ -0,0 +1,42 @@
+-- 014_principal_notify.sql
+-- Avisa a todos los workers que cambió una persona o sus roles, para que saquen de su caché de
+-- usuarios autenticados (utils/cache.py, principal_cache) las sesiones de ese dni. Igual que
+-- 006_catalogo_notify.sql: pg_notify se entrega al confirmar la transacción y cubre cualquier
+-- vía de escritura (servicios, CASCADE, cambios manuales desde psql).
+
+CREATE OR REPLACE FUNCTION principal_notificar() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('principal_cambio', OLD.dni);
+    ELSE
+        PERFORM pg_notify('principal_cambio', NEW.dni);
+        -- Cambio de dni (raro): también las sesiones cacheadas con el anterior
+        IF TG_OP = 'UPDATE' AND OLD.dni IS DISTINCT FROM NEW.dni THEN
+            PERFORM pg_notify('principal_cambio', OLD.dni);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS "trg_principal_persona" ON "Persona";
+DROP TRIGGER IF EXISTS "trg_principal_empleado" ON "Empleado";
+DROP TRIGGER IF EXISTS "trg_principal_alumno" ON "Alumno";
+DROP TRIGGER IF EXISTS "trg_principal_alumno_activo" ON "AlumnoActivo";
+DROP TRIGGER IF EXISTS "trg_principal_alumno_inactivo" ON "AlumnoInactivo";
+
+-- El principal es la fila de "Persona" más sus flags de rol (utils/simpleQueries.CONSULTA_PRINCIPAL)
+CREATE TRIGGER "trg_principal_persona" AFTER UPDATE OR DELETE ON "Persona"
+    FOR EACH ROW EXECUTE FUNCTION principal_notificar();
+
+CREATE TRIGGER "trg_principal_empleado" AFTER INSERT OR UPDATE OR DELETE ON "Empleado"
+    FOR EACH ROW EXECUTE FUNCTION principal_notificar();
+
+CREATE TRIGGER "trg_principal_alumno" AFTER INSERT OR UPDATE OR DELETE ON "Alumno"
+    FOR EACH ROW EXECUTE FUNCTION principal_notificar();
+
+CREATE TRIGGER "trg_principal_alumno_activo" AFTER INSERT OR UPDATE OR DELETE ON "AlumnoActivo"
+    FOR EACH ROW EXECUTE FUNCTION principal_notificar();
+
+CREATE TRIGGER "trg_principal_alumno_inactivo" AFTER INSERT OR UPDATE OR DELETE ON "AlumnoInactivo"
+    FOR EACH ROW EXECUTE FUNCTION principal_notificar();
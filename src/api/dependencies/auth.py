@@ -1,20 +1,41 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from asyncpg import Connection
 from typing import Annotated
 
-from core.session import get_db
+import time
+
+from core.session import ConexionDiferida, get_db_diferida
 from core.config import settings
 
-from services.authServices import get_user_by_username
+from utils.simpleQueries import get_principal_by_username
+from utils.cache import principal_cache, token_cache_key
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 async def get_current_user(
+    request: Request,
     token: Annotated[str, Depends(oauth2_scheme)], 
-    db: Connection = Depends(get_db)
+    db: ConexionDiferida = Depends(get_db_diferida)
 ):
+    """
+    Resuelve el usuario autenticado (Persona + flags de rol) una sola vez por request.
+    El resultado queda en request.state.principal para que las verificaciones de rol lo reutilicen,
+    y en la caché por proceso (clave = hash del token) durante AUTH_CACHE_TTL_SECONDS.
+    Solo toma una conexión del pool si el principal no está en caché, y la devuelve enseguida.
+    """
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
+
+    cache_key = token_cache_key(token)
+    cached = principal_cache.get(cache_key)
+    if cached is not None:
+        # Copia para que ningún handler modifique la entrada compartida
+        principal = dict(cached)
+        request.state.principal = principal
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudieron validar las credenciales",
@@ -28,7 +49,14 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
         
-    user = await get_user_by_username(db, username)
-    if user is None:
+    async with db.conexion() as conn:
+        principal = await get_principal_by_username(conn, username)
+    if principal is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+
+    # La entrada nunca sobrevive al vencimiento del propio token
+    exp = payload.get("exp")
+    principal_cache.set(cache_key, dict(principal), ttl=(exp - time.time()) if exp else None)
+
+    request.state.principal = principal
+    return principal
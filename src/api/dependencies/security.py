@@ -1,22 +1,15 @@
 from fastapi import Depends, HTTPException, status
-from asyncpg import Connection
-from typing import List
 
 from api.dependencies.auth import get_current_user
-from services.authServices import (
-    es_administrador, 
-    es_empleado, 
-    es_alumno_activo,
-    es_alumno
-)
-from core.session import get_db
+
+# Todas las dependencias leen los flags de rol del principal resuelto en get_current_user
+# (una sola consulta por request), en lugar de consultar cada tabla de rol.
 
 # Dependencia para administradores
 async def admin_required(
-    current_user: dict = Depends(get_current_user),
-    db: Connection = Depends(get_db)
+    current_user: dict = Depends(get_current_user)
 ):
-    if not await es_administrador(db, current_user["dni"]):
+    if not current_user["esAdmin"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Se requieren permisos de administrador"
@@ -25,10 +18,9 @@ async def admin_required(
 
 # Dependencia para empleados
 async def empleado_required(
-    current_user: dict = Depends(get_current_user),
-    db: Connection = Depends(get_db)
+    current_user: dict = Depends(get_current_user)
 ):
-    if not await es_empleado(db, current_user["dni"]):
+    if not current_user["esEmpleado"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Se requieren permisos de empleado"
@@ -37,10 +29,9 @@ async def empleado_required(
 
 # Dependencia para alumnos activos
 async def alumno_activo_required(
-    current_user: dict = Depends(get_current_user),
-    db: Connection = Depends(get_db)
+    current_user: dict = Depends(get_current_user)
 ):
-    if not await es_alumno_activo(db, current_user["dni"]):
+    if not current_user["esAlumnoActivo"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Se requiere ser alumno activo"
@@ -49,10 +40,9 @@ async def alumno_activo_required(
 
 # Dependencia para cualquier alumno (activo o inactivo)
 async def alumno_required(
-    current_user: dict = Depends(get_current_user),
-    db: Connection = Depends(get_db)
+    current_user: dict = Depends(get_current_user)
 ):
-    if not await es_alumno(db, current_user["dni"]):
+    if not current_user["esAlumno"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Se requiere ser alumno"
@@ -61,13 +51,9 @@ async def alumno_required(
 
 # Dependencia para administradores o empleados
 async def staff_required(
-    current_user: dict = Depends(get_current_user),
-    db: Connection = Depends(get_db)
+    current_user: dict = Depends(get_current_user)
 ):
-    es_admin = await es_administrador(db, current_user["dni"])
-    es_emp = await es_empleado(db, current_user["dni"])
-    
-    if not (es_admin or es_emp):
+    if not (current_user["esAdmin"] or current_user["esEmpleado"]):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Se requieren permisos de staff (admin o empleado)"
@@ -75,19 +61,14 @@ async def staff_required(
     return current_user
 
 async def staff_or_alumno_required(
-    current_user: dict = Depends(get_current_user),
-    db: Connection = Depends(get_db)
+    current_user: dict = Depends(get_current_user)
 ):
     """
     Verifica si el usuario es staff (admin o empleado) O si es alumno.
     """
-    es_admin = await es_administrador(db, current_user["dni"])
-    es_emp = await es_empleado(db, current_user["dni"])
-    es_alu = await es_alumno(db, current_user["dni"]) #
-    
-    if not (es_admin or es_emp or es_alu):
+    if not (current_user["esAdmin"] or current_user["esEmpleado"] or current_user["esAlumno"]):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Se requieren permisos de staff o de alumno para acceder a este recurso."
         )
-    return current_user
\ No newline at end of file
+    return current_user
@@ -0,0 +1,32 @@
+import logging
+import time
+
+from core.metricas_db import ConsultasRequest, consultas_request
+
+class ConsultasPorRequestMiddleware:
+    """
+    Cuenta las consultas a la base que hace cada request (y el tiempo que pasan en la base)
+    y lo loguea al terminar. Es ASGI puro para incluir también las respuestas en streaming.
+    Requiere DB_METRICAS (las cuenta ConexionInstrumentada); se activa con DB_CONSULTAS_POR_REQUEST.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        contador = ConsultasRequest(ruta=f"{scope['method']} {scope['path']}")
+        token = consultas_request.set(contador)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            consultas_request.reset(token)
+            total_ms = (time.perf_counter() - inicio) * 1000
+            logging.info(
+                f"[DB] {contador.ruta}: {contador.cantidad} consultas, "
+                f"{contador.tiempo_ms:.0f} ms en la base de {total_ms:.0f} ms"
+            )
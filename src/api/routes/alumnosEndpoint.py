@@ -1,15 +1,16 @@
 # src/api/routes/alumnosEndpoint.py
-from fastapi import APIRouter, Depends, status, Body
+from fastapi import APIRouter, Depends, status, Body, Query
 from asyncpg import Connection
-from typing import List
+from typing import List, Literal, Optional
 
-from core.session import get_db
+from core.session import get_db, get_read_db
 
 from schemas.alumnoSchema import (
     AlumnoActivate,
     AlumnoActivateResponse,
     AlumnoCreateFull,
     AlumnoListado,
+    AlumnoListadoPagina,
     AlumnoDetalle,
     HorarioAlumno,
     HorariosAlumnoResponse,
@@ -20,6 +21,7 @@ from schemas.alumnoSchema import (
 from services.alumnoServices import (
     activar_alumno,
     listar_alumnos_detalle,
+    listar_alumnos_paginado,
     obtener_detalle_alumno,
     obtener_horarios_alumno,
     actualizar_horarios_alumno,
@@ -75,7 +77,7 @@ async def activar_nuevo_alumno(
     dependencies=[Depends(staff_required)] # <-- ¡Solo para administradores!
 )
 async def obtener_lista_alumnos(
-    db: Connection = Depends(get_db)
+    db: Connection = Depends(get_read_db)
 ):
     """
     Obtiene una lista completa de todos los alumnos registrados en el sistema
@@ -85,6 +87,41 @@ async def obtener_lista_alumnos(
     """
     return await listar_alumnos_detalle(conn=db)
 
+@router.get(
+    "/paginado",
+    response_model=AlumnoListadoPagina,
+    summary="Listar alumnos por páginas con filtros (Staff)",
+    response_description="Una página de alumnos y el cursor para pedir la siguiente.",
+    dependencies=[Depends(staff_required)]
+)
+async def obtener_lista_alumnos_paginada(
+    limite: int = Query(50, ge=1, le=200, description="Cantidad de alumnos por página"),
+    cursor: Optional[str] = Query(None, description="siguienteCursor devuelto por la página anterior"),
+    activo: Optional[bool] = Query(None, description="Solo alumnos activos (true) o inactivos (false)"),
+    turno: Optional[Literal["Mañana", "Tarde", "No asignado"]] = Query(None),
+    conDeuda: Optional[bool] = Query(None, description="Con (true) o sin (false) cuotas impagas"),
+    trabajo: Optional[str] = Query(None, description="Nombre del trabajo"),
+    suscripcion: Optional[str] = Query(None, description="Nombre de la suscripción"),
+    incluirTotal: bool = Query(False, description="Calcular además el total de alumnos que cumplen los filtros"),
+    db: Connection = Depends(get_read_db)
+):
+    """
+    Igual que el listado completo, pero paginado por cursor y filtrado en el servidor.
+    Para recorrer todo, repetir la consulta pasando el **siguienteCursor** recibido
+    hasta que venga en null.
+    """
+    return await listar_alumnos_paginado(
+        conn=db,
+        limite=limite,
+        cursor=cursor,
+        activo=activo,
+        turno=turno,
+        con_deuda=conDeuda,
+        trabajo=trabajo,
+        suscripcion=suscripcion,
+        incluir_total=incluirTotal
+    )
+
 # === NUEVO ENDPOINT PARA DETALLE DE ALUMNO ===
 @router.get(
     "/{dni}",
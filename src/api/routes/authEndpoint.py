@@ -27,8 +27,6 @@ from services.authServices import (
     authenticate_user,
     solicitar_recuperacion_contrasenia,
     verify_email_token,
-    es_alumno,
-    es_empleado,
     cambiar_contrasenia_primer_ingreso
 )
 
@@ -166,31 +164,24 @@ async def login(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: Annotated[dict, Depends(get_current_user)],
-    db: Connection = Depends(get_db) # <--- 2. INYECTAR LA CONEXIÓN A LA BD
+    current_user: Annotated[dict, Depends(get_current_user)]
 ):
     """
     Obtiene información del usuario actualmente autenticado y sus roles.
+    Los roles ya vienen resueltos en el principal de get_current_user (sin consultas extra).
     """
-    dni = current_user["dni"]
+    is_alumno = current_user["esAlumno"]
+    is_empleado = current_user["esEmpleado"]
+    is_admin = current_user["esAdmin"]
     
-    # 3. VERIFICAR ROLES EN LA BASE DE DATOS
-    is_alumno = await es_alumno(db, dni)
-    is_empleado = await es_empleado(db, dni)
-    is_admin = current_user["esAdmin"] # Este dato ya viene en la tabla Persona
-    
-    # 4. DETERMINAR SI ES "SOLO PERSONA" (Ningún rol asignado)
+    # DETERMINAR SI ES "SOLO PERSONA" (Ningún rol asignado)
     is_persona = not (is_alumno or is_empleado or is_admin)
     
-    # 5. AGREGAR DATOS A LA RESPUESTA
-    # Actualizamos el diccionario del usuario con los nuevos campos calculados
-    current_user.update({
-        "esAlumno": is_alumno,
-        "esEmpleado": is_empleado,
+    # Armamos la respuesta sin modificar el principal compartido del request
+    return {
+        **current_user,
         "esPersona": is_persona
-    })
-    
-    return current_user
+    }
 
 @router.post("/forgot-password", status_code=status.HTTP_200_OK)
 async def forgot_password(
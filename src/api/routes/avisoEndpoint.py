@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, Query, Response, status
 from asyncpg import Connection
-from typing import List, Annotated
+from typing import List, Annotated, Optional
 
-from core.session import get_db
+from core.session import get_db, get_read_db
 # Importamos dependencias de seguridad
 from api.dependencies.auth import get_current_user 
 from api.dependencies.security import staff_required
 
-from schemas.avisoSchema import AvisoCreate, AvisoResponse, AvisoUpdate
+from schemas.avisoSchema import AvisoCreate, AvisoResponse, AvisoUpdate, AvisoFeedPagina
 from services import avisoServices
+from utils.etag import etag_coincide, etag_fuerte, fecha_http, no_modificado_desde
 
 router = APIRouter(
     prefix="/avisos",
@@ -27,6 +28,53 @@ async def listar_avisos(
 ):
     return await avisoServices.listar_avisos(db)
 
+@router.get(
+    "/feed",
+    response_model=AvisoFeedPagina,
+    summary="Feed de avisos paginado (con caché HTTP)",
+    response_description="Una página de avisos, del más nuevo al más viejo.",
+    dependencies=[Depends(get_current_user)],
+    responses={304: {"description": "El feed no cambió desde la última visita"}}
+)
+async def feed_avisos(
+    response: Response,
+    limite: int = Query(20, ge=1, le=100, description="Cantidad de avisos por página"),
+    cursor: Optional[str] = Query(None, description="siguienteCursor devuelto por la página anterior"),
+    since: Optional[str] = Query(None, description="cursorNuevos de una visita anterior: solo avisos posteriores"),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    db: Connection = Depends(get_read_db)
+):
+    """
+    Avisos paginados por cursor. Para recorrer todo, repetir la consulta pasando el
+    **siguienteCursor** recibido hasta que venga en null. Para traer solo lo nuevo en la
+    próxima visita, pasar como **since** el **cursorNuevos** recibido.
+
+    El ETag y Last-Modified cambian con cualquier alta, edición o baja de avisos; con
+    `If-None-Match` (o `If-Modified-Since`) de una respuesta anterior responde 304 sin
+    consultar ni serializar los avisos.
+    """
+    # La versión se lee antes que los avisos: si cambian en el medio, el ETag queda viejo
+    # y la próxima visita baja el feed de nuevo (nunca al revés)
+    version, modificado = await avisoServices.version_feed_avisos(db)
+    headers = {
+        "ETag": etag_fuerte(f"avisos-{version}"),
+        "Last-Modified": fecha_http(modificado),
+        "Cache-Control": "private, no-cache", # Siempre revalidar contra la versión del feed
+        "Access-Control-Expose-Headers": "ETag, Last-Modified"
+    }
+
+    # If-None-Match manda sobre If-Modified-Since (RFC 9110)
+    if if_none_match is not None:
+        no_modificado = etag_coincide(if_none_match, headers["ETag"])
+    else:
+        no_modificado = no_modificado_desde(if_modified_since, modificado)
+    if no_modificado:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return await avisoServices.listar_avisos_feed(db, limite=limite, cursor=cursor, since=since)
+
 # === ESCRITURA (Solo Staff) ===
 @router.post(
     "/",
@@ -1,23 +1,31 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from asyncpg import Connection
-from typing import List
+from datetime import date
+from typing import List, Literal, Optional
 
 # --- Dependencias y Sesión ---
-from core.session import get_db
-from api.dependencies.security import alumno_required, staff_required
+from core.session import get_db, get_read_db_pool
+from api.dependencies.security import admin_required, alumno_required, staff_required
 
 # --- Schemas y Services ---
 from schemas.cuotaSchema import (
     CuotaResponseAlumnoAuth,
     CuotaResponsePorDNI,
-    CuotaUpdateRequest
+    CuotaUpdateRequest,
+    GeneracionCuotasRegistro
 )
 from services.cuotaServices import (
     obtener_cuotas_por_dni,
     obtener_cuotas_por_alumno,
     modificar_cuota,
-    eliminar_cuota
+    eliminar_cuota,
+    armar_query_exportacion,
+    exportar_cuotas,
+    generar_cuotas_masivas_mensuales,
+    simular_generacion_cuotas,
+    listar_generaciones_cuotas
 )
 
 router = APIRouter(
@@ -60,6 +68,79 @@ async def listar_cuotas_de_alumno(
     """
     return await obtener_cuotas_por_dni(conn=db, dni=dni)
 
+@router.get(
+    "/exportar",
+    summary="Exportar cuotas y pagos en NDJSON o CSV (Staff)",
+    response_description="Archivo NDJSON o CSV transmitido por partes.",
+    dependencies=[Depends(staff_required)]
+)
+async def exportar_cuotas_endpoint(
+    formato: Literal["ndjson", "csv"] = Query("csv"),
+    desde: Optional[date] = Query(None, description="Fecha inicial (inclusive)"),
+    hasta: Optional[date] = Query(None, description="Fecha final (inclusive)"),
+    campoFecha: Literal["pago", "comienzo", "vencimiento"] = Query("pago", description="Fecha a la que aplica el rango"),
+    titular: Optional[str] = Query(None, description="Titular exacto (ej. 'Administración')"),
+    metodoDePago: Optional[str] = Query(None, description="Método de pago (coincidencia parcial)"),
+    pagada: Optional[bool] = Query(None)
+):
+    """
+    Exporta las cuotas (con nombre y apellido del alumno) filtradas por rango de fechas,
+    titular, método de pago y estado de pago. El archivo se genera mientras se descarga,
+    así que puede abarcar años de datos sin cargarlos en memoria.
+    """
+    query, params = armar_query_exportacion(
+        desde=desde,
+        hasta=hasta,
+        campo_fecha=campoFecha,
+        titular=titular,
+        metodo_pago=metodoDePago,
+        pagada=pagada
+    )
+    media_type = "text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson"
+    nombre_archivo = f"cuotas_{desde or 'inicio'}_{hasta or 'hoy'}.{formato}"
+
+    return StreamingResponse(
+        exportar_cuotas(get_read_db_pool(), query, params, formato),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre_archivo}"'}
+    )
+
+@router.post(
+    "/generacion-mensual",
+    summary="Generar las cuotas del mes (Admin)",
+    response_description="Cantidad de cuotas generadas, o el detalle de las que se generarían si simular=true",
+    dependencies=[Depends(admin_required)]
+)
+async def generar_cuotas_mes(
+    simular: bool = Query(False, description="Solo informar qué cuotas se generarían, sin escribir nada"),
+    fecha: Optional[date] = Query(None, description="Fecha de comienzo de las cuotas (hoy por defecto)"),
+    db: Connection = Depends(get_db)
+):
+    """
+    Genera la cuota del mes para cada alumno activo que todavía no la tenga.
+    Es idempotente: correrla de nuevo en el mismo mes no duplica cuotas.
+    """
+    if simular:
+        return await simular_generacion_cuotas(conn=db, fecha=fecha)
+
+    generadas = await generar_cuotas_masivas_mensuales(conn=db, fecha=fecha)
+    return {"message": f"Se generaron {generadas} cuotas", "generadas": generadas}
+
+@router.get(
+    "/generaciones",
+    response_model=List[GeneracionCuotasRegistro],
+    summary="Historial de generaciones masivas de cuotas (Admin)",
+    dependencies=[Depends(admin_required)]
+)
+async def historial_generaciones(
+    limite: int = Query(24, ge=1, le=200),
+    db: Connection = Depends(get_db)
+):
+    """
+    Últimas corridas de la generación mensual: inicio, fin, cuotas generadas y error (si lo hubo).
+    """
+    return await listar_generaciones_cuotas(conn=db, limite=limite)
+
 @router.put(
     "/{id_cuota}",
     summary="Modificar una cuota (Staff)",
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends
+from typing import List
+
+# --- Dependencias y Sesión ---
+from core.session import get_db_pool, get_replica_pool
+from core.metricas_db import metricas_db
+from core.consultas import perfil_consultas
+from api.dependencies.security import admin_required
+
+# --- Schemas ---
+from schemas.diagnosticoSchema import MetricasPoolDb, PerfilConsulta
+
+router = APIRouter(
+    prefix="/diagnostico",
+    tags=["Diagnóstico"]
+)
+
+@router.get(
+    "/db",
+    response_model=MetricasPoolDb,
+    summary="Métricas del pool de conexiones (Admin)",
+    dependencies=[Depends(admin_required)]
+)
+async def metricas_pool():
+    """
+    Estado del pool del worker que atiende el request: conexiones en uso y libres, esperas para
+    obtener conexión (p50/p95/p99/máx de las últimas), consultas por conexión y tasa de
+    aciertos de la caché de statements. Con varios workers, cada uno informa las suyas (pid).
+    Si hay réplica de lectura, también su ocupación.
+    """
+    return metricas_db.resumen(get_db_pool(), get_replica_pool())
+
+@router.get(
+    "/consultas",
+    response_model=List[PerfilConsulta],
+    summary="Perfil de las consultas frecuentes (Admin)",
+    dependencies=[Depends(admin_required)]
+)
+async def perfil_consultas_frecuentes():
+    """
+    Por cada sentencia del registro de consultas preparadas: llamadas, errores, tiempo total y
+    promedio, percentiles aproximados e histograma de latencia, ordenadas por tiempo total.
+    Son de este worker desde que arrancó.
+    """
+    return perfil_consultas()
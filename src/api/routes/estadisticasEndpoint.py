@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, Query, status # Añadir status si no está
 from asyncpg import Connection
-from typing import List
+from typing import List, Optional
 
-from core.session import get_db
+from core.session import get_read_db
 from api.dependencies.security import admin_required, staff_required
 from api.dependencies.auth import get_current_user
 
@@ -29,7 +29,7 @@ router = APIRouter(
     dependencies=[Depends(staff_required)] # <-- ¡Protegido para Administradores!
 )
 async def get_estadisticas_alumnos_por_trabajo(
-    db: Connection = Depends(get_db)
+    db: Connection = Depends(get_read_db)
 ):
     """
     Obtiene un resumen estadístico de cuántos alumnos están inscritos
@@ -46,7 +46,7 @@ async def get_estadisticas_alumnos_por_trabajo(
     dependencies=[Depends(staff_required)] 
 )
 async def get_dashboard_kpis(
-    db: Connection = Depends(get_db)
+    db: Connection = Depends(get_read_db)
 ):
     """
     Retorna los 4 indicadores clave:
@@ -64,7 +64,7 @@ async def get_dashboard_kpis(
     dependencies=[Depends(staff_required)]
 )
 async def get_stats_alumnos_turno(
-    db: Connection = Depends(get_db)
+    db: Connection = Depends(get_read_db)
 ):
     """
     Retorna la cantidad de alumnos activos por turno (Mañana/Tarde)
@@ -80,14 +80,16 @@ async def get_stats_alumnos_turno(
     description="Devuelve métricas de rendimiento basadas en los grupos a cargo del usuario logueado."
 )
 async def get_stats_entrenador(
+    mes: Optional[int] = Query(None, ge=1, le=12, description="Mes a consultar (por defecto, el actual)"),
+    anio: Optional[int] = Query(None, ge=2000, description="Año a consultar (por defecto, el actual)"),
     current_user: dict = Depends(get_current_user), # Necesitamos saber quién es
-    db: Connection = Depends(get_db)
+    db: Connection = Depends(get_read_db)
 ):
     """
     Obtiene la tarjeta de rendimiento del usuario actual.
     """
     dni_empleado = current_user['dni']
-    return await estadisticasService.obtener_estadisticas_entrenador(db, dni_empleado)
+    return await estadisticasService.obtener_estadisticas_entrenador(db, dni_empleado, mes=mes, anio=anio)
 
 @router.get(
     "/rendimiento-staff",
@@ -97,9 +99,11 @@ async def get_stats_entrenador(
     dependencies=[Depends(staff_required)]
 )
 async def get_all_staff_stats(
-    db: Connection = Depends(get_db)
+    mes: Optional[int] = Query(None, ge=1, le=12, description="Mes a consultar (por defecto, el actual)"),
+    anio: Optional[int] = Query(None, ge=2000, description="Año a consultar (por defecto, el actual)"),
+    db: Connection = Depends(get_read_db)
 ):
-    return await estadisticasService.obtener_stats_todos_empleados(db)
+    return await estadisticasService.obtener_stats_todos_empleados(db, mes=mes, anio=anio)
 
 
 @router.get(
@@ -109,9 +113,9 @@ async def get_all_staff_stats(
     dependencies=[Depends(staff_required)] # Solo administradores/empleados
 )
 async def get_recaudacion(
-    mes: int = Query(..., description="Mes a consultar (1-12)"),
-    anio: int = Query(..., description="Año a consultar (ej. 2026)"),
-    db: Connection = Depends(get_db)
+    mes: int = Query(..., ge=1, le=12, description="Mes a consultar (1-12)"),
+    anio: int = Query(..., ge=2000, description="Año a consultar (ej. 2026)"),
+    db: Connection = Depends(get_read_db)
 ):
     """
     Obtiene el total recaudado en un mes y año específico, 
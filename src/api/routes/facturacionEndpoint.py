@@ -3,7 +3,7 @@ from asyncpg import Connection
 from typing import List
 from datetime import date
 
-from core.session import get_db
+from core.session import ConexionDiferida, get_db, get_read_db, get_read_db_diferida
 from schemas.facturacionSchema import FacturacionResponse, ReporteFacturacion
 from services import facturacionServices
 from api.dependencies.security import admin_required, staff_required
@@ -30,6 +30,8 @@ async def generar_cierre(
         if not resultado:
             return [] # Retorna lista vacía si no hubo nada que facturar
         return resultado
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al generar cierre: {str(e)}")
 
@@ -41,7 +43,7 @@ async def generar_cierre(
 )
 async def obtener_reporte(
     id_facturacion: int,
-    db: Connection = Depends(get_db)
+    db: Connection = Depends(get_read_db)
 ):
     try:
         reporte = await facturacionServices.obtener_reporte_por_id(db, id_facturacion)
@@ -66,17 +68,19 @@ async def obtener_reporte(
 )
 async def obtener_reporte_pdf(
     id_facturacion: int,
-    db: Connection = Depends(get_db)
+    db: ConexionDiferida = Depends(get_read_db_diferida)
 ):
     try:
-        # 1. Obtenemos los datos (reutilizando la lógica existente)
-        reporte_data = await facturacionServices.obtener_reporte_por_id(db, id_facturacion)
+        # 1. Obtenemos los datos (reutilizando la lógica existente); la conexión se devuelve
+        #    antes de generar el PDF
+        async with db.conexion() as conn:
+            reporte_data = await facturacionServices.obtener_reporte_por_id(conn, id_facturacion)
         
         if not reporte_data:
             raise HTTPException(status_code=404, detail="Facturación no encontrada")
 
         # 2. Generamos el PDF
-        pdf_bytes = facturacionServices.generar_pdf_reporte(reporte_data)
+        pdf_bytes = await facturacionServices.generar_pdf_reporte(reporte_data)
 
         # 3. Retornamos como respuesta streaming/raw
         headers = {
@@ -99,7 +103,7 @@ async def obtener_reporte_pdf(
     description="Devuelve todas las facturaciones generadas hasta la fecha."
 )
 async def listar_facturaciones(
-    db: Connection = Depends(get_db),
+    db: Connection = Depends(get_read_db),
     current_user: dict = Depends(staff_required) # <--- Candado de seguridad
 ):
     try:
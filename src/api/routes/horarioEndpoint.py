@@ -16,7 +16,8 @@ from services.horarioServices import (
     crear_horario_completo,
     eliminar_horario_completo,
     actualizar_horario_completo,
-    obtener_horario_detallado
+    obtener_horario_detallado,
+    validar_temporada
 )
 
 # SCHEMAS
@@ -30,7 +31,9 @@ from schemas.horarioSchema import (
     UpdateCapacidadGrupo,
     UpdateEmpleadoGrupo,
     HorarioCompletoCreate,
-    HorarioCompletoUpdate
+    HorarioCompletoUpdate,
+    TemporadaValidar,
+    TemporadaValidacionResponse
 )
 
 # Dependencias
@@ -86,6 +89,27 @@ async def crear_nuevo_horario_completo( # <-- Renombrado para claridad
     # Llama al nuevo servicio transaccional
     return await crear_horario_completo(conn=db, horario_data=horario_data)
 
+# VALIDAR una grilla semanal completa
+@router.post(
+    "/validar-temporada",
+    response_model=TemporadaValidacionResponse,
+    summary="Validar una grilla semanal propuesta (Staff)",
+    response_description="Lista de conflictos encontrados (vacía si la grilla es válida)",
+    dependencies=[Depends(staff_required)]
+)
+async def validar_grilla_temporada(
+    data: TemporadaValidar,
+    db: Connection = Depends(get_db)
+):
+    """
+    Valida de una sola vez todos los grupos de una grilla semanal, sin guardar nada.
+
+    Informa todos los conflictos juntos: superposiciones horarias entre los grupos propuestos
+    (y con los existentes, salvo **reemplazaActual**), grupos o días repetidos, días no
+    configurados y empleados inexistentes.
+    """
+    return await validar_temporada(conn=db, data=data)
+
 # CREAR horario/grupo
 @router.post(
     "/",
@@ -1,15 +1,17 @@
-from fastapi import APIRouter, Depends, status, Request, HTTPException, Body
+from fastapi import APIRouter, BackgroundTasks, Depends, status, Request, Response, HTTPException, Body, Header
 from fastapi.responses import RedirectResponse
+from typing import Optional
 
 from asyncpg import Connection
 
-from core.session import get_db
+from core.session import ConexionDiferida, get_db, get_db_diferida, get_db_pool
 from api.dependencies.security import admin_required, alumno_required, staff_required
-from services.pagoServices import crear_preferencia_pago, marcar_pago_manual, procesar_pago_exitoso, obtener_estado_pago_cuota
+from services.pagoServices import crear_preferencia_pago, marcar_pago_manual, registrar_notificacion_pago, obtener_estado_pago_cuota, stream_estado_pago
 from schemas.pagoSchema import PreferenciaPagoResponse
 
 from fastapi.responses import StreamingResponse
-from services.pagoServices import generar_comprobante_pdf
+from services.pagoServices import obtener_comprobante, precalentar_comprobante
+from utils.etag import etag_coincide, etag_fuerte
 from api.dependencies.auth import get_current_user
 
 router = APIRouter(
@@ -27,20 +29,24 @@ router = APIRouter(
 async def iniciar_pago_cuota(
     id_cuota: int,
     monto_final: float = Body(..., embed=True, description="Monto final calculado por el front"), # <--- Nuevo parámetro
-    db: Connection = Depends(get_db)
+    db: ConexionDiferida = Depends(get_db_diferida)
 ):
     """
     Genera el link de pago (init_point) para una cuota específica.
     Recibe el monto final (con o sin recargos) calculado por el Frontend.
     """
     # Pasamos el monto_final al servicio
-    return await crear_preferencia_pago(conn=db, id_cuota=id_cuota, monto_final=monto_final)
+    return await crear_preferencia_pago(db=db, id_cuota=id_cuota, monto_final=monto_final)
 
 
 # 2. Endpoint para recibir notificaciones (Para Mercado Pago)
 @router.post("/webhook/", include_in_schema=False)
 @router.post("/webhook", include_in_schema=False)
 async def recibir_notificacion_mp(request: Request, db: Connection = Depends(get_db)):
+    """
+    Solo registra la notificación en el inbox y responde; la verificación contra MP y la
+    actualización de la cuota las hace PagoWebhookWorker en segundo plano.
+    """
     try:
         params = request.query_params
         owner = params.get("owner", "mia") # <--- Capturar quién es el dueño
@@ -51,15 +57,16 @@ async def recibir_notificacion_mp(request: Request, db: Connection = Depends(get
             body = await request.json()
             topic = body.get("type")
             payment_id = body.get("data", {}).get("id")
-
-        if topic == "payment" and payment_id:
-            # Pasamos el owner al servicio
-            await procesar_pago_exitoso(conn=db, payment_id=payment_id, owner=owner)
-        
-        return {"status": "ok"}
     except Exception:
+        # Notificación mal formada: no tiene sentido que MP la reintente
         return {"status": "ok"}
 
+    if topic == "payment" and payment_id:
+        # Si no se pudo guardar, el 500 hace que MP la reintente más tarde
+        await registrar_notificacion_pago(conn=db, payment_id=str(payment_id), owner=owner)
+
+    return {"status": "ok"}
+
 from core.config import settings
 
 # 3. Endpoint "Puente" para redirección post-pago
@@ -95,9 +102,32 @@ async def verificar_estado_cuota(
     """
     Devuelve True si la cuota ya fue pagada. 
     Usado por el Frontend para polling mientras se escanea el QR.
+    Preferir /pagos/{id_cuota}/estado/stream, que avisa sin consultar la base cada vez.
     """
     return await obtener_estado_pago_cuota(conn=db, id_cuota=id_cuota)
 
+@router.get("/{id_cuota}/estado/stream")
+async def stream_estado_cuota(id_cuota: int, request: Request):
+    """
+    Server-Sent Events con el estado de pago de la cuota, para usar con `EventSource`
+    mientras se escanea el QR en lugar de hacer polling.
+
+    Emite `event: estado` con `{"idCuota", "pagada"}` al conectarse y cada vez que cambia;
+    cierra el stream cuando la cuota queda pagada.
+    """
+    # 404 antes de abrir el stream (la conexión se devuelve enseguida al pool)
+    async with get_db_pool().acquire() as db:
+        await obtener_estado_pago_cuota(conn=db, id_cuota=id_cuota)
+
+    return StreamingResponse(
+        stream_estado_pago(get_db_pool(), id_cuota, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"   # nginx: no bufferizar el stream
+        }
+    )
+
 @router.get(
     "/comprobante/{id_cuota}",
     summary="Descargar comprobante de pago",
@@ -105,25 +135,39 @@ async def verificar_estado_cuota(
 )
 async def descargar_comprobante(
     id_cuota: int, 
-    db: Connection = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: ConexionDiferida = Depends(get_db_diferida)
 ):
-    pdf_buffer = await generar_comprobante_pdf(conn=db, id_cuota=id_cuota)
+    """
+    Descarga el comprobante de una cuota pagada. Se genera una sola vez y se guarda en disco;
+    con `If-None-Match` y el ETag de una descarga anterior responde 304 sin reenviarlo.
+    """
+    # La conexión se devuelve antes de generar el PDF (si hace falta dibujarlo)
+    async with db.conexion() as conn:
+        comprobante = await obtener_comprobante(conn=conn, id_cuota=id_cuota)
     
-    if not pdf_buffer:
+    if not comprobante:
         raise HTTPException(status_code=404, detail="Comprobante no encontrado o cuota no pagada")
 
+    clave, obtener_contenido = comprobante
+    etag = etag_fuerte(clave)
+
     # Definimos el nombre exacto que quieres
     filename = "ComprobantePago.pdf"
 
     # Forzamos la descarga con el nombre elegido ignorando la ruta del endpoint
     headers = {
         "Content-Disposition": f'attachment; filename="{filename}"',
-        "Access-Control-Expose-Headers": "Content-Disposition",
-        "Cache-Control": "no-cache" # Evita que el navegador cachee nombres viejos
+        "Access-Control-Expose-Headers": "Content-Disposition, ETag",
+        "ETag": etag,
+        "Cache-Control": "private, no-cache" # Siempre revalidar: si la cuota se edita cambia el ETag
     }
+
+    if etag_coincide(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    return StreamingResponse(
-        pdf_buffer, 
+    return Response(
+        content=await obtener_contenido(),
         media_type="application/pdf",
         headers=headers
     )
@@ -136,6 +180,7 @@ async def descargar_comprobante(
 )
 async def registrar_pago_manual(
     id_cuota: int,
+    background_tasks: BackgroundTasks,
     metodo_pago: str = Body(..., embed=True, description="Puede ser 'Efectivo' o 'Transferencia'"), 
     db: Connection = Depends(get_db)
 ):
@@ -143,4 +188,7 @@ async def registrar_pago_manual(
     Registra el pago manual de una cuota.
     El body debe ser un JSON: { "metodo_pago": "Efectivo" }
     """
-    return await marcar_pago_manual(conn=db, id_cuota=id_cuota, metodo_pago=metodo_pago)
+    resultado = await marcar_pago_manual(conn=db, id_cuota=id_cuota, metodo_pago=metodo_pago)
+    # El comprobante queda listo para la primera descarga
+    background_tasks.add_task(precalentar_comprobante, get_db_pool(), id_cuota)
+    return resultado
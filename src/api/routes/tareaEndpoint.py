@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Query
+from asyncpg import Connection
+from typing import List
+
+# --- Dependencias y Sesión ---
+from core.session import get_db
+from api.dependencies.security import admin_required
+
+# --- Schemas y Services ---
+from schemas.tareaSchema import TareaEjecucion, TareaEstado
+from services.tareaServices import estado_tareas, listar_ejecuciones
+
+router = APIRouter(
+    prefix="/tareas",
+    tags=["Tareas programadas"]
+)
+
+@router.get(
+    "/estado",
+    response_model=List[TareaEstado],
+    summary="Estado de las tareas programadas (Admin)",
+    dependencies=[Depends(admin_required)]
+)
+async def obtener_estado_tareas(db: Connection = Depends(get_db)):
+    """
+    Por tarea: cron, próxima ejecución, si algún nodo la está corriendo ahora y el
+    resultado de su última ejecución (duración, filas afectadas, error).
+    """
+    return await estado_tareas(db)
+
+@router.get(
+    "/{nombre}/ejecuciones",
+    response_model=List[TareaEjecucion],
+    summary="Historial de ejecuciones de una tarea (Admin)",
+    dependencies=[Depends(admin_required)]
+)
+async def historial_tarea(
+    nombre: str,
+    limite: int = Query(50, ge=1, le=500),
+    db: Connection = Depends(get_db)
+):
+    return await listar_ejecuciones(db, nombre, limite=limite)
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 
 from pydantic_settings import BaseSettings
 from pydantic import PostgresDsn, SecretStr
@@ -22,23 +23,106 @@ class Settings(BaseSettings):
     PSQL_DB: str
     PSQL_PORT: int
 
+    # -- Réplica de lectura (opcional): estadísticas, listados y exportaciones. Usuario, contraseña
+    #    y base son los del primario. Sin PSQL_REPLICA_SERVER (o si no responde al iniciar) todo va
+    #    al primario. Para probar en local alcanza con otra instancia de Postgres con los mismos datos.
+    PSQL_REPLICA_SERVER: Optional[str] = None
+    PSQL_REPLICA_PORT: Optional[int] = None     # Por defecto PSQL_PORT
+    DB_REPLICA_POOL_MIN_SIZE: int = 2
+    DB_REPLICA_POOL_MAX_SIZE: int = 10
+
+    # -- Pool de conexiones (asyncpg). Conexiones totales = DB_POOL_MAX_SIZE x workers de uvicorn
+    DB_POOL_MIN_SIZE: int = 5
+    DB_POOL_MAX_SIZE: int = 15
+    DB_POOL_MAX_QUERIES: int = 50000            # Consultas antes de reciclar una conexión
+    DB_POOL_MAX_INACTIVE_SECONDS: float = 300.0 # Cierra conexiones ociosas por encima de min_size
+    DB_POOL_ACQUIRE_TIMEOUT: float = 10.0       # Espera máxima por una conexión libre (después 503)
+    DB_CONNECT_TIMEOUT: float = 30.0
+    DB_COMMAND_TIMEOUT: float = 60.0
+    DB_STATEMENT_CACHE_SIZE: int = 100          # Statements preparados por conexión (0 la desactiva)
+    DB_STATEMENT_CACHE_LIFETIME: int = 300
+    DB_PREPARAR_CONSULTAS: bool = True          # Preparar las consultas de core/consultas.py al abrir cada conexión
+
+    # -- Métricas del pool (GET /diagnostico/db) y log de consultas
+    DB_METRICAS: bool = True                    # Contar consultas y aciertos de la caché de statements
+    DB_SLOW_QUERY_MS: float = 500.0             # Loguear consultas más lentas que esto (0 lo desactiva)
+    DB_CONSULTAS_POR_REQUEST: bool = False      # Loguear cantidad y tiempo de consultas de cada request
+
     # -- JWT
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_DAYS: int
 
+    # -- Caché de usuarios autenticados (por proceso). TTL en 0 la desactiva.
+    # Entre workers se invalida por NOTIFY (migración 014 + el listener de CATALOG_CACHE_LISTENER);
+    # sin el listener, otro worker puede seguir usando un usuario borrado o desactivado hasta el TTL.
+    AUTH_CACHE_TTL_SECONDS: int = 30
+    AUTH_CACHE_MAX_ENTRIES: int = 1024
+
+    # -- Caché de catálogos (horarios, trabajos, suscripciones, ubicaciones)
+    CATALOG_CACHE_TTL_SECONDS: int = 600        # Red de seguridad; la invalidación normal es por NOTIFY
+    CATALOG_CACHE_LISTENER: bool = True         # LISTEN en una conexión dedicada (catálogos y usuarios)
+
+    # -- Hashing de contraseñas (bcrypt) fuera del event loop
+    PASSWORD_HASH_WORKERS: int = 2              # Hilos dedicados a bcrypt
+    PASSWORD_HASH_MAX_PENDING: int = 16         # Operaciones en curso + en cola
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = 5.0    # Segundos esperando lugar antes de rechazar
+
     # -- Email (verification service)
     SMTP_SERVER: str
     SMTP_PORT: int
     SMTP_USER: str
     SMTP_PASSWORD: SecretStr
+    SMTP_USE_TLS: bool = True                   # False para un servidor SMTP local de depuración
+    SMTP_TIMEOUT: float = 30.0                  # Segundos por operación SMTP (conexión, cada comando)
     FRONTEND_URL: str
     BACKEND_URL: str
 
+    # -- Outbox de emails (envío en segundo plano)
+    EMAIL_OUTBOX_WORKER: bool = True            # Levantar el sender dentro de la app
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_SECONDS: float = 5.0
+    EMAIL_MAX_INTENTOS: int = 5
+    EMAIL_RETRY_BASE_SECONDS: int = 30          # Backoff: base * 2^(intento-1)
+
     # -- Mercado Pago
     MP_ACCESS_TOKEN_ADM: SecretStr
     MP_ACCESS_TOKEN_EMP: SecretStr
+    MP_API_URL: str = "https://api.mercadopago.com"   # Apuntar a scripts/fake_mercadopago.py para pruebas locales
+    MP_HTTP_TIMEOUT: float = 10.0
+    MP_HTTP_MAX_CONNECTIONS: int = 20
+
+    # -- Webhooks de pago (inbox + verificación en segundo plano)
+    PAGO_WEBHOOK_WORKER: bool = True            # Levantar el worker dentro de la app
+    PAGO_WEBHOOK_CONCURRENCIA: int = 8          # Verificaciones contra MP en paralelo
+    PAGO_WEBHOOK_BATCH_SIZE: int = 50
+    PAGO_WEBHOOK_POLL_SECONDS: float = 5.0
+    PAGO_WEBHOOK_MAX_INTENTOS: int = 8
+    PAGO_WEBHOOK_RETRY_BASE_SECONDS: int = 15   # Backoff: base * 2^(intento-1)
+
+    # -- Generación de PDFs (reportlab) en procesos aparte
+    PDF_WORKERS: int = 2                        # Procesos del pool
+    PDF_MAX_PENDING: int = 8                    # PDFs en curso + en cola
+    PDF_QUEUE_TIMEOUT: float = 10.0             # Segundos esperando lugar antes de rechazar
+    PDF_RENDER_TIMEOUT: float = 60.0            # Tiempo máximo de una generación
+
+    # -- Comprobantes de pago PDF (se generan una vez y se guardan por contenido)
+    COMPROBANTES_DIR: str = str(env_path.parent / "public" / "pdf" / "comprobantes")
+    COMPROBANTES_GRACIA_SEGUNDOS: int = 300     # Al guardar una versión nueva se borran las viejas pasado este tiempo
+
+    # -- Estado de pago en vivo (SSE alimentado por LISTEN/NOTIFY)
+    PAGO_EVENTOS_LISTENER: bool = True          # LISTEN en una conexión dedicada del pool
+    PAGO_SSE_KEEPALIVE_SECONDS: float = 15.0    # Comentario SSE para que proxies no corten el stream
+    PAGO_SSE_MAX_SECONDS: int = 900             # Después se cierra; EventSource reconecta solo
+
+    # -- Tareas programadas (services/tareaServices.py). Cron en formato crontab de 5 campos.
+    SCHEDULER_EN_APP: bool = False              # Correr el planificador también dentro de la API
+    SCHEDULER_ZONA_HORARIA: str = "America/Argentina/Buenos_Aires"
+    SCHEDULER_CRON_CUOTAS: str = "0 0 2 * *"            # Generación mensual de cuotas
+    SCHEDULER_CRON_CIERRE: str = "30 0 1,16 * *"        # Cierre quincenal (la quincena ya terminada)
+    SCHEDULER_SHUTDOWN_TIMEOUT: float = 300.0   # Espera máxima a las tareas en curso al apagar
+    SCHEDULER_LOG_FILE: Optional[str] = None    # Además de stdout (run_scheduler.py)
 
     # -- NGROK
     # URL_NGROK: str
@@ -53,6 +137,19 @@ class Settings(BaseSettings):
             port=self.PSQL_PORT,
             path=self.PSQL_DB
         )
+
+    @property
+    def DATABASE_REPLICA_URL(self) -> Optional[PostgresDsn]:
+        if not self.PSQL_REPLICA_SERVER:
+            return None
+        return PostgresDsn.build(
+            scheme="postgresql",
+            username=self.PSQL_USER,
+            password=self.PSQL_PASSWORD.get_secret_value(),
+            host=self.PSQL_REPLICA_SERVER,
+            port=self.PSQL_REPLICA_PORT or self.PSQL_PORT,
+            path=self.PSQL_DB
+        )
     
     class Config:
         env_file = env_path
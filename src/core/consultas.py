@@ -0,0 +1,146 @@
+import bisect
+import logging
+import time
+import weakref
+from typing import Dict, List, Optional
+
+from asyncpg import Connection
+from asyncpg.exceptions import InvalidCachedStatementError, OutdatedSchemaCacheError
+from asyncpg.pool import PoolConnectionProxy
+from asyncpg.prepared_stmt import PreparedStatement
+
+from core.config import settings
+from core.metricas_db import registrar_consulta
+
+# Límites superiores (ms) de los intervalos del histograma de latencia; el último es "más lento"
+LIMITES_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+class Consulta:
+    """
+    Sentencia frecuente registrada con un nombre (ver `registrar`). Se prepara una vez por
+    conexión (en el `init` del pool, o la primera vez que se usa en esa conexión) y se ejecuta
+    con el PreparedStatement, sin pasar por el parseo ni por la caché de statements de asyncpg.
+    Lleva la cuenta de llamadas, errores y un histograma de latencia por sentencia.
+    """
+
+    def __init__(self, nombre: str, sql: str):
+        self.nombre = nombre
+        self.sql = sql
+        self.llamadas = 0
+        self.errores = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histograma = [0] * (len(LIMITES_MS) + 1)
+
+    async def fetch(self, conn, *args) -> list:
+        return await self._ejecutar(conn, "fetch", args)
+
+    async def fetchrow(self, conn, *args):
+        return await self._ejecutar(conn, "fetchrow", args)
+
+    async def fetchval(self, conn, *args):
+        return await self._ejecutar(conn, "fetchval", args)
+
+    async def _ejecutar(self, conn, metodo: str, args: tuple):
+        conn = await _conexion_real(conn)
+        inicio = time.perf_counter()
+        try:
+            try:
+                stmt = await _preparada(conn, self)
+                return await getattr(stmt, metodo)(*args)
+            except (InvalidCachedStatementError, OutdatedSchemaCacheError):
+                # Cambió el esquema (migración) desde que se preparó: se prepara de nuevo.
+                # Dentro de una transacción el error ya la abortó; la reintenta el que llama.
+                _preparadas.get(conn, {}).pop(self.nombre, None)
+                if conn.is_in_transaction():
+                    raise
+                stmt = await _preparada(conn, self, recrear=True)
+                return await getattr(stmt, metodo)(*args)
+        except Exception:
+            self.errores += 1
+            raise
+        finally:
+            self._registrar((time.perf_counter() - inicio) * 1000, conn)
+
+    def _registrar(self, ms: float, conn: Connection) -> None:
+        self.llamadas += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.histograma[bisect.bisect_left(LIMITES_MS, ms)] += 1
+        # Los PreparedStatement no pasan por los query loggers de la conexión
+        if hasattr(conn, "consultas"):
+            conn.consultas += 1
+        registrar_consulta(ms, self.sql)
+
+    def percentil(self, p: float) -> Optional[float]:
+        """Aproximado: límite superior del intervalo del histograma donde cae el percentil."""
+        if not self.llamadas:
+            return None
+        objetivo = p / 100 * self.llamadas
+        acumulado = 0
+        for i, cantidad in enumerate(self.histograma):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return float(LIMITES_MS[i]) if i < len(LIMITES_MS) else self.max_ms
+        return self.max_ms
+
+    def perfil(self) -> dict:
+        etiquetas = [f"<={l}ms" for l in LIMITES_MS] + [f">{LIMITES_MS[-1]}ms"]
+        return {
+            "nombre": self.nombre,
+            "llamadas": self.llamadas,
+            "errores": self.errores,
+            "totalMs": round(self.total_ms, 3),
+            "promedioMs": round(self.total_ms / self.llamadas, 3) if self.llamadas else None,
+            "p50Ms": self.percentil(50),
+            "p95Ms": self.percentil(95),
+            "p99Ms": self.percentil(99),
+            "maxMs": round(self.max_ms, 3),
+            "histograma": dict(zip(etiquetas, self.histograma)),
+        }
+
+# Registro central: nombre -> Consulta (se llena al importar los servicios)
+REGISTRO: Dict[str, Consulta] = {}
+
+def registrar(nombre: str, sql: str) -> Consulta:
+    """Registra una sentencia frecuente con un nombre único y la devuelve para usarla."""
+    if nombre in REGISTRO:
+        raise ValueError(f"Ya hay una consulta registrada como '{nombre}'")
+    consulta = Consulta(nombre, sql)
+    REGISTRO[nombre] = consulta
+    return consulta
+
+# Sentencias preparadas de cada conexión física (se liberan junto con la conexión)
+_preparadas: "weakref.WeakKeyDictionary[Connection, Dict[str, PreparedStatement]]" = weakref.WeakKeyDictionary()
+
+async def _conexion_real(conn) -> Connection:
+    if hasattr(type(conn), "adquirir"):         # core/session.ConexionDiferida
+        conn = await conn.adquirir()
+    if isinstance(conn, PoolConnectionProxy):
+        conn = conn._con
+    return conn
+
+async def _preparada(conn: Connection, consulta: Consulta, recrear: bool = False) -> PreparedStatement:
+    sentencias = _preparadas.setdefault(conn, {})
+    stmt = sentencias.get(consulta.nombre)
+    if stmt is None or recrear:
+        stmt = await conn.prepare(consulta.sql)
+        sentencias[consulta.nombre] = stmt
+    return stmt
+
+async def preparar_consultas(conn: Connection) -> None:
+    """
+    Hook `init` del pool: prepara todas las consultas registradas en cada conexión nueva.
+    Si alguna falla (p. ej. falta una migración) se loguea y esa se prepara al usarla.
+    """
+    if not settings.DB_PREPARAR_CONSULTAS:
+        return
+    for consulta in list(REGISTRO.values()):
+        try:
+            await _preparada(conn, consulta)
+        except Exception as e:
+            logging.warning(f"[DB] No se pudo preparar la consulta '{consulta.nombre}': {e}")
+
+def perfil_consultas() -> List[dict]:
+    """Perfil de cada consulta registrada, de mayor a menor tiempo total."""
+    return sorted((c.perfil() for c in REGISTRO.values()), key=lambda p: p["totalMs"], reverse=True)
@@ -0,0 +1,131 @@
+import logging
+import os
+import weakref
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from asyncpg import Connection, Pool
+
+from core.config import settings
+
+@dataclass
+class ConsultasRequest:
+    """Consultas hechas durante un request (lo carga ConsultasPorRequestMiddleware)."""
+    ruta: str
+    cantidad: int = 0
+    tiempo_ms: float = 0.0
+
+consultas_request: ContextVar[Optional[ConsultasRequest]] = ContextVar("consultas_request", default=None)
+
+def _percentil(ordenados, p: float) -> float:
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+class MetricasDb:
+    """
+    Contadores del pool de este proceso (cada worker de uvicorn tiene los suyos).
+    Las esperas de adquisición se miden en core/session.adquirir_conexion; las consultas y la
+    caché de statements, en ConexionInstrumentada.
+    """
+
+    def __init__(self, muestras: int = 2048):
+        self.esperas_ms = deque(maxlen=muestras)    # Últimas esperas para obtener conexión
+        self.adquisiciones = 0
+        self.timeouts = 0
+        self.esperando = 0                          # Requests esperando conexión ahora mismo
+        self.consultas = 0
+        self.consultas_lentas = 0
+        self.statements_hit = 0
+        self.statements_miss = 0
+
+    def registrar_espera(self, ms: float) -> None:
+        self.adquisiciones += 1
+        self.esperas_ms.append(ms)
+
+    def resumen(self, pool: Pool, replica: Optional[Pool] = None) -> dict:
+        esperas = sorted(self.esperas_ms)
+        conexiones = [c.consultas for c in ConexionInstrumentada.abiertas if not c.is_closed()]
+        preparados = self.statements_hit + self.statements_miss
+        return {
+            "pid": os.getpid(),
+            "tamanio": pool.get_size(),
+            "minimo": pool.get_min_size(),
+            "maximo": pool.get_max_size(),
+            "enUso": pool.get_size() - pool.get_idle_size(),
+            "libres": pool.get_idle_size(),
+            "esperando": self.esperando,
+            "adquisiciones": self.adquisiciones,
+            "timeoutsAdquisicion": self.timeouts,
+            "esperaP50Ms": _percentil(esperas, 50),
+            "esperaP95Ms": _percentil(esperas, 95),
+            "esperaP99Ms": _percentil(esperas, 99),
+            "esperaMaxMs": esperas[-1] if esperas else 0.0,
+            "consultas": self.consultas,
+            "consultasLentas": self.consultas_lentas,
+            "consultasPorConexionPromedio": sum(conexiones) / len(conexiones) if conexiones else 0.0,
+            "consultasPorConexionMax": max(conexiones, default=0),
+            "statementCacheTamanio": settings.DB_STATEMENT_CACHE_SIZE,
+            "statementCacheHits": self.statements_hit,
+            "statementCacheMisses": self.statements_miss,
+            "statementCacheHitRate": self.statements_hit / preparados if preparados else None,
+            # Las esperas y consultas de arriba suman ambos pools; esto es solo la ocupación
+            "replica": {
+                "tamanio": replica.get_size(),
+                "maximo": replica.get_max_size(),
+                "enUso": replica.get_size() - replica.get_idle_size(),
+                "libres": replica.get_idle_size(),
+            } if replica else None,
+        }
+
+metricas_db = MetricasDb()
+
+def registrar_consulta(ms: float, query: str) -> None:
+    """Suma una consulta al total, al request en curso y, si es lenta, la loguea."""
+    metricas_db.consultas += 1
+
+    request = consultas_request.get()
+    if request:
+        request.cantidad += 1
+        request.tiempo_ms += ms
+
+    if settings.DB_SLOW_QUERY_MS and ms >= settings.DB_SLOW_QUERY_MS:
+        metricas_db.consultas_lentas += 1
+        consulta = " ".join(query.split())[:500]
+        origen = f" [{request.ruta}]" if request else ""
+        logging.warning(f"[DB] Consulta lenta ({ms:.0f} ms){origen}: {consulta}")
+
+class ConexionInstrumentada(Connection):
+    """
+    Conexión de asyncpg que cuenta sus consultas, loguea las lentas (DB_SLOW_QUERY_MS) y suma
+    al contador del request en curso. Se usa como `connection_class` del pool con DB_METRICAS.
+
+    Los aciertos de la caché de statements se miden sobre `_get_statement` y `_stmt_cache`,
+    que son internos de asyncpg (versión fijada en requirements.txt).
+    """
+
+    abiertas = weakref.WeakSet()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.consultas = 0
+        self.add_query_logger(self._registrar_consulta)
+        ConexionInstrumentada.abiertas.add(self)
+
+    async def _get_statement(self, query, timeout, *, record_class=None, ignore_custom_codec=False, use_cache=True, **kwargs):
+        if use_cache and self._stmt_cache_enabled:
+            clave = (query, record_class or self._protocol.get_record_class(), ignore_custom_codec)
+            if self._stmt_cache.get(clave, promote=False) is not None:
+                metricas_db.statements_hit += 1
+            else:
+                metricas_db.statements_miss += 1
+        return await super()._get_statement(
+            query, timeout, record_class=record_class,
+            ignore_custom_codec=ignore_custom_codec, use_cache=use_cache, **kwargs
+        )
+
+    def _registrar_consulta(self, registro) -> None:
+        self.consultas += 1
+        registrar_consulta(registro.elapsed * 1000, registro.query)
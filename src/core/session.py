@@ -3,42 +3,185 @@ from asyncpg import create_pool, Pool, Connection
 
 # imports modules app
 from core.config import settings
+from core.metricas_db import ConexionInstrumentada, metricas_db
+from core.consultas import preparar_consultas
+from utils.exceptions import ServiceUnavailableException
 
 # imports python
-from typing import AsyncGenerator
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Optional
 
-# variable global para el pool de conexiones
+# variables globales para los pools de conexiones (primario y réplica de lectura opcional)
 _db_pool: Pool = None
+_db_read_pool: Optional[Pool] = None
 
 # funcióon asíncrona para crear un pool de conexiones a la base de datos
-async def create_db_pool() -> Pool:
+async def create_db_pool(replica: bool = False) -> Pool:
+    server_settings = {
+        'search_path': 'public'
+    }
+    if replica:
+        # Red de seguridad: un servicio que escriba por error en la réplica falla enseguida
+        server_settings['default_transaction_read_only'] = 'on'
+
     return await create_pool(
-        dsn=settings.DATABASE_URL.unicode_string(),
-        min_size=5,
-        max_size=15,
-        timeout=30,
-        command_timeout=60,
-        max_inactive_connection_lifetime=300,
-        server_settings = {
-            'search_path': 'public'
-        }
+        dsn=(settings.DATABASE_REPLICA_URL if replica else settings.DATABASE_URL).unicode_string(),
+        min_size=settings.DB_REPLICA_POOL_MIN_SIZE if replica else settings.DB_POOL_MIN_SIZE,
+        max_size=settings.DB_REPLICA_POOL_MAX_SIZE if replica else settings.DB_POOL_MAX_SIZE,
+        max_queries=settings.DB_POOL_MAX_QUERIES,
+        timeout=settings.DB_CONNECT_TIMEOUT,
+        command_timeout=settings.DB_COMMAND_TIMEOUT,
+        max_inactive_connection_lifetime=settings.DB_POOL_MAX_INACTIVE_SECONDS,
+        statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+        max_cached_statement_lifetime=settings.DB_STATEMENT_CACHE_LIFETIME,
+        connection_class=ConexionInstrumentada if settings.DB_METRICAS else Connection,
+        init=preparar_consultas,
+        server_settings=server_settings
     )
 
 async def connect_to_db() -> None:
-    global _db_pool
+    global _db_pool, _db_read_pool
     _db_pool = await create_db_pool()
 
+    if settings.DATABASE_REPLICA_URL:
+        try:
+            _db_read_pool = await create_db_pool(replica=True)
+        except Exception as e:
+            # Sin réplica la app funciona igual: las lecturas van al primario
+            logging.warning(f"[DB] No se pudo conectar a la réplica de lectura, se usa el primario: {e}")
+            _db_read_pool = None
+
+def get_db_pool() -> Pool:
+    """Devuelve el pool global (para workers en segundo plano que no pasan por Depends)."""
+    return _db_pool
+
+def get_read_db_pool() -> Pool:
+    """Pool de la réplica de lectura, o el primario si no hay réplica configurada."""
+    return _db_read_pool or _db_pool
+
+def get_replica_pool() -> Optional[Pool]:
+    """Pool de la réplica (None si no hay); para métricas."""
+    return _db_read_pool
+
 async def close_db_connection() -> None:
+    global _db_read_pool
+    if _db_read_pool:
+        await _db_read_pool.close()
+        _db_read_pool = None
     if _db_pool:
         await _db_pool.close()
 
+async def adquirir_conexion(pool: Optional[Pool] = None) -> Connection:
+    """
+    Toma una conexión del pool midiendo la espera (core/metricas_db.py). Si no hay una libre
+    en DB_POOL_ACQUIRE_TIMEOUT segundos responde 503 en lugar de colgar el request.
+    """
+    pool = pool or _db_pool
+    metricas_db.esperando += 1
+    inicio = time.perf_counter()
+    try:
+        conn = await pool.acquire(timeout=settings.DB_POOL_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        metricas_db.timeouts += 1
+        raise ServiceUnavailableException("No hay conexiones a la base de datos disponibles, intente nuevamente")
+    finally:
+        metricas_db.esperando -= 1
+    metricas_db.registrar_espera((time.perf_counter() - inicio) * 1000)
+    return conn
+
 # función de conexion a la DB, para inyección de dependencias
 async def get_db() -> AsyncGenerator[Connection, None]:
-    async with _db_pool.acquire() as conn:
+    conn = await adquirir_conexion()
+    try:
+        yield conn
+    finally:
+        await _db_pool.release(conn)
+
+# Conexión de solo lectura (réplica si hay) para estadísticas, listados y exportaciones.
+# La réplica puede ir unos instantes atrasada: no usar para leer algo recién escrito.
+async def get_read_db() -> AsyncGenerator[Connection, None]:
+    pool = get_read_db_pool()
+    conn = await adquirir_conexion(pool)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+class ConexionDiferida:
+    """
+    Proveedor de conexión que no ocupa el pool hasta la primera consulta y la devuelve
+    apenas termina el trabajo con la base, sin esperar al fin del request.
+
+    Para handlers que además hacen I/O externo lento (MercadoPago, PDFs): las consultas van
+    dentro de `async with db.conexion() as conn:` y la llamada externa fuera del bloque.
+    También acepta fetch/fetchrow/fetchval/execute/executemany/transaction directamente
+    (toman la conexión si hace falta); liberar() la devuelve al pool.
+    """
+
+    def __init__(self, pool: Optional[Pool] = None):
+        self._pool = pool or _db_pool
+        self._conn: Optional[Connection] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def adquirida(self) -> bool:
+        return self._conn is not None
+
+    async def adquirir(self) -> Connection:
+        async with self._lock:
+            if self._conn is None:
+                self._conn = await adquirir_conexion(self._pool)
+            return self._conn
+
+    async def liberar(self) -> None:
+        async with self._lock:
+            conn, self._conn = self._conn, None
+            if conn is not None:
+                await self._pool.release(conn)
+
+    @asynccontextmanager
+    async def conexion(self) -> AsyncIterator[Connection]:
+        conn = await self.adquirir()
         try:
             yield conn
         finally:
-            pass
+            await self.liberar()
+
+    @asynccontextmanager
+    async def transaction(self, **kwargs) -> AsyncIterator[Connection]:
+        conn = await self.adquirir()
+        async with conn.transaction(**kwargs):
+            yield conn
+
+    async def fetch(self, query: str, *args, **kwargs):
+        return await (await self.adquirir()).fetch(query, *args, **kwargs)
+
+    async def fetchrow(self, query: str, *args, **kwargs):
+        return await (await self.adquirir()).fetchrow(query, *args, **kwargs)
+
+    async def fetchval(self, query: str, *args, **kwargs):
+        return await (await self.adquirir()).fetchval(query, *args, **kwargs)
+
+    async def execute(self, query: str, *args, **kwargs):
+        return await (await self.adquirir()).execute(query, *args, **kwargs)
 
+    async def executemany(self, command: str, args, **kwargs):
+        return await (await self.adquirir()).executemany(command, args, **kwargs)
 
+# Variante diferida de get_db: la conexión se toma recién si el handler consulta la base
+async def get_db_diferida() -> AsyncGenerator[ConexionDiferida, None]:
+    db = ConexionDiferida()
+    try:
+        yield db
+    finally:
+        await db.liberar()
 
+async def get_read_db_diferida() -> AsyncGenerator[ConexionDiferida, None]:
+    db = ConexionDiferida(get_read_db_pool())
+    try:
+        yield db
+    finally:
+        await db.liberar()
@@ -3,10 +3,6 @@ from fastapi import FastAPI, Request, status
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-# Cron Job
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-
 # Imports Dependencies
 from api.dependencies.auth import get_current_user
 
@@ -15,10 +11,18 @@ from contextlib import asynccontextmanager
 
 # imports EXCEPTIONS
 from utils.exceptions import AppException
+from utils.security import shutdown_hash_executor
+from utils.pdf import shutdown_pdf_executor
 
 # imports settings, session
 from core.config import settings, env_path
-from core.session import connect_to_db, close_db_connection, get_db
+from core.session import connect_to_db, close_db_connection, get_db_pool
+from utils.email import EmailOutboxSender
+from utils.cache import CacheListener
+from utils.mercadopago import mp_client
+from utils.eventos_pago import PagoEstadoListener
+from services.pagoServices import PagoWebhookWorker
+from services.tareaServices import PlanificadorTareas
 
 # imports endPoints
 from api.routes.suscripcionEndpoint import router as suscripcion_endpoint       # suscripcion
@@ -35,33 +39,13 @@ from api.routes.avisoEndpoint import router as aviso_endpoint
 from api.routes.empleadoEndpoint import router as empleado_endpoint             # empleados
 from api.routes.pagosEndpoint import router as pagos_endpoint                   # MercadoPago
 from api.routes.facturacionEndpoint import router as facturacion_endpoint       # Facturacion
+from api.routes.tareaEndpoint import router as tarea_endpoint                   # tareas programadas
+from api.routes.diagnosticoEndpoint import router as diagnostico_endpoint       # métricas del pool
+from api.middleware.consultasDb import ConsultasPorRequestMiddleware
 
 from api.routes.adminExample import router as admin_example_endpoint            # ejemplo admin
 from api.routes.alumnosExample import router as alumnos_example_endpoint        # ejemplo alumnos
 
-from services.cuotaServices import generar_cuotas_masivas_mensuales
-from services.facturacionServices import procesar_cierre_automatico
-
-
-# FUNCIONES WRAPPER -----------
-async def tarea_generar_cuotas():
-    """Esta función se ejecutará automáticamente el día 5."""
-    print("[Scheduler] Iniciando generación automática de cuotas...")
-    async for db in get_db(): # Obtenemos conexión del pool
-        cantidad = await generar_cuotas_masivas_mensuales(db)
-        if cantidad > 0:
-            print(f"[Scheduler] Se generaron {cantidad} cuotas.")
-        break
-
-async def tarea_cierre_facturacion():
-    """Se ejecuta el día 1 y 15 para cerrar la facturación."""
-    print("[Scheduler] Iniciando cierre de facturación automático...")
-    # Usamos el generador de dependencias tal como en tarea_generar_cuotas
-    async for db in get_db(): 
-        await procesar_cierre_automatico(db)
-        break # Importante: romper el bucle ya que get_db es un generador
-# ------------------------------
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 1. INICIO DE LA APP
@@ -70,33 +54,68 @@ async def lifespan(app: FastAPI):
     await connect_to_db()
     print("Conexión a la base de datos establecida")
 
-    # B) Iniciar Scheduler (LO NUEVO)
-    # scheduler = AsyncIOScheduler()
-
-    # scheduler.add_job(
-    #     tarea_generar_cuotas, 
-    #     CronTrigger(day=5, hour=0, minute=0), # Día 5 de cada mes a las 08:00 hs
-    #     id="generacion_cuotas_mensual"
-    # )
+    # B) Sender de emails en segundo plano (outbox)
+    email_sender = None
+    if settings.EMAIL_OUTBOX_WORKER:
+        email_sender = EmailOutboxSender(get_db_pool())
+        email_sender.start()
+        print("Sender de emails (outbox) iniciado")
+
+    # Invalidación de las cachés de catálogos y de usuarios entre workers (LISTEN/NOTIFY)
+    catalogo_listener = None
+    if settings.CATALOG_CACHE_LISTENER:
+        catalogo_listener = CacheListener(get_db_pool())
+        catalogo_listener.start()
+
+    # Verificación de webhooks de MercadoPago en segundo plano (inbox)
+    pago_worker = None
+    if settings.PAGO_WEBHOOK_WORKER:
+        pago_worker = PagoWebhookWorker(get_db_pool())
+        pago_worker.start()
+        print("Worker de webhooks de pago iniciado")
+
+    # Avisos de cambio de estado de pago para los streams SSE (LISTEN/NOTIFY)
+    pago_listener = None
+    if settings.PAGO_EVENTOS_LISTENER:
+        pago_listener = PagoEstadoListener(get_db_pool())
+        pago_listener.start()
+
+    # Tareas programadas (cuotas, cierre de facturación). Es seguro en varios workers:
+    # cada disparo corre en uno solo (advisory lock). Normalmente corre en run_scheduler.py.
+    planificador = None
+    if settings.SCHEDULER_EN_APP:
+        planificador = PlanificadorTareas(get_db_pool())
+        planificador.start()
+        print("Planificador de tareas (Scheduler) iniciado.")
 
-    # scheduler.add_job(
-    #     tarea_cierre_facturacion,
-    #     CronTrigger(day='1,15', hour=23, minute=30),
-    #     id="cierre_facturacion_auto"
-    # )
-    
-    # scheduler.start()
-    print("Planificador de tareas (Scheduler) iniciado.")
-    
     yield # <--- Aquí la app corre y recibe peticiones
     
     # 2. APAGADO DE LA APP
     
-    # C) Apagar Scheduler (LO NUEVO)
-    print("Deteniendo planificador...")
-    # scheduler.shutdown()
+    # C) Apagar Scheduler (espera a las tareas en curso)
+    if planificador:
+        print("Deteniendo planificador...")
+        await planificador.stop()
     
-    # D) Desconectar Base de Datos (TU CÓDIGO ACTUAL)
+    # Detener el sender de emails (termina el lote en curso)
+    if email_sender:
+        await email_sender.stop()
+
+    if catalogo_listener:
+        await catalogo_listener.stop()
+
+    # Detener el worker de pagos (termina el lote en curso) y cerrar el cliente HTTP de MP
+    if pago_worker:
+        await pago_worker.stop()
+    if pago_listener:
+        await pago_listener.stop()
+    await mp_client.close()
+
+    # D) Liberar los pools de hashing de contraseñas y de PDFs
+    shutdown_hash_executor()
+    shutdown_pdf_executor()
+
+    # E) Desconectar Base de Datos (TU CÓDIGO ACTUAL)
     await close_db_connection()
     print("Conexión a la base de datos cerrada")
 
@@ -125,6 +144,10 @@ app.add_middleware(
     allow_headers=["*"],  # Encabezados permitidos
 )
 
+# Log de consultas a la base por request (para dimensionar el pool con tráfico real)
+if settings.DB_CONSULTAS_POR_REQUEST:
+    app.add_middleware(ConsultasPorRequestMiddleware)
+
 # Handler global para excepciones personalizadas
 @app.exception_handler(AppException)
 async def app_exception_handler(request: Request, exc: AppException):
@@ -134,7 +157,8 @@ async def app_exception_handler(request: Request, exc: AppException):
             "error": exc.detail,
             "type": exc.__class__.__name__,
             "status": exc.status_code
-        }
+        },
+        headers=exc.headers
     )
 
 # Handler para excepciones generales (opcional pero recomendado)
@@ -167,6 +191,8 @@ app.include_router(aviso_endpoint)
 app.include_router(empleado_endpoint)
 app.include_router(pagos_endpoint)
 app.include_router(facturacion_endpoint)
+app.include_router(tarea_endpoint)
+app.include_router(diagnostico_endpoint)
 
 if __name__ == "__main__":
     import uvicorn
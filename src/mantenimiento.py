@@ -0,0 +1,96 @@
+"""
+Comandos de mantenimiento de la base de datos (se ejecutan desde src/):
+
+    python mantenimiento.py kpis-reconstruir
+    python mantenimiento.py ocupacion-verificar [--reparar]
+    python mantenimiento.py cuotas-generar [--simular] [--fecha AAAA-MM-DD]
+    python mantenimiento.py tarea-ejecutar {generacion_cuotas_mensual,cierre_facturacion_auto}
+"""
+import argparse
+import asyncio
+import logging
+from datetime import date
+
+from core.session import connect_to_db, close_db_connection, get_db, get_db_pool
+
+from services.estadisticasService import reconstruir_kpi_snapshot
+from services.horarioServices import verificar_ocupacion
+from services.cuotaServices import generar_cuotas_masivas_mensuales, simular_generacion_cuotas
+from services.tareaServices import TAREAS, ejecutar_tarea
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+async def cmd_kpis_reconstruir(db, args):
+    """Recalcula "KpiCuotaMensual" y "KpiCuotaVencimiento" desde "Cuota"."""
+    await reconstruir_kpi_snapshot(db)
+    logging.info("Snapshot de KPIs reconstruido.")
+
+async def cmd_ocupacion_verificar(db, args):
+    """Compara "Pertenece".inscritos con "Asiste" (y corrige con --reparar)."""
+    desvios = await verificar_ocupacion(db, reparar=args.reparar)
+    for d in desvios:
+        logging.warning(f"Grupo {d['nroGrupo']} {d['dia']}: contador={d['registrado']} real={d['real']}")
+    if not desvios:
+        logging.info("Contadores de ocupación correctos.")
+    elif args.reparar:
+        logging.info(f"{len(desvios)} cupos reparados.")
+    else:
+        logging.info(f"{len(desvios)} cupos desfasados. Correr con --reparar para corregirlos.")
+
+async def cmd_cuotas_generar(db, args):
+    """Genera las cuotas del mes para los alumnos activos (o las lista con --simular)."""
+    if args.simular:
+        simulacion = await simular_generacion_cuotas(db, fecha=args.fecha)
+        for cuota in simulacion.cuotas:
+            logging.info(f"{cuota.dni}: {cuota.monto:.2f} ({cuota.nombreSuscripcion}, titular {cuota.titular})")
+        logging.info(f"Se generarían {simulacion.cantidad} cuotas de {simulacion.mes} por {simulacion.montoTotal:.2f}.")
+        return
+    generadas = await generar_cuotas_masivas_mensuales(db, fecha=args.fecha)
+    logging.info(f"Se generaron {generadas} cuotas.")
+
+async def cmd_tarea_ejecutar(db, args):
+    """Ejecuta ahora una tarea programada (con su lock y registro en "TareaEjecucion")."""
+    ejecucion = await ejecutar_tarea(get_db_pool(), TAREAS[args.tarea])
+    if ejecucion is None:
+        logging.warning(f"{args.tarea} se está ejecutando en otro nodo; no se corrió.")
+    elif ejecucion.estado == "ok":
+        logging.info(f"{args.tarea}: ok en {ejecucion.duracionMs} ms ({ejecucion.filas} filas).")
+    else:
+        logging.error(f"{args.tarea}: {ejecucion.error}")
+
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Mantenimiento de la base de datos de Gym Abito")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("kpis-reconstruir", help=cmd_kpis_reconstruir.__doc__)
+    p.set_defaults(func=cmd_kpis_reconstruir)
+
+    p = sub.add_parser("ocupacion-verificar", help=cmd_ocupacion_verificar.__doc__)
+    p.add_argument("--reparar", action="store_true", help="Corregir los contadores desfasados")
+    p.set_defaults(func=cmd_ocupacion_verificar)
+
+    p = sub.add_parser("cuotas-generar", help=cmd_cuotas_generar.__doc__)
+    p.add_argument("--simular", action="store_true", help="Solo listar las cuotas que se generarían")
+    p.add_argument("--fecha", type=date.fromisoformat, help="Fecha de comienzo de las cuotas (hoy por defecto)")
+    p.set_defaults(func=cmd_cuotas_generar)
+
+    p = sub.add_parser("tarea-ejecutar", help=cmd_tarea_ejecutar.__doc__)
+    p.add_argument("tarea", choices=sorted(TAREAS))
+    p.set_defaults(func=cmd_tarea_ejecutar)
+
+    return parser
+
+async def main(args):
+    await connect_to_db()
+    try:
+        async for db in get_db():
+            await args.func(db, args)
+            break
+    finally:
+        await close_db_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main(crear_parser().parse_args()))
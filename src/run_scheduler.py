@@ -1,86 +1,47 @@
+"""
+Planificador de tareas como servicio aparte (se ejecuta desde src/):
+
+    python run_scheduler.py
+
+Corre las tareas de services/tareaServices.py según SCHEDULER_CRON_*. Se puede levantar en
+más de un nodo: cada disparo lo ejecuta uno solo (advisory lock) y queda en "TareaEjecucion".
+Con SIGTERM/SIGINT deja de disparar y espera a las tareas en curso antes de salir.
+"""
 import asyncio
 import logging
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-from core.session import connect_to_db, close_db_connection, get_db
+import signal
+
+from core.config import settings
+from core.session import connect_to_db, close_db_connection, get_db_pool
+from services.tareaServices import PlanificadorTareas
 
-# Importamos la función de generación de cuotas
-# Asegúrate de que la ruta sea correcta según tu estructura
-from services.cuotaServices import generar_cuotas_masivas_mensuales 
-from services.facturacionServices import procesar_cierre_automatico
+handlers = [logging.StreamHandler()]
+if settings.SCHEDULER_LOG_FILE:
+    handlers.append(logging.FileHandler(settings.SCHEDULER_LOG_FILE))
 
-# Configuración de Logging
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("/var/www/gym_abito/backend/scheduler.log"),
-        logging.StreamHandler()
-    ]
+    handlers=handlers
 )
 
-async def tarea_generar_cuotas():
-    """Esta función se ejecutará automáticamente."""
-    logging.info("[Scheduler] Iniciando generación automática de cuotas...")
-    try:
-        # Usamos el generador de dependencias manualmente
-        async for db in get_db():
-            cantidad = await generar_cuotas_masivas_mensuales(db)
-            if cantidad > 0:
-                logging.info(f"Scheduler Se generaron {cantidad} cuotas.")
-            else:
-                logging.info("Scheduler No hubo cuotas para generar hoy.")
-            break # Importante romper el loop del generador
-    except Exception as e:
-        logging.error(f"Scheduler Error generando cuotas: {e}")
-
-async def tarea_cierre_facturacion():
-    """Se ejecuta el día 1 y 15 para cerrar la facturación."""
-    logging.info("Scheduler Iniciando cierre de facturación automático...")
-    try:
-        async for db in get_db(): 
-            await procesar_cierre_automatico(db)
-            logging.info("Scheduler Cierre de facturación finalizado con éxito.")
-            break 
-    except Exception as e:
-        logging.error(f"Scheduler Error en cierre de facturación: {e}")
-
 async def main():
-    # 1. Iniciar conexión a DB
-    await connect_to_db()
-    
-    # 2. Configurar Scheduler
-    scheduler = AsyncIOScheduler()
-    
-    # Tarea: Generar Cuotas
-    scheduler.add_job(
-        tarea_generar_cuotas, 
-        CronTrigger(day=2, hour=0, minute=0),
-        id="generacion_cuotas_mensual"
-    )
+    detener = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, detener.set)
 
-    # Tarea: Generar Cierre quincenal (Dias 1 y 15 a las 23:30)
-    scheduler.add_job(
-        tarea_cierre_facturacion,
-        CronTrigger(day='1,15', hour=23, minute=30),
-        id="cierre_facturacion_auto"
-    )
-
-    # 3. Iniciar
-    scheduler.start()
-    logging.info("Scheduler iniciado y esperando tareas...")
-    
-    # 4. Informe de tiempo (AQUI ES EL LUGAR CORRECTO)
-    for job in scheduler.get_jobs():
-        logging.info(f"Tarea '{job.name}' proxima ejecucion: {job.next_run_time}")
-    
-    # Mantener el script vivo infinitamente
+    await connect_to_db()
+    planificador = PlanificadorTareas(get_db_pool())
     try:
-        while True:
-            await asyncio.sleep(1000)
-    except (KeyboardInterrupt, SystemExit):
+        planificador.start()
+        logging.info("Scheduler iniciado y esperando tareas...")
+        await detener.wait()
         logging.info("Deteniendo Scheduler...")
+        await planificador.stop()
+    finally:
         await close_db_connection()
+        logging.info("Scheduler detenido")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -37,6 +37,11 @@ class AlumnoListado(BaseModel):
     class Config:
         from_attributes = True
 
+class AlumnoListadoPagina(BaseModel):
+    items: List[AlumnoListado]
+    siguienteCursor: Optional[str] = Field(None, description="Cursor para pedir la página siguiente (null si es la última)")
+    total: Optional[int] = Field(None, description="Total de alumnos que cumplen los filtros (solo si se pidió incluirTotal)")
+
 # === ESQUEMA NUEVO PARA EL DETALLE DE UN ALUMNO ===
 class AlumnoDetalle(BaseModel):
     dni: str
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import date, time
-from typing import Optional
+from typing import List, Optional
 
 # Base común
 class AvisoBase(BaseModel):
@@ -26,3 +26,9 @@ class AvisoResponse(AvisoBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+# Página del feed de avisos (GET /avisos/feed), del más nuevo al más viejo
+class AvisoFeedPagina(BaseModel):
+    items: List[AvisoResponse]
+    siguienteCursor: Optional[str] = Field(None, description="Cursor para pedir la página siguiente (avisos más viejos; null si es la última)")
+    cursorNuevos: Optional[str] = Field(None, description="Pasarlo como `since` en la próxima visita para traer solo los avisos nuevos")
+
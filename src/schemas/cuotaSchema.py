@@ -1,7 +1,7 @@
 
 from pydantic import BaseModel
-from datetime import date
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Optional
 
 # Agrega esta clase si no la tienes
 class CuotaBase(BaseModel):
@@ -44,3 +44,29 @@ class CuotaUpdateRequest(BaseModel):
 
 
 
+
+# --- Generación masiva mensual ---
+class CuotaAGenerar(BaseModel):
+    dni: str
+    monto: float
+    nombreTrabajo: Optional[str] = None
+    nombreSuscripcion: Optional[str] = None
+    titular: str
+
+class GeneracionCuotasSimulacion(BaseModel):
+    periodo: date
+    fechaComienzo: date
+    fechaFin: date
+    mes: str
+    cantidad: int
+    montoTotal: float
+    cuotas: List[CuotaAGenerar]
+
+class GeneracionCuotasRegistro(BaseModel):
+    idGeneracion: int
+    periodo: date
+    inicio: datetime
+    fin: Optional[datetime] = None
+    generadas: Optional[int] = None
+    estado: str
+    error: Optional[str] = None
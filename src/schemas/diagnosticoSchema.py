@@ -0,0 +1,44 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+class OcupacionPoolReplica(BaseModel):
+    tamanio: int
+    maximo: int
+    enUso: int
+    libres: int
+
+class MetricasPoolDb(BaseModel):
+    pid: int                                    # Métricas de este worker de uvicorn
+    tamanio: int
+    minimo: int
+    maximo: int
+    enUso: int
+    libres: int
+    esperando: int
+    adquisiciones: int
+    timeoutsAdquisicion: int
+    esperaP50Ms: float
+    esperaP95Ms: float
+    esperaP99Ms: float
+    esperaMaxMs: float
+    consultas: int
+    consultasLentas: int
+    consultasPorConexionPromedio: float
+    consultasPorConexionMax: int
+    statementCacheTamanio: int
+    statementCacheHits: int
+    statementCacheMisses: int
+    statementCacheHitRate: Optional[float] = None
+    replica: Optional[OcupacionPoolReplica] = None  # None si no hay réplica de lectura
+
+class PerfilConsulta(BaseModel):
+    nombre: str                                 # Nombre en el registro de core/consultas.py
+    llamadas: int
+    errores: int
+    totalMs: float
+    promedioMs: Optional[float] = None
+    p50Ms: Optional[float] = None               # Aproximados por el histograma
+    p95Ms: Optional[float] = None
+    p99Ms: Optional[float] = None
+    maxMs: float
+    histograma: Dict[str, int]
@@ -236,3 +236,21 @@ class HorarioCompletoUpdate(HorarioBase): # Reutiliza nroGrupo, horaInicio, hora
     dias_asignados: List[DiaAsignadoUpdate] = Field(..., description="La *nueva* lista completa de días para este grupo.")
     originalNroGrupo: str = Field(..., description="El nroGrupo original (la PK) antes de la modificación.")
 
+
+# schemas para validar una grilla semanal completa antes de cargarla
+class TemporadaValidar(BaseModel):
+    """
+    Grilla semanal propuesta (ej. la de la próxima temporada) para validar en bloque.
+    """
+    grupos: List[HorarioCompletoCreate] = Field(..., min_length=1, description="Grupos propuestos con sus días")
+    reemplazaActual: bool = Field(False, description="True si la grilla reemplaza a la actual (no se compara contra los grupos existentes)")
+
+class ConflictoTemporada(BaseModel):
+    tipo: str = Field(..., description="superposicion, superposicion_existente, grupo_repetido, grupo_existente, dia_repetido, dia_inexistente o empleado_inexistente")
+    nroGrupo: str
+    conflictoCon: Optional[str] = Field(None, description="Grupo con el que se superpone")
+    detalle: str
+
+class TemporadaValidacionResponse(BaseModel):
+    valida: bool
+    conflictos: List[ConflictoTemporada]
@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+class TareaEjecucion(BaseModel):
+    idEjecucion: int
+    tarea: str
+    nodo: str
+    programada: Optional[datetime] = None   # Disparo del cron (None si se corrió a mano)
+    inicio: datetime
+    fin: Optional[datetime] = None
+    duracionMs: Optional[int] = None
+    filas: Optional[int] = None
+    estado: str
+    error: Optional[str] = None
+
+class TareaEstado(BaseModel):
+    nombre: str
+    descripcion: str
+    cron: str
+    enCurso: bool
+    proximaEjecucion: Optional[datetime] = None
+    ultimaEjecucion: Optional[TareaEjecucion] = None
+    ultimaExitosa: Optional[datetime] = None
@@ -3,13 +3,16 @@ from datetime import time, date, timedelta
 from asyncpg import Connection
 from typing import List, Optional
 
+import base64
 import calendar
+import json
 
 from schemas.alumnoSchema import (
     AlumnoActivate,
     AlumnoActivateResponse,
     AlumnoCreateFull,
     AlumnoListado,
+    AlumnoListadoPagina,
     AlumnoDetalle,
     HorarioAlumno,
     HorarioAsignado,
@@ -19,7 +22,10 @@ from schemas.alumnoSchema import (
     AlumnoPlanUpdate
 )
 
-from utils.security import get_password_hash
+from services.inscripcionServices import inscribir_en_horarios
+
+from utils.security import get_password_hash_async
+from utils.cache import invalidar_principal
 from utils.exceptions import (
     NotFoundException,
     DuplicateEntryException,
@@ -68,32 +74,10 @@ async def activar_alumno(conn: Connection, data: AlumnoActivate) -> AlumnoActiva
             # 5. Insertar en AlumnoActivo
             await conn.execute('INSERT INTO "AlumnoActivo" (dni) VALUES ($1)', data.dni)
 
-            # 6. Asignar horarios
-            for horario in data.horarios:
-                nroGrupo = horario.nroGrupo
-
-                # Verificar capacidad del grupo en ese día
-                query_capacidad = '''
-                    SELECT p."capacidadMax", COUNT(a.dni) as inscritos
-                    FROM "Pertenece" p
-                    LEFT JOIN "Asiste" a ON p."nroGrupo" = a."nroGrupo" AND p.dia = a.dia
-                    WHERE p."nroGrupo" = $1 AND p.dia = $2
-                    GROUP BY p."capacidadMax"
-                '''
-                capacidad = await conn.fetchrow(query_capacidad, nroGrupo, horario.dia)
-
-                if not capacidad:
-                    raise NotFoundException("Asignación Horario-Día", f"Grupo {nroGrupo} no está asignado al día {horario.dia}")
-
-                if capacidad['inscritos'] >= capacidad['capacidadMax']:
-                    raise BusinessRuleException(f"El grupo {nroGrupo} del día {horario.dia} está completo.")
+            # 6. Asignar horarios (verifica cupos y los bloquea hasta el commit)
+            await inscribir_en_horarios(conn, data.dni, data.horarios)
 
-                await conn.execute('''
-                    INSERT INTO "Asiste" (dni, "nroGrupo", dia)
-                    VALUES ($1, $2, $3)
-                ''', data.dni, nroGrupo, horario.dia)
-
-            return AlumnoActivateResponse(
+            respuesta = AlumnoActivateResponse(
                 dni=persona['dni'],
                 nombre=persona['nombre'],
                 apellido=persona['apellido'],
@@ -106,43 +90,55 @@ async def activar_alumno(conn: Connection, data: AlumnoActivate) -> AlumnoActiva
         except Exception as e:
             raise DatabaseException("activar alumno", str(e))
 
-async def listar_alumnos_detalle(conn: Connection) -> List[AlumnoListado]:
-    """
-    Servicio para listar todos los alumnos con detalles específicos para administradores.
-    Combina información de las tablas Persona, Alumno, AlumnoActivo, Cuota y Asiste.
-    """
-    try:
-        query = """
+    # La persona ahora tiene rol de alumno. Se invalida después del commit: antes, un request
+    # concurrente podría volver a cachear la fila vieja.
+    invalidar_principal(dni=data.dni)
+    return respuesta
+
+# Listado de alumnos: las cuotas pendientes y el turno se calculan por alumno con LEFT JOIN
+# LATERAL (índices "Cuota" (dni, pagada) y "Asiste" (dni, "nroGrupo")). Así el listado
+# paginado solo los calcula para las filas que recorre hasta llenar la página, en lugar de
+# agrupar todas las cuotas impagas y todo "Asiste" en cada página.
+QUERY_ALUMNOS_LISTADO = """
+    SELECT * FROM (
         SELECT
             p.dni,
             p.nombre,
             p.apellido,
-            (CASE WHEN aa.dni IS NOT NULL THEN TRUE ELSE FALSE END) as activo,
-            (
-                SELECT COUNT(*)
-                FROM "Cuota" c
-                WHERE c.dni = a.dni AND c.pagada = FALSE
-            ) as "cuotasPendientes",
-            COALESCE(
-                (
-                    SELECT
-                        CASE
-                            WHEN LEFT(MIN(asis."nroGrupo"), 1) IN ('1', '2') THEN 'Mañana'
-                            WHEN LEFT(MIN(asis."nroGrupo"), 1) IN ('3', '4', '5') THEN 'Tarde'
-                            ELSE 'No asignado'
-                        END
-                    FROM "Asiste" asis
-                    WHERE asis.dni = a.dni
-                ),
-                'No asignado'
-            ) as turno
+            (aa.dni IS NOT NULL) as activo,
+            COALESCE(deuda.cantidad, 0)::INTEGER as "cuotasPendientes",
+            CASE
+                WHEN LEFT(asis.grupo, 1) IN ('1', '2') THEN 'Mañana'
+                WHEN LEFT(asis.grupo, 1) IN ('3', '4', '5') THEN 'Tarde'
+                ELSE 'No asignado'
+            END as turno
         FROM "Alumno" a
         JOIN "Persona" p ON a.dni = p.dni
         LEFT JOIN "AlumnoActivo" aa ON a.dni = aa.dni
-        ORDER BY p.apellido, p.nombre;
-        """
-        
-        resultados = await conn.fetch(query)
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) as cantidad
+            FROM "Cuota" c
+            WHERE c.dni = a.dni AND c.pagada = FALSE
+        ) deuda ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT MIN(s."nroGrupo") as grupo
+            FROM "Asiste" s
+            WHERE s.dni = a.dni
+        ) asis ON TRUE
+        WHERE {filtros_alumno}
+    ) listado
+    WHERE {filtros_listado}
+"""
+
+async def listar_alumnos_detalle(conn: Connection) -> List[AlumnoListado]:
+    """
+    Servicio para listar todos los alumnos con detalles específicos para administradores.
+    Combina información de las tablas Persona, Alumno, AlumnoActivo, Cuota y Asiste.
+    Para listas grandes usar listar_alumnos_paginado.
+    """
+    try:
+        query = QUERY_ALUMNOS_LISTADO.format(filtros_alumno="TRUE", filtros_listado="TRUE")
+        resultados = await conn.fetch(query + " ORDER BY apellido, nombre")
         
         # Mapea los resultados al esquema Pydantic
         return [AlumnoListado(**dict(row)) for row in resultados]
@@ -150,6 +146,92 @@ async def listar_alumnos_detalle(conn: Connection) -> List[AlumnoListado]:
     except Exception as e:
         raise DatabaseException("listar alumnos", str(e))
 
+def _codificar_cursor(row) -> str:
+    datos = json.dumps([row['apellido'], row['nombre'], row['dni']])
+    return base64.urlsafe_b64encode(datos.encode()).decode()
+
+def _decodificar_cursor(cursor: str) -> list:
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not (isinstance(datos, list) and len(datos) == 3 and all(isinstance(d, str) for d in datos)):
+            raise ValueError
+        return datos
+    except Exception:
+        raise BusinessRuleException("El cursor de paginación no es válido.")
+
+async def listar_alumnos_paginado(
+    conn: Connection,
+    limite: int = 50,
+    cursor: Optional[str] = None,
+    activo: Optional[bool] = None,
+    turno: Optional[str] = None,
+    con_deuda: Optional[bool] = None,
+    trabajo: Optional[str] = None,
+    suscripcion: Optional[str] = None,
+    incluir_total: bool = False
+) -> AlumnoListadoPagina:
+    """
+    Lista alumnos por páginas ordenados por (apellido, nombre, dni), con paginación por
+    cursor (keyset): cada página arranca después de la última fila de la anterior, así el
+    costo no crece con el número de página: depende de cuántos alumnos hay que recorrer (en
+    orden, por índice) hasta llenarla. Con filtros poco frecuentes (turno, conDeuda) eso puede
+    ser bastante más que `limite`.
+    Los filtros se aplican en la base; el total es opcional porque requiere contar todo.
+    """
+    params = []
+
+    def param(valor) -> str:
+        params.append(valor)
+        return f"${len(params)}"
+
+    filtros_alumno = ["TRUE"]
+    if activo is not None:
+        filtros_alumno.append(f"(aa.dni IS NOT NULL) = {param(activo)}")
+    if trabajo:
+        filtros_alumno.append(f'a."nombreTrabajo" = {param(trabajo)}')
+    if suscripcion:
+        filtros_alumno.append(f'a."nombreSuscripcion" = {param(suscripcion)}')
+
+    filtros_listado = ["TRUE"]
+    if turno:
+        filtros_listado.append(f"turno = {param(turno)}")
+    if con_deuda is not None:
+        filtros_listado.append(f'("cuotasPendientes" > 0) = {param(con_deuda)}')
+
+    query_base = QUERY_ALUMNOS_LISTADO.format(
+        filtros_alumno=" AND ".join(filtros_alumno),
+        filtros_listado=" AND ".join(filtros_listado)
+    )
+    params_filtros = list(params)
+
+    query_pagina = query_base
+    if cursor:
+        apellido, nombre, dni = _decodificar_cursor(cursor)
+        query_pagina += f" AND (apellido, nombre, dni) > ({param(apellido)}, {param(nombre)}, {param(dni)})"
+    # Pedimos una fila de más para saber si hay página siguiente
+    query_pagina += f" ORDER BY apellido, nombre, dni LIMIT {param(limite + 1)}"
+
+    try:
+        filas = await conn.fetch(query_pagina, *params)
+
+        total = None
+        if incluir_total:
+            total = await conn.fetchval(f"SELECT COUNT(*) FROM ({query_base}) t", *params_filtros)
+
+    except Exception as e:
+        raise DatabaseException("listar alumnos paginado", str(e))
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = _codificar_cursor(filas[-1])
+
+    return AlumnoListadoPagina(
+        items=[AlumnoListado(**dict(row)) for row in filas],
+        siguienteCursor=siguiente,
+        total=total
+    )
+
 async def obtener_detalle_alumno(conn: Connection, dni: str) -> AlumnoDetalle:
     """
     Servicio para obtener la vista detallada de un único alumno por su DNI.
@@ -245,8 +327,8 @@ async def actualizar_horarios_alumno(conn: Connection, dni: str, data: HorariosU
     """
     Reemplaza la lista de horarios de un alumno activo.
     1. Verifica que el alumno esté activo.
-    2. Borra todos sus horarios anteriores.
-    3. Inserta los nuevos horarios, verificando capacidad.
+    2. Borra todos sus horarios anteriores e inserta los nuevos, verificando capacidad
+       (inscribir_en_horarios con reemplazar=True).
     Todo en una transacción.
     """
     async with conn.transaction():
@@ -256,38 +338,9 @@ async def actualizar_horarios_alumno(conn: Connection, dni: str, data: HorariosU
             if not es_activo:
                 raise BusinessRuleException("No se pueden modificar horarios de un alumno inactivo.")
 
-            # 2. Borrar todos los horarios existentes para ese alumno
-            await conn.execute('DELETE FROM "Asiste" WHERE dni = $1', dni)
-
-            # 3. Insertar los nuevos horarios
-            if not data.horarios:
-                # Si la lista está vacía, simplemente devolvemos la lista vacía
-                return HorariosAlumnoResponse(horarios=[])
-
-            for horario in data.horarios:
-                nroGrupo = horario.nroGrupo
-                
-                # Reutilizamos la lógica de verificación de capacidad de 'activar_alumno'
-                query_capacidad = '''
-                    SELECT p."capacidadMax", COUNT(a.dni) as inscritos
-                    FROM "Pertenece" p
-                    LEFT JOIN "Asiste" a ON p."nroGrupo" = a."nroGrupo" AND p.dia = a.dia
-                    WHERE p."nroGrupo" = $1 AND p.dia = $2
-                    GROUP BY p."capacidadMax"
-                '''
-                capacidad = await conn.fetchrow(query_capacidad, nroGrupo, horario.dia)
-
-                if not capacidad:
-                    raise NotFoundException("Asignación Horario-Día", f"Grupo {nroGrupo} no está asignado al día {horario.dia}")
-
-                if capacidad['inscritos'] >= capacidad['capacidadMax']:
-                    raise BusinessRuleException(f"El grupo {nroGrupo} del día {horario.dia} está completo. No se pudo actualizar el horario.")
-                
-                # Insertar el nuevo registro de asistencia
-                await conn.execute('''
-                    INSERT INTO "Asiste" (dni, "nroGrupo", dia)
-                    VALUES ($1, $2, $3)
-                ''', dni, nroGrupo, horario.dia)
+            # 2. Reemplazar los horarios (misma verificación de cupos que 'activar_alumno').
+            # Con una lista vacía solo borra los anteriores.
+            await inscribir_en_horarios(conn, dni, data.horarios, reemplazar=True)
             
             # Devolvemos la lista de horarios que se acaba de establecer
             return HorariosAlumnoResponse(horarios=data.horarios)
@@ -342,7 +395,7 @@ async def actualizar_perfil_alumno(conn: Connection, dni: str, data: AlumnoPerfi
             ''', data.nomLocalidad, data.nomProvincia, data.calle, data.numero, dni)
 
             # 5. Devolver los datos actualizados llamando al servicio que ya teníamos
-            return await obtener_detalle_alumno(conn, dni)
+            detalle = await obtener_detalle_alumno(conn, dni)
 
         except NotFoundException:
             raise
@@ -355,6 +408,10 @@ async def actualizar_perfil_alumno(conn: Connection, dni: str, data: AlumnoPerfi
                     raise DuplicateEntryException("telefono", data.telefono)
             raise DatabaseException("actualizar perfil de alumno", str(e))
 
+    # Después del commit (ver activar_alumno)
+    invalidar_principal(dni=dni)
+    return detalle
+
 async def obtener_detalle_alumno_auth(conn: Connection, dni: str) -> AlumnoDetalle:
     """
     Servicio para obtener la vista detallada de un único alumno por su DNI.
@@ -474,6 +531,9 @@ async def eliminar_alumno(conn: Connection, dni: str) -> None:
         except Exception as e:
             raise DatabaseException("eliminar alumno", str(e))
 
+    # Después del commit (ver activar_alumno)
+    invalidar_principal(dni=dni)
+
 async def desactivar_alumno(conn: Connection, dni: str) -> None:
     """
     Pasa a un alumno de estado 'Activo' a 'Inactivo'.
@@ -507,6 +567,9 @@ async def desactivar_alumno(conn: Connection, dni: str) -> None:
         except Exception as e:
             raise DatabaseException("desactivar alumno", str(e))
 
+    # Después del commit (ver activar_alumno)
+    invalidar_principal(dni=dni)
+
 async def reactivar_alumno(conn: Connection, dni: str) -> None:
     """
     Pasa a un alumno de estado 'Inactivo' a 'Activo'.
@@ -536,6 +599,9 @@ async def reactivar_alumno(conn: Connection, dni: str) -> None:
         except Exception as e:
             raise DatabaseException("reactivar alumno", str(e))
 
+    # Después del commit (ver activar_alumno)
+    invalidar_principal(dni=dni)
+
 async def crear_alumno_completo(conn: Connection, data: AlumnoCreateFull) -> AlumnoActivateResponse:
     """
     Crea un alumno desde cero: Persona -> Dirección -> Alumno -> Activo -> Horarios.
@@ -562,7 +628,7 @@ async def crear_alumno_completo(conn: Connection, data: AlumnoCreateFull) -> Alu
                 raise NotFoundException("Suscripción", data.nombreSuscripcion)
 
             # 3. Crear Persona (Pass = Hash del DNI)
-            hashed_pass = get_password_hash(data.dni)
+            hashed_pass = await get_password_hash_async(data.dni)
             await conn.execute('''
                 INSERT INTO "Persona" (dni, nombre, apellido, sexo, telefono, email, usuario, contrasenia, "requiereCambioClave")
                 VALUES ($1, $2, $3, $4, $5, $6, $7, $8, TRUE)
@@ -587,28 +653,7 @@ async def crear_alumno_completo(conn: Connection, data: AlumnoCreateFull) -> Alu
             await conn.execute('INSERT INTO "AlumnoActivo" (dni) VALUES ($1)', data.dni)
 
             # 7. Asignar Horarios (Verificando cupo)
-            for horario in data.horarios:
-                nroGrupo = horario.nroGrupo
-                
-                # Check capacidad
-                query_capacidad = '''
-                    SELECT p."capacidadMax", COUNT(a.dni) as inscritos
-                    FROM "Pertenece" p
-                    LEFT JOIN "Asiste" a ON p."nroGrupo" = a."nroGrupo" AND p.dia = a.dia
-                    WHERE p."nroGrupo" = $1 AND p.dia = $2
-                    GROUP BY p."capacidadMax"
-                '''
-                capacidad = await conn.fetchrow(query_capacidad, nroGrupo, horario.dia)
-
-                if not capacidad:
-                    raise NotFoundException("Grupo/Día", f"{nroGrupo}-{horario.dia}")
-                
-                if capacidad['inscritos'] >= capacidad['capacidadMax']:
-                    raise BusinessRuleException(f"El grupo {nroGrupo} del día {horario.dia} está completo.")
-
-                await conn.execute('''
-                    INSERT INTO "Asiste" (dni, "nroGrupo", dia) VALUES ($1, $2, $3)
-                ''', data.dni, nroGrupo, horario.dia)
+            await inscribir_en_horarios(conn, data.dni, data.horarios)
 
             # [ELIMINADO] Bloque de generación de cuota
 
@@ -16,10 +16,11 @@ from utils.exceptions import (
 )
 
 from utils.email import email_service
+from utils.cache import invalidar_principal
 
 from utils.security import (
-    verify_password,
-    get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
     generate_verification_token,
     create_registration_token,
     verify_registration_token,
@@ -65,10 +66,10 @@ async def iniciar_registro_paso1(conn: Connection, user_data: RegistroPaso1) ->
         # El token que enviamos en el email ahora es el JWT
         # NOTA: En producción, es mejor enviar un token opaco y no el JWT directamente en la URL
         # pero para este ejemplo, es funcional.
-        success = await email_service.send_verification_email(user_data.email, token)
+        success = await email_service.send_verification_email(conn, user_data.email, token)
 
         if not success:
-            print("No se pudo enviar el email de verificación, pero el registro continuará")
+            print("No se pudo encolar el email de verificación, pero el registro continuará")
 
     return token
 
@@ -79,7 +80,7 @@ async def completar_registro_paso2(conn: Connection, user_data: RegistroPaso2, e
         raise DuplicateEntryException("DNI", user_data.dni)
 
     # Hashear la contraseña
-    hashed_password = get_password_hash(contrasenia)
+    hashed_password = await get_password_hash_async(contrasenia)
 
     # Insertar la Persona con todos sus datos, incluyendo sexo
     result = await conn.fetchrow('''
@@ -129,7 +130,7 @@ async def completar_registro_paso2(conn: Connection, user_data: RegistroPaso2, e
         raise DatabaseException("crear dirección", str(e))
 
     if email_service is not None:
-        await email_service.send_welcome_email(email, user_data.nombre)
+        await email_service.send_welcome_email(conn, email, user_data.nombre)
 
     return user
 
@@ -144,7 +145,7 @@ async def authenticate_user(conn: Connection, username: str, password: str) -> O
     if not user:
         return None
 
-    if not verify_password(password, user["contrasenia"]):
+    if not await verify_password_async(password, user["contrasenia"]):
         return None
 
     return user
@@ -244,7 +245,7 @@ async def solicitar_recuperacion_contrasenia(conn: Connection, email: str) -> No
 
     # 3. Enviar Email
     if email_service:
-        await email_service.send_password_reset_email(email, token)
+        await email_service.send_password_reset_email(conn, email, token)
     else:
         print(f"Simulando envío de email a {email} con token: {token}")
 
@@ -263,7 +264,7 @@ async def ejecutar_recuperacion_contrasenia(conn: Connection, data: PasswordRese
     email_token = payload.get("email")
     
     # 2. Actualizar contraseña
-    hashed_password = get_password_hash(data.new_password)
+    hashed_password = await get_password_hash_async(data.new_password)
     
     result = await conn.execute(
         'UPDATE "Persona" SET contrasenia = $1 WHERE email = $2',
@@ -273,12 +274,15 @@ async def ejecutar_recuperacion_contrasenia(conn: Connection, data: PasswordRese
     if result == "UPDATE 0":
         raise NotFoundException("Usuario", email_token)
 
+    # Las sesiones cacheadas de este usuario ya no son válidas
+    invalidar_principal(email=email_token)
+
 async def cambiar_contrasenia_primer_ingreso(conn: Connection, dni: str, new_password: str) -> None:
     """
     Actualiza la contraseña del usuario logueado y desactiva el flag 'requiereCambioClave'.
     """
     # 1. Hashear la nueva contraseña
-    hashed_password = get_password_hash(new_password)
+    hashed_password = await get_password_hash_async(new_password)
     
     # 2. Actualizar en BD
     await conn.execute(
@@ -286,3 +290,6 @@ async def cambiar_contrasenia_primer_ingreso(conn: Connection, dni: str, new_pas
         hashed_password, dni
     )
 
+    # Invalidamos el principal cacheado (cambió requiereCambioClave)
+    invalidar_principal(dni=dni)
+
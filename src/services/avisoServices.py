@@ -1,8 +1,18 @@
 from asyncpg import Connection
-from typing import List
+from datetime import date, datetime, time
+from typing import List, Optional, Tuple
 
-from schemas.avisoSchema import AvisoCreate, AvisoUpdate, AvisoResponse
-from utils.exceptions import DatabaseException, NotFoundException
+import base64
+import json
+
+from core.consultas import registrar
+from schemas.avisoSchema import AvisoCreate, AvisoUpdate, AvisoResponse, AvisoFeedPagina
+from utils.exceptions import BusinessRuleException, DatabaseException, NotFoundException
+
+# Versión del feed (la mantiene el trigger de la migración 012): se lee en cada visita al feed
+CONSULTA_VERSION_FEED = registrar("aviso_version_feed", '''
+    SELECT version, modificado FROM "AvisoVersion"
+''')
 
 async def crear_aviso(conn: Connection, aviso: AvisoCreate, dni_autor: str) -> AvisoResponse:
     """
@@ -25,7 +35,7 @@ async def crear_aviso(conn: Connection, aviso: AvisoCreate, dni_autor: str) -> A
 
 async def listar_avisos(conn: Connection) -> List[AvisoResponse]:
     """
-    Lista avisos. Podrías hacer un JOIN con Persona para traer el nombre del autor si quisieras.
+    Lista todos los avisos, sin paginar. Para la app de alumnos usar el feed (listar_avisos_feed).
     """
     try:
         query = """
@@ -38,6 +48,83 @@ async def listar_avisos(conn: Connection) -> List[AvisoResponse]:
     except Exception as e:
         raise DatabaseException("listar avisos", str(e))
 
+async def version_feed_avisos(conn: Connection) -> Tuple[int, datetime]:
+    """
+    Versión del feed y momento de su último cambio (alta, edición o baja de cualquier aviso).
+    Con esto el endpoint arma el ETag / Last-Modified y decide el 304 sin leer los avisos.
+    """
+    try:
+        row = await CONSULTA_VERSION_FEED.fetchrow(conn)
+    except Exception as e:
+        raise DatabaseException("consultar versión de avisos", str(e))
+    if not row:
+        raise DatabaseException("consultar versión de avisos", 'Falta la fila de "AvisoVersion" (migración 012)')
+    return row['version'], row['modificado']
+
+def _codificar_cursor(aviso: AvisoResponse) -> str:
+    datos = json.dumps([aviso.fecha.isoformat(), aviso.hora.isoformat(), aviso.idAviso])
+    return base64.urlsafe_b64encode(datos.encode()).decode()
+
+def _decodificar_cursor(cursor: str) -> Tuple[date, time, int]:
+    try:
+        fecha, hora, id_aviso = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(id_aviso, int):
+            raise ValueError
+        return date.fromisoformat(fecha), time.fromisoformat(hora), id_aviso
+    except Exception:
+        raise BusinessRuleException("El cursor de avisos no es válido.")
+
+async def listar_avisos_feed(
+    conn: Connection,
+    limite: int = 20,
+    cursor: Optional[str] = None,
+    since: Optional[str] = None
+) -> AvisoFeedPagina:
+    """
+    Feed de avisos del más nuevo al más viejo, paginado por cursor (keyset) sobre
+    (fecha, hora, idAviso): cada página arranca después del último aviso de la anterior.
+
+    `since` (el cursorNuevos de una visita anterior) limita el feed a los avisos publicados
+    después, para que el cliente baje solo lo nuevo. Las ediciones y bajas de avisos viejos
+    no aparecen así: el cliente se entera por el cambio de ETag y recarga el feed completo.
+    """
+    params = []
+
+    def param(valor) -> str:
+        params.append(valor)
+        return f"${len(params)}"
+
+    filtros = ["TRUE"]
+    if cursor:
+        fecha, hora, id_aviso = _decodificar_cursor(cursor)
+        filtros.append(f'(fecha, hora, "idAviso") < ({param(fecha)}, {param(hora)}, {param(id_aviso)})')
+    if since:
+        fecha, hora, id_aviso = _decodificar_cursor(since)
+        filtros.append(f'(fecha, hora, "idAviso") > ({param(fecha)}, {param(hora)}, {param(id_aviso)})')
+
+    # Pedimos una fila de más para saber si hay página siguiente
+    query = f'''
+        SELECT "idAviso", descripcion, fecha, hora, dni
+        FROM "Aviso"
+        WHERE {" AND ".join(filtros)}
+        ORDER BY fecha DESC, hora DESC, "idAviso" DESC
+        LIMIT {param(limite + 1)}
+    '''
+    try:
+        filas = await conn.fetch(query, *params)
+    except Exception as e:
+        raise DatabaseException("listar feed de avisos", str(e))
+
+    items = [AvisoResponse(**dict(row)) for row in filas[:limite]]
+    siguiente = _codificar_cursor(items[-1]) if len(filas) > limite else None
+
+    # El más nuevo solo está en la primera página; si no hay nada nuevo el cliente conserva el suyo
+    nuevos = None
+    if not cursor:
+        nuevos = _codificar_cursor(items[0]) if items else since
+
+    return AvisoFeedPagina(items=items, siguienteCursor=siguiente, cursorNuevos=nuevos)
+
 async def actualizar_aviso(conn: Connection, id_aviso: int, aviso: AvisoUpdate) -> AvisoResponse:
     """
     Actualiza SOLO la descripción del aviso.
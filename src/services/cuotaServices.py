@@ -1,16 +1,28 @@
 
 import calendar
+import csv
+import io
+import json
 from datetime import date, timedelta
-from asyncpg import Connection
-from typing import List
+from asyncpg import Connection, Pool
+from asyncpg.exceptions import UniqueViolationError
+from typing import AsyncIterator, List, Optional
 
 from schemas.cuotaSchema import (
     CuotaResponseAlumnoAuth,
     CuotaResponsePorDNI,
-    CuotaUpdateRequest
+    CuotaUpdateRequest,
+    CuotaAGenerar,
+    GeneracionCuotasSimulacion,
+    GeneracionCuotasRegistro
 )
+from core.consultas import registrar
+from utils.periodo import Periodo
+from utils.comprobantes import invalidar_comprobante
 from utils.exceptions import (
+    BusinessRuleException,
     DatabaseException,
+    DuplicateEntryException,
     NotFoundException
 )
 
@@ -30,26 +42,45 @@ meses_es = {
     "December": "Diciembre"
 }
 
+# Consultas frecuentes: "mis cuotas" del alumno y la búsqueda por DNI del staff
+CONSULTA_CUOTAS_ALUMNO = registrar("cuotas_por_alumno", """
+    SELECT
+        "idCuota",
+        mes,
+        EXTRACT(YEAR FROM "fechaFin")::INTEGER as anio,
+        "nombreTrabajo" as trabajo,
+        "nombreSuscripcion" as suscripcion,
+        monto,
+        pagada,
+        "fechaFin" as vencimiento,
+        "fechaComienzo" as comienzo
+    FROM "Cuota"
+    WHERE dni = $1
+    ORDER BY "fechaFin" DESC
+""")
+CONSULTA_PERSONA_EXISTE = registrar("persona_existe", 'SELECT 1 FROM "Persona" WHERE dni = $1')
+CONSULTA_CUOTAS_DNI = registrar("cuotas_por_dni", """
+    SELECT
+        "idCuota",
+        dni,
+        pagada,
+        monto,
+        "fechaComienzo",
+        "fechaFin" as vencimiento,
+        mes,
+        EXTRACT(YEAR FROM "fechaFin")::INTEGER as anio,
+        "nombreTrabajo" as trabajo,
+        "nombreSuscripcion" as suscripcion
+    FROM "Cuota"
+    WHERE dni = $1
+    ORDER BY "fechaComienzo" DESC
+""")
+
 # Obtiene las cuotas de UN SOLO alumno (Auth)
 async def obtener_cuotas_por_alumno(conn: Connection, dni_alumno: str) -> List[CuotaResponseAlumnoAuth]:
     """Obtiene todas las cuotas de un alumno específico, ordenadas por fecha."""
     try:
-        query = """
-        SELECT
-            "idCuota",
-            mes,
-            EXTRACT(YEAR FROM "fechaFin")::INTEGER as anio,
-            "nombreTrabajo" as trabajo,
-            "nombreSuscripcion" as suscripcion,
-            monto,
-            pagada,
-            "fechaFin" as vencimiento,
-            "fechaComienzo" as comienzo
-        FROM "Cuota"
-        WHERE dni = $1
-        ORDER BY "fechaFin" DESC;
-        """
-        cuotas_db = await conn.fetch(query, dni_alumno)
+        cuotas_db = await CONSULTA_CUOTAS_ALUMNO.fetch(conn, dni_alumno)
 
         # Procesamos la respuesta para traducir el mes
         cuotas_procesadas = []
@@ -72,31 +103,12 @@ async def obtener_cuotas_por_dni(conn: Connection, dni: str) -> List[CuotaRespon
     """
     try:
         # Primero, verificamos que la persona (alumno) exista
-        persona_existe = await conn.fetchval(
-            'SELECT 1 FROM "Persona" WHERE dni = $1', dni
-        )
+        persona_existe = await CONSULTA_PERSONA_EXISTE.fetchval(conn, dni)
         if not persona_existe:
             raise NotFoundException("Alumno", dni)
 
         # Si existe, buscamos sus cuotas
-        query = """
-            SELECT
-                "idCuota",
-                dni,
-                pagada,
-                monto,
-                "fechaComienzo",
-                "fechaFin" as vencimiento,
-                mes,
-                EXTRACT(YEAR FROM "fechaFin")::INTEGER as anio,
-                "nombreTrabajo" as trabajo,
-                "nombreSuscripcion" as suscripcion
-            FROM "Cuota"
-            WHERE dni = $1
-            ORDER BY "fechaComienzo" DESC;
-        """
-        
-        resultados = await conn.fetch(query, dni)
+        resultados = await CONSULTA_CUOTAS_DNI.fetch(conn, dni)
         
         # Mapeamos los resultados al schema Pydantic
         return [CuotaResponsePorDNI(**dict(row)) for row in resultados]
@@ -119,6 +131,9 @@ async def modificar_cuota(conn: Connection, id_cuota: int, cuota_data: CuotaUpda
         if not exists:
             raise NotFoundException("Cuota", id_cuota)
 
+        # Si cambia el mes de comienzo la cuota pasa a otra partición (que puede no existir aún)
+        await conn.execute('SELECT cuota_crear_particion($1)', cuota_data.fechaComienzo)
+
         # 2. Definir la query base
         # Actualizamos los campos "normales"
         # Mapeamos: vencimiento -> fechaFin, trabajo -> nombreTrabajo, suscripcion -> nombreSuscripcion
@@ -136,6 +151,7 @@ async def modificar_cuota(conn: Connection, id_cuota: int, cuota_data: CuotaUpda
                     "nombreTrabajo" = $6,
                     "nombreSuscripcion" = $7,
                     "fechaComienzo" = $8,
+                    periodo = date_trunc('month', $8::date)::date, -- Clave de partición: mueve la fila si cambia el mes
                     "fechaFin" = $9,
                     "idFacturacion" = $10,
                     -- Campos que se limpian
@@ -172,6 +188,7 @@ async def modificar_cuota(conn: Connection, id_cuota: int, cuota_data: CuotaUpda
                     "nombreTrabajo" = $6,
                     "nombreSuscripcion" = $7,
                     "fechaComienzo" = $8,
+                    periodo = date_trunc('month', $8::date)::date, -- Clave de partición: mueve la fila si cambia el mes
                     "fechaFin" = $9,
                     "idFacturacion" = $10,
                     "metodoDePago" = $11
@@ -192,10 +209,15 @@ async def modificar_cuota(conn: Connection, id_cuota: int, cuota_data: CuotaUpda
                 cuota_data.metodoDePago
             )
 
+        # El comprobante guardado ya no refleja la cuota
+        invalidar_comprobante(id_cuota)
         return True
 
     except NotFoundException:
         raise
+    except UniqueViolationError:
+        # UNIQUE (dni, periodo): el alumno ya tiene una cuota en ese mes
+        raise DuplicateEntryException("dni y mes de comienzo", f"{cuota_data.dni} / {cuota_data.fechaComienzo:%Y-%m}")
     except Exception as e:
         raise DatabaseException("modificar cuota", str(e))
 
@@ -212,7 +234,8 @@ async def eliminar_cuota(conn: Connection, id_cuota: int) -> bool:
         # Verificamos si realmente se borró algo (DELETE 0 significa que no existía)
         if result == "DELETE 0":
             raise NotFoundException("Cuota", id_cuota)
-            
+
+        invalidar_comprobante(id_cuota)
         return True
 
     except NotFoundException:
@@ -221,72 +244,234 @@ async def eliminar_cuota(conn: Connection, id_cuota: int) -> bool:
         raise DatabaseException("eliminar cuota", str(e))
 
 
-async def generar_cuotas_masivas_mensuales(conn: Connection) -> int:
+# === GENERACIÓN MASIVA MENSUAL ===
+
+# Cuotas del período que todavía no existen: una por alumno activo, con el titular asignado
+# hoy. El NOT EXISTS usa la clave única (dni, periodo) y solo toca la partición del mes.
+QUERY_CUOTAS_A_GENERAR = """
+    WITH "TitularActual" AS (
+        -- Buscamos el titular asignado al alumno en este momento
+        SELECT DISTINCT ON (asiste.dni)
+            asiste.dni,
+            p.nombre || ' ' || p.apellido as nombre_titular
+        FROM "Asiste" asiste
+        INNER JOIN "Pertenece" pert ON asiste."nroGrupo" = pert."nroGrupo"
+        INNER JOIN "Persona" p ON pert."dniEmpleado" = p.dni
+        WHERE pert."dniEmpleado" IS NOT NULL
+    )
+    SELECT
+        a.dni,
+        s.precio as monto,
+        a."nombreTrabajo",
+        a."nombreSuscripcion",
+        COALESCE(ta.nombre_titular, 'Administración') as titular -- Guardamos el titular fijo
+    FROM "Alumno" a
+    JOIN "AlumnoActivo" aa ON a.dni = aa.dni
+    JOIN "Suscripcion" s ON a."nombreSuscripcion" = s."nombreSuscripcion"
+    LEFT JOIN "TitularActual" ta ON a.dni = ta.dni
+    WHERE NOT EXISTS (
+        SELECT 1 FROM "Cuota" c
+        WHERE c.dni = a.dni AND c.periodo = $1::DATE
+    )
+"""
+
+# ON CONFLICT cubre a otra corrida que haya insertado entre el NOT EXISTS y el INSERT
+QUERY_GENERAR_CUOTAS = f"""
+    INSERT INTO "Cuota" (
+        dni, pagada, monto, "fechaComienzo", "fechaFin", mes,
+        "nombreTrabajo", "nombreSuscripcion", titular, periodo
+    )
+    SELECT
+        g.dni, FALSE, g.monto, $2::DATE, $3::DATE, $4::VARCHAR,
+        g."nombreTrabajo", g."nombreSuscripcion", g.titular, $1::DATE
+    FROM ({QUERY_CUOTAS_A_GENERAR}) g
+    ON CONFLICT (dni, periodo) DO NOTHING
+"""
+
+def _datos_generacion(fecha: Optional[date] = None):
+    """Período, fecha de comienzo, vencimiento (30 días) y nombre del mes de la generación."""
+    comienzo = fecha or date.today()
+    nombre_mes = calendar.month_name[comienzo.month].capitalize()
+    return (
+        Periodo.mensual(comienzo.month, comienzo.year),
+        comienzo,
+        comienzo + timedelta(days=30),
+        meses_es.get(nombre_mes, nombre_mes)
+    )
+
+async def simular_generacion_cuotas(conn: Connection, fecha: Optional[date] = None) -> GeneracionCuotasSimulacion:
+    """Informa qué cuotas generaría generar_cuotas_masivas_mensuales, sin escribir nada."""
+    periodo, comienzo, vencimiento, nombre_mes = _datos_generacion(fecha)
     try:
-        hoy = date.today()
-        vencimiento = hoy + timedelta(days=30)
-        
-        # Traducción del mes
-        nombre_mes = calendar.month_name[hoy.month].capitalize()
-        meses_trad = {
-            "January": "Enero", "February": "Febrero", "March": "Marzo", "April": "Abril",
-            "May": "Mayo", "June": "Junio", "July": "Julio", "August": "Agosto",
-            "September": "Septiembre", "October": "Octubre", "November": "Noviembre", "December": "Diciembre"
-        }
-        nombre_mes = meses_trad.get(nombre_mes, nombre_mes)
-        anio_actual = hoy.year
-
-        query = """
-        INSERT INTO "Cuota" (
-            dni, 
-            pagada, 
-            monto, 
-            "fechaComienzo", 
-            "fechaFin", 
-            mes, 
-            "nombreTrabajo", 
-            "nombreSuscripcion",
-            titular
-        )
-        WITH "TitularActual" AS (
-            -- Buscamos el titular asignado al alumno en este momento
-            SELECT DISTINCT ON (asiste.dni)
-                asiste.dni,
-                p.nombre || ' ' || p.apellido as nombre_titular
-            FROM "Asiste" asiste
-            INNER JOIN "Pertenece" pert ON asiste."nroGrupo" = pert."nroGrupo"
-            INNER JOIN "Persona" p ON pert."dniEmpleado" = p.dni
-            WHERE pert."dniEmpleado" IS NOT NULL
+        rows = await conn.fetch(QUERY_CUOTAS_A_GENERAR + ' ORDER BY a.dni', periodo.inicio)
+    except Exception as e:
+        raise DatabaseException("simular generación de cuotas", str(e))
+
+    cuotas = [CuotaAGenerar(**dict(row)) for row in rows]
+    return GeneracionCuotasSimulacion(
+        periodo=periodo.inicio,
+        fechaComienzo=comienzo,
+        fechaFin=vencimiento,
+        mes=nombre_mes,
+        cantidad=len(cuotas),
+        montoTotal=float(sum(row['monto'] or 0 for row in rows)),
+        cuotas=cuotas
+    )
+
+async def generar_cuotas_masivas_mensuales(conn: Connection, fecha: Optional[date] = None) -> int:
+    """
+    Genera en una sola sentencia la cuota del mes de `fecha` (hoy por defecto) para cada
+    alumno activo que todavía no la tenga. Es idempotente: volver a correrla en el mismo
+    mes no duplica cuotas. Cada corrida queda registrada en "CuotaGeneracion".
+    """
+    periodo, comienzo, vencimiento, nombre_mes = _datos_generacion(fecha)
+
+    try:
+        id_generacion = await conn.fetchval(
+            'INSERT INTO "CuotaGeneracion" (periodo) VALUES ($1) RETURNING "idGeneracion"',
+            periodo.inicio
         )
-        SELECT 
-            a.dni,
-            FALSE as pagada,
-            s.precio as monto,
-            $1::DATE,
-            $2::DATE,
-            $3::VARCHAR,
-            a."nombreTrabajo",
-            a."nombreSuscripcion",
-            COALESCE(ta.nombre_titular, 'Administración') as titular -- Guardamos el titular fijo
-        FROM "Alumno" a
-        JOIN "AlumnoActivo" aa ON a.dni = aa.dni
-        JOIN "Suscripcion" s ON a."nombreSuscripcion" = s."nombreSuscripcion"
-        LEFT JOIN "TitularActual" ta ON a.dni = ta.dni
-        WHERE NOT EXISTS (
-            SELECT 1 FROM "Cuota" c 
-            WHERE c.dni = a.dni 
-            AND c.mes = $3::VARCHAR
-            AND EXTRACT(YEAR FROM c."fechaFin") = $4::INTEGER
-        );
-        """
-
-        resultado = await conn.execute(query, hoy, vencimiento, nombre_mes, anio_actual)
+    except Exception as e:
+        raise DatabaseException("registrar generación de cuotas", str(e))
+
+    try:
+        async with conn.transaction():
+            # Una corrida a la vez; las particiones del mes y del siguiente se crean bajo este lock
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext('generacion_cuotas'))")
+            await conn.execute('SELECT cuota_crear_particion($1), cuota_crear_particion($2)', periodo.inicio, periodo.fin)
+            resultado = await conn.execute(QUERY_GENERAR_CUOTAS, periodo.inicio, comienzo, vencimiento, nombre_mes)
         filas_insertadas = int(resultado.split(" ")[-1])
-        
-        print(f"--- [AUTOMATIZACIÓN] Se generaron {filas_insertadas} cuotas con titular persistido para {nombre_mes}. ---")
-        return filas_insertadas
+    except Exception as e:
+        await conn.execute(
+            '''UPDATE "CuotaGeneracion" SET fin = now(), estado = 'error', error = $2 WHERE "idGeneracion" = $1''',
+            id_generacion, str(e)
+        )
+        raise DatabaseException("generar cuotas masivas", str(e))
 
+    await conn.execute(
+        '''UPDATE "CuotaGeneracion" SET fin = now(), estado = 'ok', generadas = $2 WHERE "idGeneracion" = $1''',
+        id_generacion, filas_insertadas
+    )
+
+    print(f"--- [AUTOMATIZACIÓN] Se generaron {filas_insertadas} cuotas con titular persistido para {nombre_mes}. ---")
+    return filas_insertadas
+
+async def listar_generaciones_cuotas(conn: Connection, limite: int = 24) -> List[GeneracionCuotasRegistro]:
+    """Últimas corridas de la generación masiva (más reciente primero)."""
+    try:
+        rows = await conn.fetch(
+            'SELECT * FROM "CuotaGeneracion" ORDER BY inicio DESC LIMIT $1',
+            limite
+        )
+        return [GeneracionCuotasRegistro(**dict(row)) for row in rows]
     except Exception as e:
-        print(f"Error generando cuotas masivas: {e}")
-        return 0
+        raise DatabaseException("listar generaciones de cuotas", str(e))
+
+
+# === EXPORTACIÓN (streaming) ===
+
+COLUMNAS_EXPORTACION = [
+    "idCuota", "dni", "nombre", "apellido", "mes", "fechaComienzo", "fechaFin", "monto",
+    "pagada", "fechaDePago", "horaDePago", "metodoDePago", "titular",
+    "nombreTrabajo", "nombreSuscripcion", "idFacturacion"
+]
+
+# Columnas de fecha por las que se puede filtrar (lista blanca: el nombre va dentro del SQL)
+CAMPOS_FECHA_EXPORTACION = {
+    "pago": '"fechaDePago"',
+    "comienzo": '"fechaComienzo"',
+    "vencimiento": '"fechaFin"',
+}
+
+# Filas por bloque enviado al cliente (y prefetch del cursor del servidor)
+FILAS_POR_BLOQUE = 500
+
+def armar_query_exportacion(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    campo_fecha: str = "pago",
+    titular: Optional[str] = None,
+    metodo_pago: Optional[str] = None,
+    pagada: Optional[bool] = None
+) -> tuple:
+    """
+    Arma la consulta de exportación y sus parámetros. Se llama ANTES de empezar a
+    transmitir, así los filtros inválidos se informan con un error normal (400).
+    El rango [desde, hasta] es inclusivo para el usuario y se traduce a [desde, hasta + 1 día).
+    """
+    if campo_fecha not in CAMPOS_FECHA_EXPORTACION:
+        raise BusinessRuleException(f"Campo de fecha inválido: {campo_fecha}.")
+    if desde and hasta and desde > hasta:
+        raise BusinessRuleException("La fecha 'desde' no puede ser posterior a 'hasta'.")
+
+    columna = CAMPOS_FECHA_EXPORTACION[campo_fecha]
+    params = []
+    filtros = ["TRUE"]
+
+    def param(valor) -> str:
+        params.append(valor)
+        return f"${len(params)}"
+
+    if desde:
+        filtros.append(f"c.{columna} >= {param(desde)}")
+    if hasta:
+        filtros.append(f"c.{columna} < {param(hasta + timedelta(days=1))}")
+    if titular:
+        filtros.append(f"c.titular = {param(titular)}")
+    if metodo_pago:
+        filtros.append(f"c.\"metodoDePago\" ILIKE {param(f'%{metodo_pago}%')}")
+    if pagada is not None:
+        filtros.append(f"c.pagada = {param(pagada)}")
+
+    query = f"""
+        SELECT
+            c."idCuota", c.dni, p.nombre, p.apellido, c.mes, c."fechaComienzo", c."fechaFin", c.monto,
+            c.pagada, c."fechaDePago", c."horaDePago", c."metodoDePago", c.titular,
+            c."nombreTrabajo", c."nombreSuscripcion", c."idFacturacion"
+        FROM "Cuota" c
+        JOIN "Persona" p ON p.dni = c.dni
+        WHERE {" AND ".join(filtros)}
+        ORDER BY c.{columna}, c."idCuota"
+    """
+    return query, params
+
+def _valor_exportable(valor):
+    if valor is None or isinstance(valor, (bool, int, str)):
+        return valor
+    # date, time, Decimal -> texto (ISO para fechas, sin pérdida para montos)
+    return valor.isoformat() if hasattr(valor, "isoformat") else str(valor)
+
+async def exportar_cuotas(pool: Pool, query: str, params: list, formato: str) -> AsyncIterator[bytes]:
+    """
+    Generador asíncrono que recorre la consulta con un cursor del servidor y va
+    entregando bloques NDJSON o CSV. La memoria usada es la de un bloque, sin importar
+    el tamaño de la exportación.
+
+    Toma su propia conexión del pool: la de `Depends(get_db)` se libera antes de que
+    termine de enviarse una StreamingResponse. Si el cliente corta, la conexión se devuelve.
+    """
+    async with pool.acquire() as conn:
+        # Los cursores de asyncpg requieren una transacción abierta
+        async with conn.transaction(readonly=True):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if formato == "csv":
+                writer.writerow(COLUMNAS_EXPORTACION)
+
+            filas = 0
+            async for row in conn.cursor(query, *params, prefetch=FILAS_POR_BLOQUE):
+                valores = [_valor_exportable(row[col]) for col in COLUMNAS_EXPORTACION]
+                if formato == "csv":
+                    writer.writerow(valores)
+                else:
+                    buffer.write(json.dumps(dict(zip(COLUMNAS_EXPORTACION, valores)), ensure_ascii=False))
+                    buffer.write("\n")
+
+                filas += 1
+                if filas % FILAS_POR_BLOQUE == 0:
+                    yield buffer.getvalue().encode("utf-8")
+                    buffer.seek(0)
+                    buffer.truncate()
 
+            if buffer.tell():
+                yield buffer.getvalue().encode("utf-8")
@@ -10,7 +10,8 @@ from schemas.empleadoSchema import (
     EmpleadoHorariosUpdate
 )
 
-from utils.security import get_password_hash
+from utils.security import get_password_hash_async
+from utils.cache import invalidar_principal
 
 from utils.exceptions import (
     DatabaseException, 
@@ -34,7 +35,7 @@ async def crear_empleado_completo(conn: Connection, data: EmpleadoCreate) -> Emp
             # 2. Generar Credenciales
             # Usuario = DNI, Contraseña = Hash(DNI)
             usuario = data.dni
-            password_hash = get_password_hash(data.dni) 
+            password_hash = await get_password_hash_async(data.dni) 
 
             # 3. Insertar Persona
             await conn.execute('''
@@ -242,3 +243,6 @@ async def eliminar_empleado(conn: Connection, dni: str) -> None:
         except Exception as e:
             raise DatabaseException("eliminar empleado", str(e))
 
+    # Después del commit: antes, un request concurrente podría volver a cachear la fila vieja
+    invalidar_principal(dni=dni)
+
@@ -1,8 +1,7 @@
 
 from datetime import date
 from asyncpg import Connection
-from typing import List
-from dateutil.relativedelta import relativedelta
+from typing import List, Optional
 
 from schemas.estadisticasSchema import (
     DashboardKPIs,
@@ -19,6 +18,7 @@ from schemas.estadisticasSchema import (
 )
 
 from utils.exceptions import DatabaseException, NotFoundException
+from utils.periodo import Periodo
 
 async def obtener_alumnos_por_trabajo(conn: Connection) -> List[EstadisticaTrabajoItem]:
     """
@@ -59,6 +59,11 @@ def obtener_nombre_mes_actual():
     return meses[mes_actual_idx]
 
 async def obtener_kpis_generales(conn: Connection) -> DashboardKPIs:
+    """
+    Lee los KPIs del snapshot mantenido por los triggers de "Cuota"
+    ("KpiCuotaMensual" y "KpiCuotaVencimiento", ver scripts/migrations/002_kpi_cuota_snapshot.sql).
+    El costo no depende del historial de cuotas: una fila del mes y una suma sobre fechas de vencimiento.
+    """
     try:
         hoy = date.today()
         
@@ -66,92 +71,61 @@ async def obtener_kpis_generales(conn: Connection) -> DashboardKPIs:
         mes_actual = hoy.month
         anio_actual = hoy.year
 
-        # ---------------------------------------------------------
-        # 1. ALUMNOS ACTIVOS
-        # ---------------------------------------------------------
-        query_activos = 'SELECT COUNT(*) FROM "AlumnoActivo"'
-        alumnos_activos = await conn.fetchval(query_activos)
-
-        # ---------------------------------------------------------
-        # 2. CUOTAS VENCIDAS (Cantidad y Monto Total)
-        # ---------------------------------------------------------
-        # Condición: No pagadas Y fechaFin menor a hoy
-        query_vencidas_data = '''
-            SELECT COUNT(*) as cantidad, COALESCE(SUM(monto), 0) as total
-            FROM "Cuota" 
-            WHERE pagada = FALSE AND "fechaFin" < $1
-        '''
-        res_vencidas = await conn.fetchrow(query_vencidas_data, hoy)
-        cant_vencidas = res_vencidas['cantidad']
-        monto_vencidas = float(res_vencidas['total'])
-
-        # ---------------------------------------------------------
-        # 3. INGRESOS / RECAUDACIÓN (Monto)
-        # ---------------------------------------------------------
-        # Cuotas pagadas efectivamente en este mes (por fechaDePago)
-        query_cobrado = '''
-            SELECT COALESCE(SUM(monto), 0) 
-            FROM "Cuota" 
-            WHERE pagada = TRUE 
-                AND EXTRACT(MONTH FROM "fechaDePago") = $1
-                AND EXTRACT(YEAR FROM "fechaDePago") = $2
+        query = '''
+            SELECT
+                (SELECT COUNT(*) FROM "AlumnoActivo") as alumnos_activos,
+                -- Vencidas: impagas con fechaFin menor a hoy
+                COALESCE(v.cantidad, 0) as cant_vencidas,
+                COALESCE(v.monto, 0) as monto_vencidas,
+                -- Mes actual (generadas por fechaComienzo, pagadas por fechaDePago)
+                COALESCE(m.generadas, 0) as total_generadas,
+                COALESCE(m.pagadas, 0) as total_pagadas,
+                COALESCE(m."montoPagado", 0) as cantidad_cobrado
+            FROM (
+                SELECT SUM(cantidad) as cantidad, SUM(monto) as monto
+                FROM "KpiCuotaVencimiento"
+                WHERE "fechaFin" < $1
+            ) v
+            LEFT JOIN "KpiCuotaMensual" m ON m.anio = $2 AND m.mes = $3
         '''
-        cantidad_cobrado = await conn.fetchval(query_cobrado, mes_actual, anio_actual)
-        ingreso_mensual = cantidad_cobrado 
-
-        # ---------------------------------------------------------
-        # 4. PORCENTAJE DE COBRO
-        # ---------------------------------------------------------
-        
-        # A) DENOMINADOR: Cuotas Generadas este mes
-        # Usamos 'fechaComienzo' en lugar de la columna 'mes' para evitar problemas de idioma
-        query_generadas = '''
-            SELECT COUNT(*) 
-            FROM "Cuota" 
-            WHERE EXTRACT(MONTH FROM "fechaComienzo") = $1
-                AND EXTRACT(YEAR FROM "fechaComienzo") = $2
-        '''
-        total_generadas = await conn.fetchval(query_generadas, mes_actual, anio_actual)
-
-        # B) NUMERADOR: Cuotas Pagadas este mes (Recaudación)
-        query_pagadas_mes_actual = '''
-            SELECT COUNT(*) 
-            FROM "Cuota" 
-            WHERE pagada = TRUE 
-                AND EXTRACT(MONTH FROM "fechaDePago") = $1 
-                AND EXTRACT(YEAR FROM "fechaDePago") = $2
-        '''
-        total_pagadas_este_mes = await conn.fetchval(query_pagadas_mes_actual, mes_actual, anio_actual)
+        kpis = await conn.fetchrow(query, hoy, anio_actual, mes_actual)
 
+        # PORCENTAJE DE COBRO: pagadas este mes / generadas este mes
         porcentaje = 0.0
-        if total_generadas > 0:
-            porcentaje = round((total_pagadas_este_mes / total_generadas) * 100, 2)
+        if kpis['total_generadas'] > 0:
+            porcentaje = round((kpis['total_pagadas'] / kpis['total_generadas']) * 100, 2)
+
+        cantidad_cobrado = float(kpis['cantidad_cobrado'])
 
         return DashboardKPIs(
-            alumnos_activos=alumnos_activos,
-            cuotas_vencidas=cant_vencidas,
-            monto_cuotas_vencidas=monto_vencidas,
-            ingreso_mensual=float(ingreso_mensual),
-            cantidad_cobrado=float(cantidad_cobrado),
+            alumnos_activos=kpis['alumnos_activos'],
+            cuotas_vencidas=kpis['cant_vencidas'],
+            monto_cuotas_vencidas=float(kpis['monto_vencidas']),
+            ingreso_mensual=cantidad_cobrado,
+            cantidad_cobrado=cantidad_cobrado,
             porcentaje_cobro=porcentaje
         )
 
     except Exception as e:
         raise DatabaseException("Error al calcular KPIs del dashboard", str(e))
 
+async def reconstruir_kpi_snapshot(conn: Connection) -> None:
+    """
+    Reconstruye desde cero el snapshot de KPIs a partir de "Cuota" (reconciliación).
+    Bloquea las escrituras sobre "Cuota" mientras corre.
+    """
+    try:
+        async with conn.transaction():
+            await conn.execute('SELECT kpi_cuota_reconstruir()')
+    except Exception as e:
+        raise DatabaseException("reconstruir snapshot de KPIs", str(e))
+
 async def obtener_alumnos_por_turno_mensual(conn: Connection) -> GraficoTurnosResponse:
     try:
-        hoy = date.today()
-        
-        # --- 1. Calcular fecha de inicio (hace 6 meses) MANUALMENTE ---
-        # Restamos meses manejando el cambio de año
-        mes_inicio = hoy.month - 6
-        anio_inicio = hoy.year
-        if mes_inicio <= 0:
-            mes_inicio += 12
-            anio_inicio -= 1
-        
-        fecha_inicio = date(anio_inicio, mes_inicio, 1)
+        # --- 1. Rango [inicio, fin) de los últimos 7 meses (incluye el actual) ---
+        periodo = Periodo.ultimos_meses(7)
+        mes_inicio = periodo.mes
+        anio_inicio = periodo.anio
         
         # --- 2. Generar etiquetas y keys para los últimos 7 meses ---
         nombres_meses = {
@@ -181,24 +155,21 @@ async def obtener_alumnos_por_turno_mensual(conn: Connection) -> GraficoTurnosRe
         data_tarde = [0] * 7
 
         # --- 3. Consulta SQL CORREGIDA ---
-        # El GROUP BY ahora usa las expresiones completas para evitar el error de Postgres
+        # Filtra y agrupa por "periodo" (clave de partición): solo lee las particiones del gráfico
         query = """
             SELECT 
-                EXTRACT(YEAR FROM c."fechaComienzo")::int as anio,
-                EXTRACT(MONTH FROM c."fechaComienzo")::int as mes,
+                EXTRACT(YEAR FROM c.periodo)::int as anio,
+                EXTRACT(MONTH FROM c.periodo)::int as mes,
                 MIN(h."horaInicio") as hora_inicio,
                 c.dni
             FROM "Cuota" c
             JOIN "Asiste" a ON c.dni = a.dni
             JOIN "Horario" h ON a."nroGrupo" = h."nroGrupo"
-            WHERE c."fechaComienzo" >= $1
-            GROUP BY 
-                EXTRACT(YEAR FROM c."fechaComienzo"), 
-                EXTRACT(MONTH FROM c."fechaComienzo"), 
-                c.dni
+            WHERE c.periodo >= $1 AND c.periodo < $2
+            GROUP BY c.periodo, c.dni
         """
         
-        rows = await conn.fetch(query, fecha_inicio)
+        rows = await conn.fetch(query, *periodo)
 
         # --- 4. Procesar resultados ---
         for row in rows:
@@ -236,121 +207,101 @@ async def obtener_alumnos_por_turno_mensual(conn: Connection) -> GraficoTurnosRe
         print(f"DEBUG ERROR: {str(e)}")
         raise DatabaseException("Error al calcular gráfico de turnos", str(e))
 
-async def obtener_estadisticas_entrenador(conn: Connection, dni_empleado: str) -> EntrenadorStats:
+# Métricas de todos los empleados en una sola pasada:
+# - alumnos a cargo: alumnos únicos que asisten a algún grupo/día que el empleado tiene asignado (Pertenece).
+# - recaudado: cuotas cobradas en el período cuyo titular es el empleado ("nombre apellido").
+# - pendientes: cuotas impagas (históricas) de sus alumnos a cargo.
+# $1/$2 = rango [inicio, fin) del mes pedido, $3 = DNI opcional para filtrar un solo empleado.
+QUERY_STATS_EMPLEADOS = '''
+    WITH emp AS (
+        SELECT e.dni, e.rol, p.nombre, p.apellido, p.nombre || ' ' || p.apellido AS titular
+        FROM "Empleado" e
+        JOIN "Persona" p ON e.dni = p.dni
+        WHERE $3::text IS NULL OR e.dni = $3
+    ),
+    a_cargo AS (
+        SELECT DISTINCT pe."dniEmpleado", a.dni
+        FROM "Pertenece" pe
+        JOIN "Asiste" a ON a."nroGrupo" = pe."nroGrupo" AND a.dia = pe.dia
+        WHERE pe."dniEmpleado" IN (SELECT dni FROM emp)
+    ),
+    alumnos AS (
+        SELECT "dniEmpleado", COUNT(*) AS cantidad
+        FROM a_cargo
+        GROUP BY "dniEmpleado"
+    ),
+    pendientes AS (
+        SELECT ac."dniEmpleado", COUNT(*) AS cantidad
+        FROM a_cargo ac
+        JOIN "Cuota" c ON c.dni = ac.dni AND c.pagada = FALSE
+        GROUP BY ac."dniEmpleado"
+    ),
+    recaudado AS (
+        SELECT c.titular, SUM(c.monto) AS monto
+        FROM "Cuota" c
+        WHERE c.pagada = TRUE
+            AND c."fechaDePago" >= $1 AND c."fechaDePago" < $2
+            AND c.titular IN (SELECT titular FROM emp)
+        GROUP BY c.titular
+    )
+    SELECT
+        emp.nombre, emp.apellido, emp.dni, emp.rol,
+        COALESCE(al.cantidad, 0)::INTEGER AS alumnos_a_cargo,
+        COALESCE(r.monto, 0) AS monto_recaudado_mes,
+        COALESCE(pd.cantidad, 0)::INTEGER AS cuotas_pendientes
+    FROM emp
+    LEFT JOIN alumnos al ON al."dniEmpleado" = emp.dni
+    LEFT JOIN pendientes pd ON pd."dniEmpleado" = emp.dni
+    LEFT JOIN recaudado r ON r.titular = emp.titular
+    ORDER BY emp.apellido, emp.nombre
+'''
+
+def _fila_a_stats(row) -> EntrenadorStats:
+    return EntrenadorStats(
+        nombre=row['nombre'],
+        apellido=row['apellido'],
+        dni=row['dni'],
+        rol=row['rol'],
+        alumnos_a_cargo=row['alumnos_a_cargo'],
+        monto_recaudado_mes=float(row['monto_recaudado_mes']),
+        cuotas_pendientes=row['cuotas_pendientes']
+    )
+
+async def obtener_estadisticas_entrenador(
+    conn: Connection, dni_empleado: str, mes: Optional[int] = None, anio: Optional[int] = None
+) -> EntrenadorStats:
     """
     Calcula métricas específicas para el entrenador/staff logueado:
     1. Datos personales.
     2. Alumnos únicos que asisten a sus grupos.
-    3. Recaudación de ESOS alumnos en el mes actual.
+    3. Recaudación de ESOS alumnos en el mes pedido (por defecto, el actual).
     4. Deudas pendientes de ESOS alumnos.
     """
     try:
-        hoy = date.today()
-        mes_actual = hoy.month
-        anio_actual = hoy.year
-
-        # 1. Obtener datos básicos del Empleado (unimos Persona y Empleado para sacar el Rol)
-        query_empleado = '''
-            SELECT p.nombre, p.apellido, e.dni, e.rol
-            FROM "Empleado" e
-            JOIN "Persona" p ON e.dni = p.dni
-            WHERE e.dni = $1
-        '''
-        empleado = await conn.fetchrow(query_empleado, dni_empleado)
-        
-        if not empleado:
-            # Si no es empleado (ej: es Admin puro sin registro en tabla Empleado, aunque tu lógica los crea),
-            # devolvemos datos vacíos o buscamos solo en Persona.
-            # Asumiremos que existe en Empleado o Persona.
-            raise NotFoundException("Empleado", dni_empleado)
-
-        # 2. Identificar a los alumnos a cargo (Subquery reutilizable)
-        # Un alumno está "a cargo" si asiste a un grupo (Pertenece) donde el dniEmpleado es el del usuario.
-        subquery_mis_alumnos = '''
-            SELECT DISTINCT a.dni
-            FROM "Asiste" a
-            JOIN "Pertenece" p ON a."nroGrupo" = p."nroGrupo" AND a.dia = p.dia
-            WHERE p."dniEmpleado" = $1
-        '''
-
-        # A) Cantidad de Alumnos a Cargo
-        query_cant_alumnos = f'''
-            SELECT COUNT(*) FROM ({subquery_mis_alumnos}) as mis_alumnos
-        '''
-        alumnos_a_cargo = await conn.fetchval(query_cant_alumnos, dni_empleado)
-
-        # B) Monto Recaudado (Mes Actual) de MIS alumnos
-        # Sumamos las cuotas pagadas este mes, pero SOLO de los DNIs que me pertenecen
-        # Armamos el nombre tal como se guarda en el campo titular de la BD
-        nombre_completo_titular = f"{empleado['nombre']} {empleado['apellido']}"
-        
-        query_recaudado = '''
-            SELECT COALESCE(SUM(c.monto), 0)
-            FROM "Cuota" c
-            WHERE c.pagada = TRUE
-                AND EXTRACT(MONTH FROM c."fechaDePago") = $1
-                AND EXTRACT(YEAR FROM c."fechaDePago") = $2
-                AND c.titular = $3
-        '''
-        monto_recaudado = await conn.fetchval(query_recaudado, mes_actual, anio_actual, nombre_completo_titular)
-
-        # C) Cuotas Pendientes de MIS alumnos
-        # Contamos todas las cuotas impagas de mis alumnos (históricas)
-        query_pendientes = f'''
-            SELECT COUNT(*)
-            FROM "Cuota" c
-            WHERE c.pagada = FALSE
-                AND c.dni IN ({subquery_mis_alumnos})
-        '''
-        cuotas_pendientes = await conn.fetchval(query_pendientes, dni_empleado)
-
-        return EntrenadorStats(
-            nombre=empleado['nombre'],
-            apellido=empleado['apellido'],
-            dni=empleado['dni'],
-            rol=empleado['rol'],
-            alumnos_a_cargo=alumnos_a_cargo,
-            monto_recaudado_mes=float(monto_recaudado),
-            cuotas_pendientes=cuotas_pendientes
-        )
-
+        row = await conn.fetchrow(QUERY_STATS_EMPLEADOS, *Periodo.mensual(mes, anio), dni_empleado)
     except Exception as e:
-        # Si el error es NotFound, lo dejamos pasar, sino es de BD
-        if "NotFound" in str(e): raise
         raise DatabaseException("Error al calcular estadísticas de entrenador", str(e))
 
-async def obtener_stats_todos_empleados(conn: Connection) -> List[EntrenadorStats]:
+    if not row:
+        raise NotFoundException("Empleado", dni_empleado)
+
+    return _fila_a_stats(row)
+
+async def obtener_stats_todos_empleados(
+    conn: Connection, mes: Optional[int] = None, anio: Optional[int] = None
+) -> List[EntrenadorStats]:
     """
-    Obtiene las estadísticas de rendimiento para TODOS los empleados registrados.
+    Obtiene las estadísticas de rendimiento para TODOS los empleados registrados
+    en una sola consulta (sin importar cuántos empleados haya).
+    Con mes/anio se obtiene el ranking de un período histórico.
     """
     try:
-        # 1. Obtener lista de todos los empleados
-        query_empleados = '''
-            SELECT e.dni 
-            FROM "Empleado" e
-            JOIN "Persona" p ON e.dni = p.dni
-            ORDER BY p.apellido, p.nombre
-        '''
-        empleados_rows = await conn.fetch(query_empleados)
-        
-        lista_stats = []
-        
-        # 2. Iterar y calcular stats por cada uno
-        # (Reutilizamos la lógica que diseñamos antes, pero encapsulada o inline)
-        for row in empleados_rows:
-            # Llamamos a la función individual para cada DNI
-            # Nota: Esto hace varias queries. Si tienes 50 empleados podría ser lento,
-            # pero para un gimnasio normal (5-10 profes) es perfectamente aceptable y más limpio.
-            stats = await obtener_estadisticas_entrenador(conn, row['dni'])
-            lista_stats.append(stats)
-            
-        return lista_stats
+        rows = await conn.fetch(QUERY_STATS_EMPLEADOS, *Periodo.mensual(mes, anio), None)
+        return [_fila_a_stats(row) for row in rows]
 
     except Exception as e:
         raise DatabaseException("Error listando stats de empleados", str(e))
 
-
-
 async def obtener_recaudacion_mensual(conn: Connection, mes: int, anio: int) -> EstadisticasResponse:
     try:
         # Consulta optimizada en PostgreSQL: Agrupa por titular y suma condicionalmente
@@ -362,13 +313,12 @@ async def obtener_recaudacion_mensual(conn: Connection, mes: int, anio: int) ->
                 COALESCE(SUM(CASE WHEN "metodoDePago" ILIKE '%transferencia%' THEN monto ELSE 0 END), 0) AS total_transferencia
             FROM "Cuota"
             WHERE pagada = true 
-                AND EXTRACT(MONTH FROM "fechaDePago") = $1
-                AND EXTRACT(YEAR FROM "fechaDePago") = $2
+                AND "fechaDePago" >= $1 AND "fechaDePago" < $2
             GROUP BY titular;
         """
         
-        # Usamos fetch de asyncpg pasando los parámetros
-        resultados = await conn.fetch(query, mes, anio)
+        # Usamos fetch de asyncpg pasando el rango [inicio, fin) del mes
+        resultados = await conn.fetch(query, *Periodo.mensual(mes, anio))
 
         total_general = 0.0
         admin_data = DesgloseAdmin(totalRecaudado=0.0, totalEfectivo=0.0, totalTransferencia=0.0)
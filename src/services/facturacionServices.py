@@ -3,92 +3,98 @@
 from asyncpg import Connection
 from datetime import date, datetime, timedelta
 from typing import List, Optional
-from decimal import Decimal
-from io import BytesIO
 
 # Imports para PDF
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import cm
+from utils.pdf import renderizar_pdf
+from utils.pdf_plantillas import reporte_facturacion
 
 from schemas.facturacionSchema import FacturacionResponse, ReporteFacturacion, DetalleCuotaFactura
 
-async def generar_cierre_quincenal(conn: Connection, fecha_inicio: date, fecha_fin: date) -> List[FacturacionResponse]:
-    """
-    Genera el cierre de facturación utilizando el campo 'titular' persistido en la Cuota.
-    """
-    query_busqueda = """
-        SELECT 
-            "idCuota",
-            monto,
-            COALESCE(titular, 'Administración') as titular -- Usamos el campo persistido
+from utils.exceptions import BusinessRuleException, DatabaseException
+from utils.periodo import Periodo
+
+# Cierre en una sola sentencia: agrupa por titular las cuotas del período, inserta una
+# "Facturacion" por titular y marca sus cuotas. La memoria no depende de cuántas cuotas haya.
+# $4 es el límite inferior de fecha de pago; en NULL toma también las cuotas de quincenas
+# anteriores que quedaron sin facturar (cierre automático).
+QUERY_CIERRE_QUINCENAL = """
+    WITH candidatas AS (
+        SELECT "idCuota", periodo, monto, COALESCE(titular, 'Administración') AS titular
         FROM "Cuota"
-        WHERE pagada = True 
-            AND facturado = False
+        WHERE pagada = TRUE
+            AND facturado = FALSE
             AND "metodoDePago" IN ('qr', 'transferencia')
+            AND "fechaDePago" <= $2
+            AND ($4::date IS NULL OR "fechaDePago" >= $4)
+        FOR UPDATE
+    ),
+    totales AS (
+        SELECT titular, SUM(monto) AS "montoTotal", COUNT(*) AS "cantidadCuotas"
+        FROM candidatas
+        GROUP BY titular
+    ),
+    facturas AS (
+        INSERT INTO "Facturacion"
+            ("fechaInicio", "fechaFin", "fechaGeneracion", "montoTotal", "cantidadCuotas", "titular")
+        SELECT $1, $2, $3, "montoTotal", "cantidadCuotas", titular
+        FROM totales
+        ORDER BY titular
+        RETURNING "idFacturacion", "fechaInicio", "fechaFin", "fechaGeneracion", "montoTotal", "cantidadCuotas", "titular"
+    ),
+    facturadas AS (
+        UPDATE "Cuota" c
+        SET facturado = TRUE,
+            "idFacturacion" = f."idFacturacion"
+        FROM candidatas k
+        JOIN facturas f ON f.titular = k.titular
+        WHERE c."idCuota" = k."idCuota" AND c.periodo = k.periodo
+        RETURNING c."idCuota"
+    )
+    SELECT f.*, (SELECT COUNT(*) FROM facturadas) AS facturadas
+    FROM facturas f
+    ORDER BY f.titular
+"""
+
+async def generar_cierre_quincenal(
+    conn: Connection,
+    fecha_inicio: date,
+    fecha_fin: date,
+    incluir_atrasadas: bool = False
+) -> List[FacturacionResponse]:
     """
+    Genera el cierre de facturación del período [fecha_inicio, fecha_fin] (por fecha de pago),
+    agrupando por el campo 'titular' persistido en la Cuota.
 
-    async with conn.transaction():
-        rows = await conn.fetch(query_busqueda)
+    Con `incluir_atrasadas` factura además las cuotas pagadas antes de `fecha_inicio` que
+    siguen sin facturar (p. ej. si falló o no corrió el cierre de una quincena anterior).
 
-        if not rows:
-            return []
-
-        # Agrupar en memoria por el titular guardado en la cuota
-        agrupado = {}
-        for row in rows:
-            titular = row['titular']
-            monto = row['monto']
-            cuota_id = row['idCuota']
-
-            if titular not in agrupado:
-                agrupado[titular] = {
-                    'montoTotal': Decimal(0), 
-                    'cantidadCuotas': 0, 
-                    'ids': []
-                }
-            
-            agrupado[titular]['montoTotal'] += monto
-            agrupado[titular]['cantidadCuotas'] += 1
-            agrupado[titular]['ids'].append(cuota_id)
-
-        facturas_generadas = []
-        fecha_generacion = datetime.now()
+    Toma un advisory lock de transacción: si el scheduler y un cierre manual corren a la vez,
+    el segundo espera al primero y ya no encuentra cuotas sin facturar (no se factura dos veces).
+    """
+    if fecha_inicio > fecha_fin:
+        raise BusinessRuleException("La fecha de inicio del cierre no puede ser posterior a la fecha de fin.")
 
-        for titular, datos in agrupado.items():
-            insert_factura = """
-                INSERT INTO "Facturacion" 
-                ("fechaInicio", "fechaFin", "fechaGeneracion", "montoTotal", "cantidadCuotas", "titular")
-                VALUES ($1, $2, $3, $4, $5, $6)
-                RETURNING "idFacturacion", "fechaInicio", "fechaFin", "fechaGeneracion", "montoTotal", "cantidadCuotas", "titular"
-            """
-            
-            factura_row = await conn.fetchrow(
-                insert_factura, 
-                fecha_inicio, 
-                fecha_fin, 
-                fecha_generacion, 
-                datos['montoTotal'], 
-                datos['cantidadCuotas'],
-                titular
+    try:
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext('cierre_facturacion'))")
+            rows = await conn.fetch(
+                QUERY_CIERRE_QUINCENAL, fecha_inicio, fecha_fin, datetime.now(),
+                None if incluir_atrasadas else fecha_inicio
             )
-            
-            id_facturacion = factura_row['idFacturacion']
 
-            if datos['ids']:
-                update_cuotas = """
-                    UPDATE "Cuota"
-                    SET facturado = True,
-                        "idFacturacion" = $1
-                    WHERE "idCuota" = ANY($2::int[])
-                """
-                await conn.execute(update_cuotas, id_facturacion, datos['ids'])
-
-            facturas_generadas.append(FacturacionResponse(**dict(factura_row)))
+            # Cada cuota agrupada tiene que haber quedado asociada a su factura
+            esperadas = sum(row['cantidadCuotas'] for row in rows)
+            if rows and rows[0]['facturadas'] != esperadas:
+                raise RuntimeError(
+                    f"se agruparon {esperadas} cuotas pero se marcaron {rows[0]['facturadas']}"
+                )
+    except Exception as e:
+        raise DatabaseException("generar cierre de facturación", str(e))
 
-        return facturas_generadas
+    return [
+        FacturacionResponse(**{k: v for k, v in dict(row).items() if k != 'facturadas'})
+        for row in rows
+    ]
 
 async def obtener_reporte_por_id(conn: Connection, id_facturacion: int) -> Optional[ReporteFacturacion]:
     """
@@ -130,118 +136,12 @@ async def obtener_reporte_por_id(conn: Connection, id_facturacion: int) -> Optio
     datos_factura = dict(factura_row)
     return ReporteFacturacion(**datos_factura, detalles=detalles)
 
-def generar_pdf_reporte(reporte: ReporteFacturacion) -> bytes:
+async def generar_pdf_reporte(reporte: ReporteFacturacion) -> bytes:
     """
-    Genera un PDF con diseño técnico minimalista basado en los datos del reporte.
-    Retorna los bytes del PDF con metadatos de título corregidos.
+    Genera el PDF del reporte en el pool de procesos (utils/pdf.py), fuera del event loop.
+    Retorna los bytes del PDF.
     """
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer, 
-        pagesize=A4,
-        rightMargin=1.5*cm, leftMargin=1.5*cm, 
-        topMargin=1.5*cm, bottomMargin=1.5*cm
-    )
-    
-    # Formateamos las fechas para el título interno
-    f_inicio = reporte.fechaInicio.strftime("%d/%m/%Y")
-    f_fin = reporte.fechaFin.strftime("%d/%m/%Y")
-    titulo_metadato = f"ReporteFacturacion ({f_inicio} - {f_fin})"
-
-    # --- Función interna para fijar el título en el canvas ---
-    def fijar_metadatos(canvas, doc):
-        canvas.setTitle(titulo_metadato)
-        canvas.setAuthor("Gimnasio Abito")
-
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # --- 1. Encabezado Minimalista ---
-    title_style = ParagraphStyle(
-        'TechnicalTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        leading=20,
-        alignment=1, # Center
-        spaceAfter=10,
-        fontName='Helvetica-Bold'
-    )
-    
-    elements.append(Paragraph(f"REPORTE DE FACTURACIÓN #{reporte.idFacturacion}", title_style))
-    elements.append(Spacer(1, 0.5*cm))
-
-    # --- 2. Información General ---
-    info_data = [
-        [f"TITULAR: {reporte.titular.upper()}", ""],
-        [f"PERIODO: {f_inicio} - {f_fin}", f"TOTAL CUOTAS: {reporte.cantidadCuotas}"],
-        [f"MONTO TOTAL :", f"$ {reporte.montoTotal:,.2f}"]
-    ]
-
-    t_info = Table(info_data, colWidths=[10*cm, 8*cm])
-    t_info.setStyle(TableStyle([
-        ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-        ('FONTSIZE', (0,0), (-1,-1), 10),
-        ('FONTNAME', (0,2), (0,2), 'Helvetica-Bold'),
-        ('FONTNAME', (1,2), (1,2), 'Helvetica-Bold'),
-        ('TEXTCOLOR', (0,0), (-1,-1), colors.darkgray),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-    ]))
-    elements.append(t_info)
-    elements.append(Spacer(1, 1*cm))
-
-    # --- 3. Tabla de Detalles ---
-    headers = ["FECHA", "HORA", "CONCEPTO", "MÉTODO", "MONTO"]
-    data_tabla = [headers]
-    
-    for det in reporte.detalles:
-        fecha_fmt = det.fechaPago.strftime("%d/%m/%Y") if det.fechaPago else "-"
-        
-        hora_fmt = "-"
-        if hasattr(det, 'horaDePago') and det.horaDePago:
-            try:
-                hora_fmt = det.horaDePago.strftime("%H:%M:%S")
-            except AttributeError:
-                hora_fmt = str(det.horaDePago)
-        
-        row = [
-            fecha_fmt,
-            hora_fmt,
-            det.concepto[:35],
-            det.metodoDePago.upper() if det.metodoDePago else "-",
-            f"$ {det.monto:,.0f}"
-        ]
-        data_tabla.append(row)
-
-    col_widths = [3*cm, 2.5*cm, 7.5*cm, 2.5*cm, 2.5*cm]
-    t_detalles = Table(data_tabla, colWidths=col_widths)
-
-    style_tabla = TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.Color(0.9, 0.9, 0.9)),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.black),
-        ('ALIGN', (0,0), (-1,0), 'CENTER'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 8),
-        ('BOTTOMPADDING', (0,0), (-1,0), 8),
-        ('TOPPADDING', (0,0), (-1,0), 8),
-        ('FONTNAME', (0,1), (-1,-1), 'Helvetica'),
-        ('FONTSIZE', (0,1), (-1,-1), 8),
-        ('ALIGN', (0,1), (-1,-1), 'CENTER'),
-        ('ALIGN', (2,1), (2,-1), 'LEFT'),
-        ('ALIGN', (-1,1), (-1,-1), 'RIGHT'),
-        ('LINEBELOW', (0,0), (-1,0), 1, colors.black),
-        ('LINEBELOW', (0,1), (-1,-1), 0.5, colors.lightgrey),
-    ])
-    
-    t_detalles.setStyle(style_tabla)
-    elements.append(t_detalles)
-
-    # --- CAMBIO CLAVE ---
-    # Pasamos la función fijar_metadatos a onFirstPage
-    doc.build(elements, onFirstPage=fijar_metadatos)
-    
-    pdf = buffer.getvalue()
-    buffer.close()
-    return pdf
+    return await renderizar_pdf(reporte_facturacion, reporte.model_dump())
 
 async def obtener_todas_facturaciones(conn: Connection) -> List[FacturacionResponse]:
     """
@@ -266,44 +166,20 @@ async def obtener_todas_facturaciones(conn: Connection) -> List[FacturacionRespo
     # Convertimos cada fila en un objeto Pydantic
     return [FacturacionResponse(**dict(row)) for row in rows]
 
-async def procesar_cierre_automatico(conn: Connection):
+async def procesar_cierre_automatico(conn: Connection, hoy: Optional[date] = None) -> int:
     """
-    Determina el periodo a cerrar basándose en la fecha actual y ejecuta el cierre.
-    Se espera que esta función corra los días 1 y 15.
+    Cierra la última quincena terminada (ver Periodo.quincena_cerrada), junto con las cuotas de
+    quincenas anteriores que hayan quedado sin facturar. Pensada para los días 1 y 16, pero se
+    puede correr cualquier día: el cierre es idempotente porque solo toma cuotas sin facturar.
+    Devuelve la cantidad de cuotas facturadas.
     """
-    hoy = date.today()
-    fecha_inicio = None
-    fecha_fin = None
-
-    # Lógica de Fechas
-    if hoy.day == 1:
-        # Caso: Es día 1. Cerramos la quincena del mes ANTERIOR (día 16 al fin de mes).
-        # Restamos 1 día para volver al mes pasado
-        ultimo_dia_mes_anterior = hoy - timedelta(days=1)
-        fecha_fin = ultimo_dia_mes_anterior
-        fecha_inicio = date(ultimo_dia_mes_anterior.year, ultimo_dia_mes_anterior.month, 16)
-        
-    elif hoy.day == 15:
-        # Caso: Es día 15. Cerramos la primera quincena del mes ACTUAL (día 1 al 15).
-        fecha_inicio = date(hoy.year, hoy.month, 1)
-        fecha_fin = hoy
-    else:
-        # Por seguridad, si el scheduler corre otro día, no hacemos nada o asumimos manual
-        print(f"[Facturacion Auto] Ejecución en día no estándar ({hoy.day}). Se omitirá.")
-        return
-
+    periodo = Periodo.quincena_cerrada(hoy)
+    fecha_inicio, fecha_fin = periodo.inicio, periodo.fin - timedelta(days=1)
     print(f"[Facturacion Auto] Procesando cierre para periodo: {fecha_inicio} al {fecha_fin}")
 
-    try:
-        # Llamamos a la función que ya creamos antes
-        reportes = await generar_cierre_quincenal(conn, fecha_inicio, fecha_fin)
-        
-        if reportes:
-            print(f"[Facturacion Auto] Cierre exitoso. {len(reportes)} facturas generadas.")
-        else:
-            print("[Facturacion Auto] No hubo movimientos para facturar en este periodo.")
-            
-    except Exception as e:
-        print(f"[Facturacion Auto] Error crítico: {str(e)}")
-
-
+    reportes = await generar_cierre_quincenal(conn, fecha_inicio, fecha_fin, incluir_atrasadas=True)
+    if reportes:
+        print(f"[Facturacion Auto] Cierre exitoso. {len(reportes)} facturas generadas.")
+    else:
+        print("[Facturacion Auto] No hubo movimientos para facturar en este periodo.")
+    return sum(r.cantidadCuotas for r in reportes)
@@ -1,5 +1,4 @@
-import json
-from asyncpg import Connection, UniqueViolationError, ForeignKeyViolationError
+from asyncpg import Connection, UniqueViolationError, ForeignKeyViolationError, ExclusionViolationError
 from typing import List, Optional
 from datetime import time
 
@@ -12,7 +11,10 @@ from schemas.horarioSchema import (
     DiaConCapacidad,
     HorarioCompletoCreate,
     PerteneceResponse,
-    HorarioCompletoUpdate
+    HorarioCompletoUpdate,
+    TemporadaValidar,
+    TemporadaValidacionResponse,
+    ConflictoTemporada
 )
 
 from utils.exceptions import (
@@ -21,6 +23,11 @@ from utils.exceptions import (
     DatabaseException,
     DuplicateEntryException
 )
+from utils.cache import catalogo_cache
+from utils.intervalos import IndiceIntervalos, superposiciones
+
+def _mensaje_superposicion(hora_inicio: time, hora_fin: time) -> str:
+    return f"El rango horario {hora_inicio.strftime('%H:%M')}-{hora_fin.strftime('%H:%M')} se superpone con un grupo existente."
 
 async def crear_horario(conn: Connection, horario: HorarioCreate) -> HorarioResponse:
     """
@@ -38,10 +45,14 @@ async def crear_horario(conn: Connection, horario: HorarioCreate) -> HorarioResp
             horario.horaInicio,
             horario.horaFin
         )
+        catalogo_cache.invalidar("horarios")
         return HorarioResponse(**result)
     
     except UniqueViolationError:
         raise DuplicateEntryException("nroGrupo", horario.nroGrupo)
+    except ExclusionViolationError:
+        # Otro request creó un grupo superpuesto entre la validación y el INSERT
+        raise BusinessRuleException(_mensaje_superposicion(horario.horaInicio, horario.horaFin))
     except Exception as e:
         raise DatabaseException("crear horario", str(e))
 
@@ -93,6 +104,7 @@ async def crear_relacion_grupo_dia(conn: Connection, pertenece: PerteneceCreate)
             pertenece.dniEmpleado
         )
         
+        catalogo_cache.invalidar("horarios")
         return dict(result)
 
     except ForeignKeyViolationError as e:
@@ -103,49 +115,73 @@ async def crear_relacion_grupo_dia(conn: Connection, pertenece: PerteneceCreate)
     except Exception as e:
         raise DatabaseException("crear relación grupo-día", str(e))
 
-async def obtener_horarios_completos(conn: Connection) -> List[HorarioCompletoResponse]:
-    try:
-        query = """
-        SELECT 
-            h."nroGrupo",
-            h."horaInicio",
-            h."horaFin",
-            COALESCE(
-                JSON_AGG(
-                    JSON_BUILD_OBJECT(
-                        'dia', p.dia,
-                        'capacidadMax', p."capacidadMax",
-                        'empleado', p."dniEmpleado",
-                        'alumnos_inscritos', (
-                            SELECT COUNT(*) 
-                            FROM "Asiste" a 
-                            WHERE a."nroGrupo" = h."nroGrupo" 
-                            AND a.dia = p.dia
-                        )
-                    )
-                ) FILTER (WHERE p.dia IS NOT NULL),
-                '[]'::json
-            ) as dias_info
-        FROM "Horario" h
-        LEFT JOIN "Pertenece" p ON h."nroGrupo" = p."nroGrupo"
-        GROUP BY h."nroGrupo", h."horaInicio", h."horaFin"
-        ORDER BY h."horaInicio"
-        """
-        resultados = await conn.fetch(query)
-        
-        horarios = []
-        for row in resultados:
-            # Convertir la cadena JSON a lista de Python
-            dias_info = json.loads(row["dias_info"]) if isinstance(row["dias_info"], str) else row["dias_info"]
-
-            horario_data = {
+async def _catalogo_horarios(conn: Connection) -> dict:
+    """
+    Estructura de grupos y días (sin ocupación), cacheada por proceso:
+    {"dias": días válidos, "grupos": [{nroGrupo, horaInicio, horaFin, dias: [{dia, capacidadMax, empleado}]}],
+     "intervalos": IndiceIntervalos de los rangos horarios por nroGrupo}
+    Los grupos quedan ordenados por horaInicio. Se invalida con catalogo_cache.invalidar("horarios")
+    y por NOTIFY desde los triggers de "Horario", "Pertenece" y "Dia".
+    """
+    async def cargar():
+        filas = await conn.fetch("""
+            SELECT h."nroGrupo", h."horaInicio", h."horaFin", p.dia, p."capacidadMax", p."dniEmpleado"
+            FROM "Horario" h
+            LEFT JOIN "Pertenece" p ON h."nroGrupo" = p."nroGrupo"
+            ORDER BY h."horaInicio", h."nroGrupo"
+        """)
+        dias = await conn.fetch('SELECT dia FROM "Dia"')
+
+        grupos = {}
+        for row in filas:
+            grupo = grupos.setdefault(row["nroGrupo"], {
                 "nroGrupo": row["nroGrupo"],
                 "horaInicio": row["horaInicio"],
                 "horaFin": row["horaFin"],
-                "dias_asignados": dias_info  # Ahora es una lista, no una cadena
-            }
-            horarios.append(HorarioCompletoResponse(**horario_data))
-        return horarios
+                "dias": []
+            })
+            if row["dia"] is not None:
+                grupo["dias"].append({
+                    "dia": row["dia"],
+                    "capacidadMax": row["capacidadMax"],
+                    "empleado": row["dniEmpleado"]
+                })
+
+        return {
+            "dias": frozenset(r["dia"] for r in dias),
+            "grupos": list(grupos.values()),
+            "intervalos": IndiceIntervalos((g["nroGrupo"], g["horaInicio"], g["horaFin"]) for g in grupos.values())
+        }
+
+    return await catalogo_cache.obtener(("horarios",), cargar)
+
+async def _ocupacion(conn: Connection, nroGrupo: Optional[str] = None) -> dict:
+    """Ocupación en vivo por (nroGrupo, dia): lee el contador "Pertenece".inscritos."""
+    filas = await conn.fetch(
+        'SELECT "nroGrupo", dia, inscritos FROM "Pertenece" WHERE $1::text IS NULL OR "nroGrupo" = $1',
+        nroGrupo
+    )
+    return {(row["nroGrupo"], row["dia"]): row["inscritos"] for row in filas}
+
+def _dias_con_ocupacion(grupo: dict, ocupacion: dict) -> List[DiaConCapacidad]:
+    return [
+        DiaConCapacidad(**dia, alumnos_inscritos=ocupacion.get((grupo["nroGrupo"], dia["dia"]), 0))
+        for dia in grupo["dias"]
+    ]
+
+def _horario_completo(grupo: dict, ocupacion: dict) -> HorarioCompletoResponse:
+    return HorarioCompletoResponse(
+        nroGrupo=grupo["nroGrupo"],
+        horaInicio=grupo["horaInicio"],
+        horaFin=grupo["horaFin"],
+        dias_asignados=_dias_con_ocupacion(grupo, ocupacion)
+    )
+
+async def obtener_horarios_completos(conn: Connection) -> List[HorarioCompletoResponse]:
+    try:
+        catalogo = await _catalogo_horarios(conn)
+        ocupacion = await _ocupacion(conn)
+        return [_horario_completo(grupo, ocupacion) for grupo in catalogo["grupos"]]
 
     except Exception as e:
         raise DatabaseException("obtener horarios completos", str(e))
@@ -153,55 +189,33 @@ async def obtener_horarios_completos(conn: Connection) -> List[HorarioCompletoRe
 async def obtener_horarios_por_dia_service(conn: Connection, dia: str) -> List[GrupoConDetalles]:
     # Obtener todos los grupos/horarios para un día específico
     try:
+        catalogo = await _catalogo_horarios(conn)
+
         # Verificar que el día existe
-        dia_exists = await conn.fetchval(
-            'SELECT 1 FROM "Dia" WHERE dia = $1', 
-            dia
-        )
-        if not dia_exists:
+        if dia not in catalogo["dias"]:
             raise NotFoundException("Día", dia)
 
-        query = """
-        SELECT 
-            h."nroGrupo",
-            h."horaInicio",
-            h."horaFin",
-            p."capacidadMax",
-            p."dniEmpleado",
-            (
-                SELECT COUNT(*) 
-                FROM "Asiste" a 
-                WHERE a."nroGrupo" = h."nroGrupo" 
-                AND a.dia = p.dia
-            ) as alumnos_inscritos
-        FROM "Horario" h
-        JOIN "Pertenece" p ON h."nroGrupo" = p."nroGrupo"
-        WHERE p.dia = $1
-        ORDER BY h."horaInicio"
-        """
-        
-        resultados = await conn.fetch(query, dia)
-        
+        ocupacion = await _ocupacion(conn)
+
         grupos = []
-        for row in resultados:
-            grupo_data = {
-                "nroGrupo": row["nroGrupo"],
-                "horario": {
-                    "nroGrupo": row["nroGrupo"],
-                    "horaInicio": row["horaInicio"],
-                    "horaFin": row["horaFin"]
-                },
-                "dias": [{
-                    "dia": dia,
-                    "capacidadMax": row["capacidadMax"],
-                    "empleado": row["dniEmpleado"],
-                    "alumnos_inscritos": row["alumnos_inscritos"] or 0
-                }]
-            }
-            grupos.append(GrupoConDetalles(**grupo_data))
+        for grupo in catalogo["grupos"]:
+            dias = [d for d in _dias_con_ocupacion(grupo, ocupacion) if d.dia == dia]
+            if not dias:
+                continue
+            grupos.append(GrupoConDetalles(
+                nroGrupo=grupo["nroGrupo"],
+                horario=HorarioResponse(
+                    nroGrupo=grupo["nroGrupo"],
+                    horaInicio=grupo["horaInicio"],
+                    horaFin=grupo["horaFin"]
+                ),
+                dias=dias
+            ))
         
         return grupos
 
+    except NotFoundException:
+        raise
     except Exception as e:
         raise DatabaseException("obtener horarios por día", str(e))
 
@@ -227,6 +241,7 @@ async def actualizar_capacidad_grupo(
         if not result:
             raise NotFoundException("Relación grupo-día", f"{nroGrupo}-{dia}")
         
+        catalogo_cache.invalidar("horarios")
         return dict(result)
 
     except Exception as e:
@@ -245,6 +260,7 @@ async def eliminar_relacion_grupo_dia(conn: Connection, nroGrupo: str, dia: str)
         if result == "DELETE 0":
             raise NotFoundException("Relación grupo-día", f"{nroGrupo}-{dia}")
         
+        catalogo_cache.invalidar("horarios")
         return True
 
     except NotFoundException:
@@ -252,6 +268,34 @@ async def eliminar_relacion_grupo_dia(conn: Connection, nroGrupo: str, dia: str)
     except Exception as e:
         raise DatabaseException("eliminar relación grupo-día", str(e))
 
+async def verificar_ocupacion(conn: Connection, reparar: bool = False) -> List[dict]:
+    """
+    Compara el contador "Pertenece".inscritos con el conteo real de "Asiste".
+    Devuelve los cupos desfasados; con reparar=True además los corrige.
+    """
+    try:
+        async with conn.transaction():
+            if reparar:
+                # Sin inscripciones nuevas mientras se recalcula
+                await conn.execute('LOCK TABLE "Asiste" IN SHARE MODE')
+
+            desvios = await conn.fetch(
+                'SELECT "nroGrupo", dia, registrado, real FROM "PerteneceOcupacionDesvio" ORDER BY "nroGrupo", dia'
+            )
+
+            if reparar and desvios:
+                await conn.execute('''
+                    UPDATE "Pertenece" p
+                    SET inscritos = d.real
+                    FROM "PerteneceOcupacionDesvio" d
+                    WHERE d."nroGrupo" = p."nroGrupo" AND d.dia = p.dia
+                ''')
+
+            return [dict(row) for row in desvios]
+
+    except Exception as e:
+        raise DatabaseException("verificar ocupación de grupos", str(e))
+
 async def check_horario_overlap(
     conn: Connection, 
     hora_inicio: time, 
@@ -263,34 +307,69 @@ async def check_horario_overlap(
     con alguno existente (OldStart, OldEnd).
 
     La lógica de superposición es: NewStart < OldEnd AND NewEnd > OldStart
+    Se resuelve en memoria con el índice de intervalos del catálogo (O(log n)); la garantía
+    final ante carreras es la exclusion constraint "horario_sin_superposicion".
     """
     try:
-        # $1 = NewStart (hora_inicio)
-        # $2 = NewEnd (hora_fin)
-        # "horaFin" = OldEnd
-        # "horaInicio" = OldStart
-        query = """
-        SELECT 1 FROM "Horario"
-        WHERE $1 < "horaFin" AND $2 > "horaInicio"
-        """
-        params = [hora_inicio, hora_fin]
+        catalogo = await _catalogo_horarios(conn)
+    except Exception as e:
+        # Un error de base no es una superposición: se informa como tal en lugar de bloquear la edición
+        raise DatabaseException("verificar superposición horaria", str(e))
 
-        # Si estamos editando, excluimos el grupo actual de la comprobación
-        if nro_grupo_excluir:
-            query += ' AND "nroGrupo" != $3'
-            params.append(nro_grupo_excluir)
-        
-        # fetchval retornará 1 si encuentra un overlap, o None si no
-        overlap = await conn.fetchval(query, *params)
-        
-        # Si overlap no es None, significa que encontró un registro (overlap=True)
-        return overlap is not None
-    
+    return catalogo["intervalos"].superpuesto(hora_inicio, hora_fin, excluir=nro_grupo_excluir) is not None
+
+async def validar_temporada(conn: Connection, data: TemporadaValidar) -> TemporadaValidacionResponse:
+    """
+    Valida de una vez una grilla semanal propuesta (no escribe nada):
+    grupos o días repetidos, días y empleados inexistentes, superposiciones entre los grupos
+    propuestos y, si la grilla se suma a la actual, contra los grupos existentes.
+    """
+    conflictos: List[ConflictoTemporada] = []
+
+    try:
+        catalogo = await _catalogo_horarios(conn)
+        dnis = {d.dniEmpleado for g in data.grupos for d in g.dias_asignados if d.dniEmpleado}
+        empleados = {
+            row["dni"] for row in await conn.fetch('SELECT dni FROM "Empleado" WHERE dni = ANY($1::text[])', list(dnis))
+        }
     except Exception as e:
-        # Si falla la consulta, por precaución no dejamos crear
-        print(f"Error crítico chequeando superposición horaria: {e}")
-        # Devolvemos True para "fallar en modo seguro" (prevenir la creación)
-        return True
+        raise DatabaseException("validar temporada", str(e))
+
+    existentes = {g["nroGrupo"] for g in catalogo["grupos"]}
+    vistos = set()
+    for grupo in data.grupos:
+        if grupo.nroGrupo in vistos:
+            conflictos.append(ConflictoTemporada(tipo="grupo_repetido", nroGrupo=grupo.nroGrupo, detalle="El grupo aparece más de una vez en la propuesta."))
+        vistos.add(grupo.nroGrupo)
+
+        if not data.reemplazaActual:
+            if grupo.nroGrupo in existentes:
+                conflictos.append(ConflictoTemporada(tipo="grupo_existente", nroGrupo=grupo.nroGrupo, detalle="Ya existe un grupo con ese número."))
+            choque = catalogo["intervalos"].superpuesto(grupo.horaInicio, grupo.horaFin)
+            if choque is not None:
+                conflictos.append(ConflictoTemporada(
+                    tipo="superposicion_existente", nroGrupo=grupo.nroGrupo, conflictoCon=choque,
+                    detalle=_mensaje_superposicion(grupo.horaInicio, grupo.horaFin)
+                ))
+
+        dias = [d.dia for d in grupo.dias_asignados]
+        for dia in sorted({d for d in dias if dias.count(d) > 1}):
+            conflictos.append(ConflictoTemporada(tipo="dia_repetido", nroGrupo=grupo.nroGrupo, detalle=f"El día {dia} está asignado más de una vez."))
+        for dia in sorted(set(dias) - catalogo["dias"]):
+            conflictos.append(ConflictoTemporada(tipo="dia_inexistente", nroGrupo=grupo.nroGrupo, detalle=f"El día {dia} no está configurado."))
+        for d in grupo.dias_asignados:
+            if d.dniEmpleado and d.dniEmpleado not in empleados:
+                conflictos.append(ConflictoTemporada(tipo="empleado_inexistente", nroGrupo=grupo.nroGrupo, detalle=f"No existe el empleado {d.dniEmpleado} ({d.dia})."))
+
+    intervalos = [(i, g.horaInicio, g.horaFin) for i, g in enumerate(data.grupos)]
+    for a, b in superposiciones(intervalos):
+        ga, gb = data.grupos[a], data.grupos[b]
+        conflictos.append(ConflictoTemporada(
+            tipo="superposicion", nroGrupo=ga.nroGrupo, conflictoCon=gb.nroGrupo,
+            detalle=f"{ga.horaInicio.strftime('%H:%M')}-{ga.horaFin.strftime('%H:%M')} se superpone con {gb.horaInicio.strftime('%H:%M')}-{gb.horaFin.strftime('%H:%M')}."
+        ))
+
+    return TemporadaValidacionResponse(valida=not conflictos, conflictos=conflictos)
 
 # --- NUEVO SERVICIO TRANSACCIONAL ---
 async def crear_horario_completo(
@@ -304,7 +383,7 @@ async def crear_horario_completo(
     
     # 1. Validación de "consideración": Chequear superposición horaria
     if await check_horario_overlap(conn, horario_data.horaInicio, horario_data.horaFin):
-        raise BusinessRuleException(f"El rango horario {horario_data.horaInicio.strftime('%H:%M')}-{horario_data.horaFin.strftime('%H:%M')} se superpone con un grupo existente.")
+        raise BusinessRuleException(_mensaje_superposicion(horario_data.horaInicio, horario_data.horaFin))
 
     async with conn.transaction():
         try:
@@ -388,6 +467,8 @@ async def eliminar_horario_completo(conn: Connection, nroGrupo: str) -> None:
             if result == "DELETE 0":
                 # Si "Horario" no borró nada, es que el grupo no existía.
                 raise NotFoundException("Grupo", nroGrupo)
+
+            catalogo_cache.invalidar("horarios")
         
         except (BusinessRuleException, NotFoundException) as e:
             raise e # Re-lanzar para el handler de FastAPI
@@ -405,46 +486,13 @@ async def obtener_horario_detallado(conn: Connection, nroGrupo: str) -> HorarioC
     Obtiene los detalles completos de un único grupo/horario.
     """
     try:
-        query = """
-        SELECT 
-            h."nroGrupo",
-            h."horaInicio",
-            h."horaFin",
-            COALESCE(
-                JSON_AGG(
-                    JSON_BUILD_OBJECT(
-                        'dia', p.dia,
-                        'capacidadMax', p."capacidadMax",
-                        'empleado', p."dniEmpleado",
-                        'alumnos_inscritos', (
-                            SELECT COUNT(*) 
-                            FROM "Asiste" a 
-                            WHERE a."nroGrupo" = h."nroGrupo" 
-                            AND a.dia = p.dia
-                        )
-                    )
-                ) FILTER (WHERE p.dia IS NOT NULL),
-                '[]'::json
-            ) as dias_info
-        FROM "Horario" h
-        LEFT JOIN "Pertenece" p ON h."nroGrupo" = p."nroGrupo"
-        WHERE h."nroGrupo" = $1
-        GROUP BY h."nroGrupo", h."horaInicio", h."horaFin"
-        """
-        row = await conn.fetchrow(query, nroGrupo)
+        catalogo = await _catalogo_horarios(conn)
+        grupo = next((g for g in catalogo["grupos"] if g["nroGrupo"] == nroGrupo), None)
         
-        if not row:
+        if not grupo:
             raise NotFoundException("Grupo", nroGrupo)
 
-        dias_info = json.loads(row["dias_info"]) if isinstance(row["dias_info"], str) else row["dias_info"]
-
-        horario_data = {
-            "nroGrupo": row["nroGrupo"],
-            "horaInicio": row["horaInicio"],
-            "horaFin": row["horaFin"],
-            "dias_asignados": dias_info
-        }
-        return HorarioCompletoResponse(**horario_data)
+        return _horario_completo(grupo, await _ocupacion(conn, nroGrupo))
 
     except NotFoundException:
         raise
@@ -475,8 +523,9 @@ async def actualizar_horario_completo(
                     raise DuplicateEntryException("nroGrupo", nuevo_nroGrupo)
 
             # === VALIDACIÓN 2: OBTENER ALUMNOS INSCRITOS ===
+            # Contador mantenido por triggers; FOR UPDATE frena inscripciones concurrentes hasta el commit
             inscritos_rows = await conn.fetch(
-                'SELECT dia, COUNT(*) as "count" FROM "Asiste" WHERE "nroGrupo" = $1 GROUP BY dia',
+                'SELECT dia, inscritos as "count" FROM "Pertenece" WHERE "nroGrupo" = $1 ORDER BY dia FOR UPDATE',
                 originalNroGrupo
             )
             current_student_count_map = {row['dia']: row['count'] for row in inscritos_rows}
@@ -495,7 +544,7 @@ async def actualizar_horario_completo(
             
             # === VALIDACIÓN 5: SUPERPOSICIÓN HORARIA ===
             if await check_horario_overlap(conn, data.horaInicio, data.horaFin, nro_grupo_excluir=originalNroGrupo):
-                raise BusinessRuleException(f"El rango horario {data.horaInicio.strftime('%H:%M')}-{data.horaFin.strftime('%H:%M')} se superpone con un grupo existente.")
+                raise BusinessRuleException(_mensaje_superposicion(data.horaInicio, data.horaFin))
 
             # === EJECUCIÓN (Lógica de Actualización) ===
             
@@ -514,6 +563,9 @@ async def actualizar_horario_completo(
                 
             else:
                 # ----- CASO 2: nroGrupo CAMBIA (difícil, migración de PK) -----
+
+                # El grupo nuevo y el viejo conviven hasta el paso (e): se difiere la exclusion constraint
+                await conn.execute('SET CONSTRAINTS "horario_sin_superposicion" DEFERRED')
                 
                 # a. Crear el nuevo registro de Horario (Ahora sabemos que no es duplicado)
                 await conn.execute(
@@ -539,6 +591,12 @@ async def actualizar_horario_completo(
                 
                 # e. Eliminar el viejo registro de Horario
                 await conn.execute('DELETE FROM "Horario" WHERE "nroGrupo" = $1', originalNroGrupo)
+
+                # Chequear la superposición acá (y no en el COMMIT) para poder informarla
+                await conn.execute('SET CONSTRAINTS "horario_sin_superposicion" IMMEDIATE')
+        
+        except ExclusionViolationError:
+            raise BusinessRuleException(_mensaje_superposicion(data.horaInicio, data.horaFin))
         
         except UniqueViolationError as e:
             # Si llegamos aquí DESPUÉS de nuestra validación previa,
@@ -551,6 +609,8 @@ async def actualizar_horario_completo(
         except Exception as e:
             raise DatabaseException("actualizar horario", str(e))
         
+    catalogo_cache.invalidar("horarios")
+
     # 6. Devolver el estado final del grupo actualizado
     return await obtener_horario_detallado(conn, nuevo_nroGrupo)
 
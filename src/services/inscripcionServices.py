@@ -0,0 +1,94 @@
+from asyncpg import Connection
+from typing import List
+
+from core.consultas import registrar
+from schemas.alumnoSchema import HorarioAsignado
+
+from utils.exceptions import (
+    NotFoundException,
+    BusinessRuleException
+)
+
+# Bloqueo y lectura de los cupos pedidos (paso 1 de inscribir_en_horarios)
+CONSULTA_BLOQUEAR_CUPOS = registrar("inscripcion_bloquear_cupos", '''
+    SELECT p."nroGrupo", p.dia, p."capacidadMax", p.inscritos
+    FROM "Pertenece" p
+    JOIN unnest($1::text[], $2::text[]) AS s("nroGrupo", dia)
+        ON p."nroGrupo" = s."nroGrupo" AND p.dia = s.dia
+    ORDER BY p."nroGrupo", p.dia
+    FOR UPDATE OF p
+''')
+
+# Reemplazo de horarios: bloquea de una vez los cupos actuales del alumno y los pedidos
+QUERY_BLOQUEAR_CUPOS_REEMPLAZO = '''
+    SELECT 1
+    FROM "Pertenece" p
+    WHERE (p."nroGrupo", p.dia) IN (
+        SELECT "nroGrupo", dia FROM "Asiste" WHERE dni = $1
+        UNION
+        SELECT * FROM unnest($2::text[], $3::text[])
+    )
+    ORDER BY p."nroGrupo", p.dia
+    FOR UPDATE OF p
+'''
+
+async def inscribir_en_horarios(
+    conn: Connection,
+    dni: str,
+    horarios: List[HorarioAsignado],
+    reemplazar: bool = False
+) -> None:
+    """
+    Motor único de inscripción en "Asiste" (activar alumno, crear alumno completo y
+    reemplazo de horarios). Debe llamarse dentro de la transacción del servicio.
+
+    Con `reemplazar` borra antes los horarios actuales del alumno. Los cupos viejos y los
+    nuevos se bloquean juntos y en el mismo orden fijo: si se bloquearan en dos tandas
+    (el trigger del DELETE y después el paso 1), dos alumnos que intercambian cupos
+    quedarían esperándose mutuamente.
+
+    1. Bloquea (FOR UPDATE) las filas de "Pertenece" de todos los (nroGrupo, dia) pedidos,
+       en orden fijo para que dos inscripciones concurrentes no se bloqueen mutuamente,
+       y lee su capacidad y ocupación ("inscritos", mantenido por triggers sobre "Asiste").
+    2. Inserta todos los horarios de una vez con unnest.
+
+    Si otra transacción tenía el lock, FOR UPDATE devuelve la versión de la fila que ésta
+    confirmó, con su contador ya incrementado, así que no se sobrepasa el cupo.
+    """
+    pares = [(h.nroGrupo, h.dia) for h in horarios]
+    if len(set(pares)) != len(pares):
+        raise BusinessRuleException("Hay horarios repetidos en la solicitud.")
+
+    grupos = [nro for nro, _ in pares]
+    dias = [dia for _, dia in pares]
+
+    if reemplazar:
+        # El trigger del DELETE descuenta la ocupación sobre cupos que ya tenemos bloqueados
+        await conn.execute(QUERY_BLOQUEAR_CUPOS_REEMPLAZO, dni, grupos, dias)
+        await conn.execute('DELETE FROM "Asiste" WHERE dni = $1', dni)
+
+    if not horarios:
+        return
+
+    # 1. Bloquear los cupos pedidos y leer su ocupación
+    bloqueados = await CONSULTA_BLOQUEAR_CUPOS.fetch(conn, grupos, dias)
+
+    cupos = {(r['nroGrupo'], r['dia']): r for r in bloqueados}
+    faltantes = [f"Grupo {nro} no está asignado al día {dia}" for nro, dia in pares if (nro, dia) not in cupos]
+    if faltantes:
+        raise NotFoundException("Asignación Horario-Día", "; ".join(faltantes))
+
+    completos = [
+        f"El grupo {nro} del día {dia} está completo."
+        for nro, dia in pares
+        if cupos[(nro, dia)]['inscritos'] >= cupos[(nro, dia)]['capacidadMax']
+    ]
+    if completos:
+        raise BusinessRuleException(" ".join(completos))
+
+    # 2. Inserción en bloque (los triggers actualizan "Pertenece".inscritos)
+    await conn.execute('''
+        INSERT INTO "Asiste" (dni, "nroGrupo", dia)
+        SELECT $1, s."nroGrupo", s.dia
+        FROM unnest($2::text[], $3::text[]) AS s("nroGrupo", dia)
+    ''', dni, grupos, dias)
@@ -1,61 +1,61 @@
-import mercadopago
-from asyncpg import Connection
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional, Set, Tuple
+
+from asyncpg import Connection, Pool
 from fastapi import HTTPException, status
 
 from core.config import settings
+from core.session import ConexionDiferida
+from core.consultas import registrar
 from utils.exceptions import NotFoundException, DatabaseException
+from utils.mercadopago import MercadoPagoError, mp_client
+from utils.eventos_pago import pago_eventos
+from utils.comprobantes import clave_comprobante, guardar_comprobante, leer_comprobante
 from schemas.pagoSchema import PreferenciaPagoResponse
 
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import cm
-from datetime import datetime, date
-from reportlab.lib import colors
-
-# Inicializamos el SDK de MercadoPago con tu Token
-# token_value = settings.MP_ACCESS_TOKEN.get_secret_value()
-# sdk = mercadopago.SDK(token_value)
-
-def obtener_sdk(cuenta: str = "administrador") -> mercadopago.SDK:
-    """
-    Devuelve la instancia del SDK de MercadoPago según el titular de la cuenta.
-    - 'empleado': Usa el token MP_ACCESS_TOKEN_EMP
-    - 'administrador': Usa el token MP_ACCESS_TOKEN_ADM
-    """
-    if cuenta == "empleado":
-        return mercadopago.SDK(settings.MP_ACCESS_TOKEN_EMP.get_secret_value())
-    
-    # Por defecto usamos la cuenta del administrador
-    return mercadopago.SDK(settings.MP_ACCESS_TOKEN_ADM.get_secret_value())
-
+from utils.pdf import renderizar_pdf
+from utils.pdf_plantillas import comprobante_pago
+
+# Las llamadas a MercadoPago usan el cliente asíncrono compartido (utils/mercadopago.py).
+# La cuenta ('administrador' o 'empleado') decide qué token se usa.
+
+# Consultas frecuentes (polling del estado de pago, webhooks, checkout, comprobantes)
+CONSULTA_ESTADO_PAGO = registrar("cuota_estado_pago", 'SELECT pagada FROM "Cuota" WHERE "idCuota" = $1')
+CONSULTA_CUOTA_PREFERENCIA = registrar("cuota_para_preferencia", """
+    SELECT 
+        c."idCuota", 
+        c.mes, 
+        c."nombreTrabajo", 
+        c.titular,  -- Campo clave para decidir el destino del dinero
+        p.dni, 
+        p.email, 
+        p.nombre, 
+        p.apellido 
+    FROM "Cuota" c 
+    JOIN "Persona" p ON c.dni = p.dni 
+    WHERE c."idCuota" = $1
+""")
+
+def normalizar_cuenta(owner: Optional[str]) -> str:
+    """'empleado' o 'administrador' (por defecto, igual que antes con cualquier otro valor)."""
+    return "empleado" if owner == "empleado" else "administrador"
 
 
 # -------------------------
 # Crear preferencia de pago
 # -------------------------
-async def crear_preferencia_pago(conn: Connection, id_cuota: int, monto_final: float) -> PreferenciaPagoResponse:
+async def crear_preferencia_pago(db: ConexionDiferida, id_cuota: int, monto_final: float) -> PreferenciaPagoResponse:
     """
     Genera una preferencia de pago en MercadoPago.
     Decide la cuenta destino (Admin o Empleado) basándose en el campo 'titular' de la cuota.
+    La conexión se devuelve al pool antes de llamar a MercadoPago.
     """
     try:
         # A. Buscar datos completos de la cuota y el alumno
-        query = """
-            SELECT 
-                c."idCuota", 
-                c.mes, 
-                c."nombreTrabajo", 
-                c.titular,  -- Campo clave para decidir el destino del dinero
-                p.dni, 
-                p.email, 
-                p.nombre, 
-                p.apellido 
-            FROM "Cuota" c 
-            JOIN "Persona" p ON c.dni = p.dni 
-            WHERE c."idCuota" = $1
-        """
-        cuota = await conn.fetchrow(query, id_cuota)
+        async with db.conexion() as conn:
+            cuota = await CONSULTA_CUOTA_PREFERENCIA.fetchrow(conn, id_cuota)
         if not cuota: 
             raise NotFoundException("Cuota", id_cuota)
 
@@ -68,8 +68,6 @@ async def crear_preferencia_pago(conn: Connection, id_cuota: int, monto_final: f
             cuenta_destino = "administrador"
         else:
             cuenta_destino = "empleado"
-            
-        sdk = obtener_sdk(cuenta_destino)
 
         # C. Configurar Preferencia
         mi_url_back = settings.BACKEND_URL
@@ -103,12 +101,7 @@ async def crear_preferencia_pago(conn: Connection, id_cuota: int, monto_final: f
             "binary_mode": True
         }
 
-        preference_response = sdk.preference().create(preference_data)
-        
-        if preference_response["status"] != 201:
-            raise Exception(f"Error MP: {preference_response}")
-
-        response_data = preference_response["response"]
+        response_data = await mp_client.crear_preferencia(cuenta_destino, preference_data)
 
         return PreferenciaPagoResponse(
             init_point=response_data["init_point"], 
@@ -123,211 +116,309 @@ async def crear_preferencia_pago(conn: Connection, id_cuota: int, monto_final: f
 # -------------------------
 # Webhook
 # -------------------------
-async def procesar_pago_exitoso(conn: Connection, payment_id: str, owner: str = "administrador") -> bool:
+# Evento para despertar al worker de este proceso apenas llega una notificación
+nueva_notificacion = asyncio.Event()
+
+async def registrar_notificacion_pago(conn: Connection, payment_id: str, owner: Optional[str] = None) -> bool:
     """
-    Verifica y procesa un pago notificado por MercadoPago.
-    El parámetro 'owner' ahora espera 'administrador' o 'empleado'.
+    Guarda la notificación en "PagoWebhookInbox" y vuelve enseguida (la verificación la hace
+    PagoWebhookWorker). Los reintentos de MP del mismo pago no generan trabajo nuevo, salvo que
+    la última verificación no lo haya visto aprobado (ej. pasó de 'pending' a 'approved').
+    Devuelve True si el pago quedó pendiente de verificar.
     """
     try:
-        # Seleccionamos el SDK correcto según el parámetro que viene en la URL del webhook
-        sdk = obtener_sdk(owner)
-        
-        payment_info = sdk.payment().get(payment_id)
-        
-        if payment_info["status"] != 200:
-            print(f"No se pudo obtener el pago {payment_id} de MP usando la cuenta: {owner}")
-            return False
-            
-        payment_data = payment_info["response"]
-        estado = payment_data.get("status")
-        id_cuota_str = payment_data.get("external_reference")
-        monto_pagado_mp = payment_data.get("transaction_amount") 
-
-        print(f"Webhook ({owner}): Pago {payment_id} para Cuota {id_cuota_str} - Estado: {estado}")
-
-        if estado == "approved" and id_cuota_str:
-            id_cuota = int(id_cuota_str)
-            
-            # Actualización idempotente (verifica que no esté pagada previamente)
-            query = '''
-                UPDATE "Cuota" 
-                SET pagada = TRUE, 
-                    "fechaDePago" = CURRENT_DATE, 
-                    "horaDePago" = CURRENT_TIME(0),
-                    "metodoDePago" = 'qr',
-                    monto = CASE 
-                                WHEN "fechaFin" < CURRENT_DATE THEN ROUND(monto * 1.10, 2)
-                                ELSE monto 
-                            END
-                WHERE "idCuota" = $1 AND pagada = FALSE 
-            '''
-            
-            result = await conn.execute(query, id_cuota)
-            
-            if result == "UPDATE 1":
-                print(f"Cuota {id_cuota} pagada exitosamente.")
-                return True
-            else:
-                # Verificamos si ya estaba pagada
-                chequeo = await conn.fetchrow('SELECT pagada FROM "Cuota" WHERE "idCuota" = $1', id_cuota)
-                if chequeo and chequeo['pagada']:
-                    print(f"ℹ Webhook duplicado: La cuota {id_cuota} ya estaba pagada.")
-                    return True
-                else:
-                    print(f"Error: La cuota {id_cuota} no se encontró.")
-                    return False
-        
-        return False
-
+        id_evento = await conn.fetchval('''
+            INSERT INTO "PagoWebhookInbox" ("paymentId", cuenta)
+            VALUES ($1, $2)
+            ON CONFLICT ("paymentId", cuenta) DO UPDATE
+                SET estado = 'pendiente', intentos = 0, "proximoIntento" = now()
+                WHERE "PagoWebhookInbox".estado IN ('procesado', 'fallido')
+                    AND "PagoWebhookInbox"."estadoPago" IS DISTINCT FROM 'approved'
+            RETURNING "idEvento"
+        ''', payment_id, normalizar_cuenta(owner))
     except Exception as e:
-        print(f"Error procesando webhook: {e}")
-        raise DatabaseException("procesar webhook", str(e))
+        raise DatabaseException("registrar notificación de pago", str(e))
+
+    if id_evento is not None:
+        nueva_notificacion.set()
+    return id_evento is not None
+
+async def aplicar_pago_aprobado(conn: Connection, id_cuota: int) -> bool:
+    """
+    Marca la cuota como pagada por QR (con el recargo del 10% si está vencida).
+    Idempotente: si ya estaba pagada devuelve True sin tocarla; False si la cuota no existe.
+    """
+    result = await conn.execute('''
+        UPDATE "Cuota" 
+        SET pagada = TRUE, 
+            "fechaDePago" = CURRENT_DATE, 
+            "horaDePago" = CURRENT_TIME(0),
+            "metodoDePago" = 'qr',
+            monto = CASE 
+                        WHEN "fechaFin" < CURRENT_DATE THEN ROUND(monto * 1.10, 2)
+                        ELSE monto 
+                    END
+        WHERE "idCuota" = $1 AND pagada = FALSE 
+    ''', id_cuota)
+
+    if result == "UPDATE 1":
+        print(f"Cuota {id_cuota} pagada exitosamente.")
+        return True
+
+    # Verificamos si ya estaba pagada
+    pagada = await CONSULTA_ESTADO_PAGO.fetchval(conn, id_cuota)
+    if pagada:
+        print(f"ℹ Webhook duplicado: La cuota {id_cuota} ya estaba pagada.")
+        return True
+    return False
+
+class PagoWebhookWorker:
+    """
+    Worker en segundo plano que vacía "PagoWebhookInbox".
+    - Reclama lotes con FOR UPDATE SKIP LOCKED (seguro con varios workers de uvicorn).
+    - Verifica cada pago contra la API de MP con el cliente asíncrono compartido, hasta
+      PAGO_WEBHOOK_CONCURRENCIA a la vez, sin tener una conexión a la BD durante la llamada HTTP.
+    - Los errores transitorios de MP se reintentan con backoff exponencial hasta
+      PAGO_WEBHOOK_MAX_INTENTOS; un pago inexistente (4xx) se descarta.
+
+    Para probar en local: `python scripts/fake_mercadopago.py` y MP_API_URL=http://localhost:8090.
+    """
+
+    # Si un proceso muere con eventos 'procesando', se vuelven a tomar pasado este tiempo
+    LEASE_SEGUNDOS = 120
+
+    def __init__(self, pool: Pool):
+        self.pool = pool
+        self._detener = asyncio.Event()
+        self._tarea: Optional[asyncio.Task] = None
+        self._semaforo = asyncio.Semaphore(settings.PAGO_WEBHOOK_CONCURRENCIA)
+        self._precalentados: Set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        self._tarea = asyncio.create_task(self.run(), name="pago-webhook-worker")
+
+    async def stop(self) -> None:
+        self._detener.set()
+        nueva_notificacion.set()
+        if self._tarea:
+            await self._tarea
+        # Pregenerar es opcional: el comprobante se dibuja igual en la primera descarga
+        for t in self._precalentados:
+            t.cancel()
+        if self._precalentados:
+            await asyncio.wait(self._precalentados)
+
+    async def run(self) -> None:
+        logging.info("[Pagos] Worker de webhooks iniciado")
+        while not self._detener.is_set():
+            nueva_notificacion.clear()
+            try:
+                procesados = await self.procesar_lote()
+            except Exception as e:
+                logging.error(f"[Pagos] Error procesando lote de webhooks: {e}")
+                procesados = 0
+
+            # Si el lote vino lleno probablemente hay más pendientes: seguimos sin esperar
+            if procesados >= settings.PAGO_WEBHOOK_BATCH_SIZE:
+                continue
+
+            try:
+                await asyncio.wait_for(nueva_notificacion.wait(), timeout=settings.PAGO_WEBHOOK_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+        logging.info("[Pagos] Worker de webhooks detenido")
+
+    async def procesar_lote(self) -> int:
+        """Reclama y procesa un lote de notificaciones. Devuelve cuántas tomó."""
+        async with self.pool.acquire() as conn:
+            eventos = await conn.fetch('''
+                UPDATE "PagoWebhookInbox" i
+                SET estado = 'procesando',
+                    intentos = i.intentos + 1,
+                    "proximoIntento" = now() + make_interval(secs => $2)
+                WHERE i."idEvento" IN (
+                    SELECT "idEvento"
+                    FROM "PagoWebhookInbox"
+                    WHERE estado IN ('pendiente', 'procesando')
+                        AND "proximoIntento" <= now()
+                    ORDER BY "proximoIntento"
+                    LIMIT $1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING i."idEvento", i."paymentId", i.cuenta, i.intentos
+            ''', settings.PAGO_WEBHOOK_BATCH_SIZE, float(self.LEASE_SEGUNDOS))
+
+        if eventos:
+            resultados = await asyncio.gather(*(self._procesar(dict(e)) for e in eventos), return_exceptions=True)
+            for evento, resultado in zip(eventos, resultados):
+                if isinstance(resultado, Exception):
+                    logging.error(f"[Pagos] Evento {evento['idEvento']}: no se pudo registrar el resultado: {resultado}")
+        return len(eventos)
+
+    async def _procesar(self, evento: dict) -> None:
+        # Todo bajo el semáforo (también la escritura en la BD): un lote lleno no toma más de
+        # PAGO_WEBHOOK_CONCURRENCIA conexiones del pool a la vez
+        async with self._semaforo:
+            try:
+                await self._verificar_y_aplicar(evento)
+            except MercadoPagoError as e:
+                await self._registrar_error(evento, str(e), reintentar=e.reintentable)
+            except Exception as e:
+                # Cualquier otra falla también pasa por el conteo de intentos (termina en 'fallido')
+                await self._registrar_error(evento, f"Aplicando pago: {e}", reintentar=True)
+
+    async def _verificar_y_aplicar(self, evento: dict) -> None:
+        pago = await mp_client.obtener_pago(evento["cuenta"], evento["paymentId"])
+
+        estado_pago = pago.get("status")
+        referencia = pago.get("external_reference")
+        print(f"Webhook ({evento['cuenta']}): Pago {evento['paymentId']} para Cuota {referencia} - Estado: {estado_pago}")
+
+        try:
+            id_cuota = int(referencia) if referencia else None
+        except ValueError:
+            id_cuota = None
+
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                estado, error = "procesado", None
+                if estado_pago == "approved":
+                    if id_cuota is None or not await aplicar_pago_aprobado(conn, id_cuota):
+                        estado, error = "descartado", f"Cuota inexistente ({referencia})"
+                await conn.execute('''
+                    UPDATE "PagoWebhookInbox"
+                    SET estado = $2, "estadoPago" = $3, "idCuota" = $4,
+                        "ultimoError" = $5, "fechaProceso" = now()
+                    WHERE "idEvento" = $1
+                ''', evento["idEvento"], estado, estado_pago, id_cuota, error)
+
+        if estado_pago == "approved" and estado == "procesado":
+            # Aparte del lote: no lo demora ni retiene el semáforo mientras se dibuja el PDF
+            t = asyncio.create_task(precalentar_comprobante(self.pool, id_cuota), name=f"comprobante-{id_cuota}")
+            self._precalentados.add(t)
+            t.add_done_callback(self._precalentados.discard)
+
+    async def _registrar_error(self, evento: dict, error: str, reintentar: bool) -> None:
+        intentos = evento["intentos"]
+        if not reintentar:
+            estado = "descartado"
+        elif intentos >= settings.PAGO_WEBHOOK_MAX_INTENTOS:
+            estado = "fallido"
+        else:
+            estado = "pendiente"
+        espera = settings.PAGO_WEBHOOK_RETRY_BASE_SECONDS * (2 ** (intentos - 1))
+        logging.warning(f"[Pagos] Pago {evento['paymentId']} ({evento['cuenta']}): {error} -> {estado}")
+
+        async with self.pool.acquire() as conn:
+            await conn.execute('''
+                UPDATE "PagoWebhookInbox"
+                SET estado = $2, "ultimoError" = $3,
+                    "proximoIntento" = now() + make_interval(secs => $4)
+                WHERE "idEvento" = $1
+            ''', evento["idEvento"], estado, error[:500], float(espera))
 
 async def obtener_estado_pago_cuota(conn: Connection, id_cuota: int) -> bool:
     """Retorna True si la cuota está pagada, False si no."""
-    query = 'SELECT pagada FROM "Cuota" WHERE "idCuota" = $1'
-    pagada = await conn.fetchval(query, id_cuota)
+    pagada = await CONSULTA_ESTADO_PAGO.fetchval(conn, id_cuota)
     if pagada is None:
         raise NotFoundException("Cuota", id_cuota)
     return pagada
 
+def _evento_sse(evento: str, datos: dict) -> str:
+    return f"event: {evento}\ndata: {json.dumps(datos)}\n\n"
+
+async def stream_estado_pago(
+    pool: Pool,
+    id_cuota: int,
+    desconectado: Callable[[], Awaitable[bool]]
+) -> AsyncIterator[str]:
+    """
+    Stream SSE del estado de pago de una cuota: envía el estado actual y después un evento
+    por cada cambio que publique el trigger de "Cuota" (vía PagoEstadoListener), hasta que
+    la cuota quede pagada. No retiene una conexión a la BD mientras espera: solo la toma
+    para leer el estado al empezar o si se perdieron avisos.
+    Si este proceso no está escuchando (listener caído o desactivado) relee el estado en
+    cada keepalive, como un polling lento del lado del servidor.
+    """
+    async def leer_estado() -> bool:
+        async with pool.acquire() as conn:
+            return await obtener_estado_pago_cuota(conn, id_cuota)
+
+    loop = asyncio.get_running_loop()
+    vence = loop.time() + settings.PAGO_SSE_MAX_SECONDS
+
+    # Suscribirse antes de leer: un pago entre la lectura y la suscripción no se pierde
+    with pago_eventos.suscribir(id_cuota) as cola:
+        pagada = await leer_estado()
+        yield "retry: 3000\n" + _evento_sse("estado", {"idCuota": id_cuota, "pagada": pagada})
+
+        while not pagada and loop.time() < vence:
+            try:
+                aviso = await asyncio.wait_for(cola.get(), timeout=settings.PAGO_SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await desconectado():
+                    return
+                if not pago_eventos.escuchando:
+                    aviso = None
+                else:
+                    yield ": keepalive\n\n"
+                    continue
+
+            nuevo = await leer_estado() if aviso is None else aviso
+            if nuevo != pagada:
+                pagada = nuevo
+                yield _evento_sse("estado", {"idCuota": id_cuota, "pagada": pagada})
+
 # -------------------------
 # Generar comprobante de pago PDF
 # -------------------------
-async def generar_comprobante_pdf(conn: Connection, id_cuota: int):
-    """
-    Genera un comprobante de pago con diseño premium y marca de seguridad.
+CONSULTA_COMPROBANTE = registrar("cuota_comprobante", """
+    SELECT 
+        c."idCuota", c.monto, c.mes, c."nombreTrabajo", c."nombreSuscripcion",
+        c."fechaDePago", c."horaDePago", c."metodoDePago",
+        p.nombre, p.apellido, p.dni, p.email
+    FROM "Cuota" c
+    JOIN "Persona" p ON c.dni = p.dni
+    WHERE c."idCuota" = $1 AND c.pagada = TRUE
+""")
+
+async def obtener_comprobante(conn: Connection, id_cuota: int) -> Optional[Tuple[str, Callable[[], Awaitable[bytes]]]]:
     """
-    query = """
-        SELECT 
-            c."idCuota", c.monto, c.mes, c."nombreTrabajo", c."nombreSuscripcion",
-            c."fechaDePago", c."horaDePago", c."metodoDePago",
-            p.nombre, p.apellido, p.dni, p.email
-        FROM "Cuota" c
-        JOIN "Persona" p ON c.dni = p.dni
-        WHERE c."idCuota" = $1 AND c.pagada = TRUE
+    Devuelve (clave, obtener_contenido) del comprobante de una cuota pagada, o None si no está pagada.
+    La clave (hash de los datos impresos) sirve de ETag sin tocar el disco; obtener_contenido
+    devuelve los bytes del PDF guardado en COMPROBANTES_DIR y solo lo dibuja (en el pool de
+    procesos de utils/pdf.py) la primera vez o si cambiaron los datos.
     """
-    row = await conn.fetchrow(query, id_cuota)
-
+    row = await CONSULTA_COMPROBANTE.fetchrow(conn, id_cuota)
     if not row:
         return None
 
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    # METADATOS VITALES:
-    c.setTitle(f"Comprobante de Pago - {row['nombre']} {row['apellido']}")
-    c.setAuthor("Gimnasio Abito")
-    c.setSubject(f"Cuota ID: {id_cuota}")
-    width, height = A4
-
-    # --- 1. MARCA DE AGUA (GRANDE Y DISTRIBUIDA) ---
-    c.saveState()
-    c.setFillColorRGB(0.96, 0.96, 0.96) 
-    c.setFont("Helvetica-Bold", 110) 
-    c.translate(width/2, height/2)
-    c.rotate(35)
-    
-    for x in range(-3, 4):
-        for y in range(-5, 6):
-            c.drawCentredString(x*700, y*280, "GYM ABITO")
-    c.restoreState()
-
-    # --- 2. ENCABEZADO ---
-    c.setFillColorRGB(0.89, 0.04, 0.08) # Rojo Abito
-    c.rect(0, height - 4*cm, 1.2*cm, 3*cm, fill=1, stroke=0)
-    
-    c.setFillColorRGB(0.1, 0.1, 0.1)
-    c.setFont("Helvetica-Bold", 26)
-    c.drawString(2*cm, height - 2.5*cm, "GIMNASIO")
-    
-    c.setFillColorRGB(0.89, 0.04, 0.08)
-    c.drawString(7.2*cm, height - 2.5*cm, "ABITO") 
-    
-    c.setFont("Helvetica", 11)
-    c.setFillColorRGB(0.4, 0.4, 0.4)
-    c.drawString(2*cm, height - 3.2*cm, "COMPROBANTE DE PAGO") 
-    
-    c.setFont("Helvetica", 10)
-    c.drawRightString(width - 2*cm, height - 2.5*cm, f"Emitido: {datetime.now().strftime('%d/%m/%Y')}")
-
-    # --- 3. TARJETA DE INFORMACIÓN DEL ALUMNO ---
-    c.setStrokeColorRGB(0.9, 0.9, 0.9)
-    c.setFillColorRGB(0.98, 0.98, 0.98)
-    c.roundRect(1.8*cm, height - 7.5*cm, width - 3.6*cm, 3*cm, 15, stroke=1, fill=1)
-    
-    c.setFillColorRGB(0.2, 0.2, 0.2)
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(2.5*cm, height - 5.5*cm, "TITULAR DEL PAGO")
-    
-    c.setFont("Helvetica", 11)
-    c.drawString(2.5*cm, height - 6.2*cm, f"{row['nombre'].upper()} {row['apellido'].upper()}")
-    c.setFont("Helvetica", 10)
-    c.setFillColorRGB(0.5, 0.5, 0.5)
-    c.drawString(2.5*cm, height - 6.8*cm, f"DNI: {row['dni']}  |  {row['email']}")
-
-    # --- 4. DETALLES DE TRANSACCIÓN ---
-    y_detalle = height - 9.5*cm
-    c.setFillColorRGB(0.1, 0.1, 0.1)
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(2*cm, y_detalle, "DETALLE DE TRANSACCIÓN")
-    
-    c.setStrokeColorRGB(0.89, 0.04, 0.08)
-    c.setLineWidth(2)
-    c.line(2*cm, y_detalle - 0.2*cm, 4*cm, y_detalle - 0.2*cm)
-
-    fecha_p = row['fechaDePago'].strftime('%d/%m/%Y') if row['fechaDePago'] else "-"
-    hora_p = row['horaDePago'].strftime('%H:%M') if row['horaDePago'] else "-"
-
-    c.setLineWidth(1)
-    c.setStrokeColorRGB(0.92, 0.92, 0.92)
-    y_pos = y_detalle - 1.5*cm
-    
-    items = [
-        ("SERVICIO", f"{row['nombreTrabajo']} - {row['nombreSuscripcion']}"),
-        ("PERIODO", f"Cuota de {row['mes']}"),
-        ("FECHA DE PAGO", f"{fecha_p} a las {hora_p} hs"),
-        ("MÉTODO DE PAGO", row['metodoDePago'].upper() if row['metodoDePago'] else "TRANSFERENCIA / QR"),
-        ("ID TRANSACCIÓN", f"#{row['idCuota']}")
-    ]
-
-    for label, val in items:
-        c.setFont("Helvetica-Bold", 9)
-        c.setFillColorRGB(0.5, 0.5, 0.5)
-        c.drawString(2.5*cm, y_pos, label)
-        c.setFont("Helvetica", 11)
-        c.setFillColorRGB(0.15, 0.15, 0.15)
-        c.drawRightString(width - 2.5*cm, y_pos, str(val))
-        c.line(2.5*cm, y_pos - 0.3*cm, width - 2.5*cm, y_pos - 0.3*cm)
-        y_pos -= 1*cm
-
-    # --- 5. TOTAL (AJUSTE FINAL DE POSICIÓN) ---
-    y_total = y_pos - 1.0*cm
-    c.setStrokeColorRGB(0.89, 0.04, 0.08)
-    c.setLineWidth(2.5)
-    
-    # La línea ahora es más larga para dar soporte visual a ambos textos separados
-    c.line(2.5*cm, y_total + 1.2*cm, width - 2*cm, y_total + 1.2*cm)
-    
-    # ETIQUETA: Alineada a la IZQUIERDA (2.5cm)
-    c.setFillColorRGB(0.1, 0.1, 0.1)
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(2.5*cm, y_total + 0.4*cm, "TOTAL ABONADO") 
-    
-    # MONTO: Alineado a la DERECHA (width - 2.2cm)
-    c.setFillColorRGB(0.89, 0.04, 0.08)
-    c.setFont("Helvetica-Bold", 24)
-    c.drawRightString(width - 2.2*cm, y_total + 0.4*cm, f"$ {row['monto']:,.2f}") 
-
-    # --- 6. PIE DE PÁGINA ---
-    c.setFillColorRGB(0.5, 0.5, 0.5)
-    c.setFont("Helvetica-Oblique", 8)
-    hash_seguridad = f"AUTH-{row['idCuota']}Z{row['dni'][-4:]}"
-    c.drawCentredString(width/2, 2*cm, f"Código de autenticación: {hash_seguridad}")
-    c.drawCentredString(width/2, 1.5*cm, "Gimnasio Abito - Las Breñas, Chaco")
-
-    c.save()
-    buffer.seek(0)
-    return buffer
+    datos = dict(row)
+    clave = clave_comprobante(datos)
+
+    async def obtener_contenido() -> bytes:
+        contenido = leer_comprobante(id_cuota, clave)
+        if contenido is None:
+            contenido = await renderizar_pdf(comprobante_pago, datos)
+            guardar_comprobante(id_cuota, clave, contenido)
+        return contenido
+
+    return clave, obtener_contenido
+
+# Pregeneraciones en curso a la vez: el resto de los lugares de PDF_MAX_PENDING queda para
+# las descargas de los usuarios
+_precalentando = asyncio.Semaphore(1)
+
+async def precalentar_comprobante(pool: Pool, id_cuota: int) -> None:
+    """Genera y guarda el comprobante apenas se paga la cuota (tarea en segundo plano)."""
+    try:
+        async with _precalentando:
+            async with pool.acquire() as conn:
+                comprobante = await obtener_comprobante(conn, id_cuota)
+            if comprobante:
+                await comprobante[1]()
+    except Exception as e:
+        logging.warning(f"[Pagos] No se pudo pregenerar el comprobante de la cuota {id_cuota}: {e}")
 
 async def marcar_pago_manual(conn: Connection, id_cuota: int, metodo_pago: str) -> bool:
     """
@@ -7,6 +7,7 @@ from schemas.personaSchema import (
     PersonaDetalle
 )
 
+from utils.cache import invalidar_principal
 from utils.exceptions import (
     DatabaseException,
     NotFoundException,
@@ -129,3 +130,6 @@ async def eliminar_persona(conn: Connection, dni: str) -> None:
         except Exception as e:
             raise DatabaseException("eliminar persona", str(e))
 
+    # Después del commit: antes, un request concurrente podría volver a cachear la fila vieja
+    invalidar_principal(dni=dni)
+
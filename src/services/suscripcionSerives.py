@@ -18,6 +18,7 @@ from utils.exceptions import (
     NotFoundException,
     BusinessRuleException  # Usada para el error de FK
 )
+from utils.cache import catalogo_cache
 
 # SERVICE para crear una suscripcion nueva
 async def create(
@@ -39,6 +40,7 @@ async def create(
             suscripcion_data.nombreSuscripcion,
             suscripcion_data.precio
         )
+        catalogo_cache.invalidar("suscripciones")
         # Devolvemos el objeto completo usando el schema de respuesta
         return SuscripcionResponse(**suscripcion)
     
@@ -55,7 +57,7 @@ async def get_all(con: Connection) -> List[SuscripcionResponse]:
     """
     Obtiene una lista de todas las suscripciones.
     """
-    try:
+    async def cargar():
         query = """
             SELECT "nombreSuscripcion", precio
             FROM "Suscripcion"
@@ -63,6 +65,9 @@ async def get_all(con: Connection) -> List[SuscripcionResponse]:
         """
         suscripciones = await con.fetch(query)
         return [SuscripcionResponse(**elem) for elem in suscripciones]
+
+    try:
+        return await catalogo_cache.obtener(("suscripciones",), cargar)
     except Exception as e:
         logging.error(f"Error al obtener suscripciones: {e}")
         raise DatabaseException("obtener suscripciones", str(e))
@@ -93,6 +98,7 @@ async def update_suscription_price(
             # Error específico: No encontrado (HTTP 404)
             raise NotFoundException("Suscripción", nombre_suscripcion)
         
+        catalogo_cache.invalidar("suscripciones")
         return SuscripcionResponse(**suscripcion)
     
     except NotFoundException:
@@ -120,6 +126,7 @@ async def delete_subscription(con: Connection, nombre: str) -> None:
             # Error específico: No encontrado (HTTP 404)
             raise NotFoundException("Suscripción", nombre)
         
+        catalogo_cache.invalidar("suscripciones")
         # Si tiene éxito, no devuelve nada (el endpoint dará 204 NO CONTENT)
         return
     
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from zoneinfo import ZoneInfo
+
+from asyncpg import Connection, Pool
+from apscheduler.events import EVENT_JOB_SUBMITTED, JobSubmissionEvent
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from core.config import settings
+from schemas.tareaSchema import TareaEjecucion, TareaEstado
+from services.cuotaServices import generar_cuotas_masivas_mensuales
+from services.facturacionServices import procesar_cierre_automatico
+
+from utils.exceptions import DatabaseException, NotFoundException
+
+@dataclass(frozen=True)
+class Tarea:
+    nombre: str
+    descripcion: str
+    cron: str
+    # Recibe una conexión dedicada y devuelve las filas afectadas
+    funcion: Callable[[Connection], Awaitable[Optional[int]]]
+
+    def trigger(self) -> CronTrigger:
+        return CronTrigger.from_crontab(self.cron, timezone=ZoneInfo(settings.SCHEDULER_ZONA_HORARIA))
+
+TAREAS: Dict[str, Tarea] = {
+    t.nombre: t for t in [
+        Tarea(
+            "generacion_cuotas_mensual",
+            "Genera la cuota del mes para cada alumno activo",
+            settings.SCHEDULER_CRON_CUOTAS,
+            generar_cuotas_masivas_mensuales,
+        ),
+        Tarea(
+            "cierre_facturacion_auto",
+            "Cierra la facturación de la última quincena terminada",
+            settings.SCHEDULER_CRON_CIERRE,
+            procesar_cierre_automatico,
+        ),
+    ]
+}
+
+# Identifica al proceso en el historial (varios nodos / workers pueden tener el planificador)
+NODO = f"{socket.gethostname()}:{os.getpid()}"
+
+# Clave del advisory lock de sesión de cada tarea (la misma en todos los nodos)
+QUERY_TOMAR_LOCK = "SELECT pg_try_advisory_lock(hashtext('tarea:' || $1))"
+QUERY_SOLTAR_LOCK = "SELECT pg_advisory_unlock(hashtext('tarea:' || $1))"
+
+# ¿Algún nodo tiene el lock de la tarea? Un lock de clave bigint aparece en pg_locks partido
+# en classid (32 bits altos) y objid (32 bits bajos), con objsubid = 1.
+QUERY_LOCK_TOMADO = '''
+    SELECT EXISTS (
+        SELECT 1
+        FROM pg_locks l, (SELECT hashtext('tarea:' || $1)::bigint AS clave) k
+        WHERE l.locktype = 'advisory' AND l.objsubid = 1 AND l.granted
+            AND l.classid::bigint = (k.clave >> 32) & 4294967295
+            AND l.objid::bigint = k.clave & 4294967295
+    )
+'''
+
+async def ejecutar_tarea(pool: Pool, tarea: Tarea, programada: Optional[datetime] = None) -> Optional[TareaEjecucion]:
+    """
+    Corre `tarea` y registra la ejecución en "TareaEjecucion". Los errores de la tarea quedan
+    en el historial y no se propagan.
+
+    `programada` es el disparo del cron que se ejecuta: el nodo que primero inserta la fila
+    (tarea, programada) se queda con él y los demás devuelven None sin correr, aunque les
+    llegue el disparo después de que terminó. Además, nunca corren dos ejecuciones de la
+    misma tarea a la vez (advisory lock de sesión): si el lock lo tiene otra (p. ej. una
+    manual), ésta se registra como 'omitida'.
+    """
+    async with pool.acquire() as conn:
+        id_ejecucion = None
+        if programada is not None:
+            id_ejecucion = await conn.fetchval('''
+                INSERT INTO "TareaEjecucion" (tarea, nodo, programada) VALUES ($1, $2, $3)
+                ON CONFLICT (tarea, programada) DO NOTHING
+                RETURNING "idEjecucion"
+            ''', tarea.nombre, NODO, programada)
+            if id_ejecucion is None:
+                logging.info(f"[Tareas] {tarea.nombre}: el disparo de {programada} lo tomó otro nodo")
+                return None
+
+        if not await conn.fetchval(QUERY_TOMAR_LOCK, tarea.nombre):
+            logging.info(f"[Tareas] {tarea.nombre}: la está corriendo otro nodo, se omite")
+            if id_ejecucion is not None:
+                await conn.execute('''
+                    UPDATE "TareaEjecucion" SET fin = now(), "duracionMs" = 0, estado = 'omitida'
+                    WHERE "idEjecucion" = $1
+                ''', id_ejecucion)
+            else:
+                await conn.execute(
+                    '''INSERT INTO "TareaEjecucion" (tarea, nodo, fin, "duracionMs", estado)
+                       VALUES ($1, $2, now(), 0, 'omitida')''',
+                    tarea.nombre, NODO
+                )
+            return None
+
+        try:
+            # Con el lock tomado, cualquier otro 'en_curso' es de un proceso que murió
+            await conn.execute('''
+                UPDATE "TareaEjecucion" SET estado = 'interrumpida', fin = now()
+                WHERE tarea = $1 AND estado = 'en_curso' AND "idEjecucion" IS DISTINCT FROM $2
+            ''', tarea.nombre, id_ejecucion)
+            if id_ejecucion is None:
+                id_ejecucion = await conn.fetchval(
+                    'INSERT INTO "TareaEjecucion" (tarea, nodo) VALUES ($1, $2) RETURNING "idEjecucion"',
+                    tarea.nombre, NODO
+                )
+
+            logging.info(f"[Tareas] {tarea.nombre}: inicio (ejecución {id_ejecucion})")
+            inicio = time.perf_counter()
+            estado, filas, error = "ok", None, None
+            try:
+                filas = await tarea.funcion(conn)
+            except Exception as e:
+                estado, error = "error", str(e)
+            duracion_ms = int((time.perf_counter() - inicio) * 1000)
+
+            row = await conn.fetchrow('''
+                UPDATE "TareaEjecucion"
+                SET fin = now(), "duracionMs" = $2, filas = $3, estado = $4, error = $5
+                WHERE "idEjecucion" = $1
+                RETURNING *
+            ''', id_ejecucion, duracion_ms, filas, estado, error)
+
+            if error:
+                logging.error(f"[Tareas] {tarea.nombre}: error tras {duracion_ms} ms: {error}")
+            else:
+                logging.info(f"[Tareas] {tarea.nombre}: ok en {duracion_ms} ms ({filas} filas)")
+            return TareaEjecucion(**dict(row))
+        finally:
+            await conn.execute(QUERY_SOLTAR_LOCK, tarea.nombre)
+
+class PlanificadorTareas:
+    """
+    Dispara las tareas de TAREAS según su cron (APScheduler). Se puede levantar en varios
+    procesos a la vez (run_scheduler.py en cada nodo, o dentro de la API con SCHEDULER_EN_APP):
+    cada disparo se reclama en "TareaEjecucion" por su hora programada, así corre en uno solo.
+
+    stop() deja de disparar y espera a que terminen las ejecuciones en curso
+    (hasta SCHEDULER_SHUTDOWN_TIMEOUT segundos; después las cancela).
+    """
+
+    def __init__(self, pool: Pool, tareas: Optional[Dict[str, Tarea]] = None):
+        self.pool = pool
+        self.tareas = tareas or TAREAS
+        self._scheduler = AsyncIOScheduler(timezone=ZoneInfo(settings.SCHEDULER_ZONA_HORARIA))
+        self._en_curso: Set[asyncio.Task] = set()
+        # Hora programada del disparo que APScheduler acaba de enviar, por tarea
+        self._programadas: Dict[str, datetime] = {}
+
+    def start(self) -> None:
+        for tarea in self.tareas.values():
+            self._scheduler.add_job(
+                self._disparar, tarea.trigger(), args=[tarea], id=tarea.nombre,
+                max_instances=1, coalesce=True, misfire_grace_time=3600
+            )
+        self._scheduler.add_listener(self._al_enviar, EVENT_JOB_SUBMITTED)
+        self._scheduler.start()
+        for job in self._scheduler.get_jobs():
+            logging.info(f"[Tareas] '{job.id}' próxima ejecución: {job.next_run_time}")
+
+    async def stop(self) -> None:
+        if self._scheduler.running:
+            self._scheduler.shutdown(wait=False)
+        if not self._en_curso:
+            return
+        logging.info(f"[Tareas] Esperando {len(self._en_curso)} tarea(s) en curso...")
+        _, pendientes = await asyncio.wait(self._en_curso, timeout=settings.SCHEDULER_SHUTDOWN_TIMEOUT)
+        for t in pendientes:
+            t.cancel()
+        if pendientes:
+            await asyncio.wait(pendientes)
+            logging.warning(f"[Tareas] {len(pendientes)} tarea(s) canceladas al apagar")
+
+    def _al_enviar(self, evento: JobSubmissionEvent) -> None:
+        # AsyncIOScheduler avisa el envío en el mismo paso del loop, antes de que arranque
+        # la corrutina del job. Con coalesce=True el disparo que corre es el último.
+        self._programadas[evento.job_id] = evento.scheduled_run_times[-1]
+
+    async def _disparar(self, tarea: Tarea) -> None:
+        programada = self._programadas.pop(tarea.nombre, None)
+        if programada is None:
+            # Sin hora programada no se puede reclamar el disparo: mejor no correr dos veces
+            logging.error(f"[Tareas] {tarea.nombre}: disparo sin hora programada, se omite")
+            return
+
+        # Tarea propia (no la de APScheduler) para poder esperarla en stop()
+        t = asyncio.create_task(ejecutar_tarea(self.pool, tarea, programada), name=f"tarea-{tarea.nombre}")
+        self._en_curso.add(t)
+        t.add_done_callback(self._en_curso.discard)
+        try:
+            await asyncio.shield(t)
+        except Exception as e:
+            logging.error(f"[Tareas] {tarea.nombre}: no se pudo registrar la ejecución: {e}")
+
+def obtener_tarea(nombre: str) -> Tarea:
+    tarea = TAREAS.get(nombre)
+    if not tarea:
+        raise NotFoundException("Tarea", nombre)
+    return tarea
+
+async def listar_ejecuciones(conn: Connection, nombre: str, limite: int = 50) -> List[TareaEjecucion]:
+    """Historial de una tarea (más reciente primero)."""
+    obtener_tarea(nombre)
+    try:
+        rows = await conn.fetch(
+            'SELECT * FROM "TareaEjecucion" WHERE tarea = $1 ORDER BY inicio DESC LIMIT $2',
+            nombre, limite
+        )
+    except Exception as e:
+        raise DatabaseException("listar ejecuciones de tareas", str(e))
+    return [TareaEjecucion(**dict(row)) for row in rows]
+
+async def estado_tareas(conn: Connection) -> List[TareaEstado]:
+    """Por tarea: cron, próxima ejecución, si algún nodo la está corriendo y su última ejecución."""
+    try:
+        ultimas = await conn.fetch('''
+            SELECT DISTINCT ON (tarea) *
+            FROM "TareaEjecucion"
+            WHERE tarea = ANY($1::text[]) AND estado <> 'omitida'
+            ORDER BY tarea, inicio DESC
+        ''', list(TAREAS))
+        exitosas = await conn.fetch('''
+            SELECT tarea, MAX(inicio) AS inicio
+            FROM "TareaEjecucion"
+            WHERE tarea = ANY($1::text[]) AND estado = 'ok'
+            GROUP BY tarea
+        ''', list(TAREAS))
+        en_curso = {nombre: await conn.fetchval(QUERY_LOCK_TOMADO, nombre) for nombre in TAREAS}
+    except Exception as e:
+        raise DatabaseException("consultar estado de tareas", str(e))
+
+    ultimas = {row['tarea']: TareaEjecucion(**dict(row)) for row in ultimas}
+    exitosas = {row['tarea']: row['inicio'] for row in exitosas}
+    ahora = datetime.now(ZoneInfo(settings.SCHEDULER_ZONA_HORARIA))
+    return [
+        TareaEstado(
+            nombre=tarea.nombre,
+            descripcion=tarea.descripcion,
+            cron=tarea.cron,
+            enCurso=en_curso[tarea.nombre],
+            proximaEjecucion=tarea.trigger().get_next_fire_time(None, ahora),
+            ultimaEjecucion=ultimas.get(tarea.nombre),
+            ultimaExitosa=exitosas.get(tarea.nombre),
+        )
+        for tarea in TAREAS.values()
+    ]
@@ -12,6 +12,7 @@ from schemas.trabajoSchema import (
     TrabajoUpdateCompleto
 )
 from utils.exceptions import DatabaseException, DuplicateEntryException, NotFoundException
+from utils.cache import catalogo_cache
 
 # SERVICE para crear un trabajo nuevo
 async def create(con: Connection, job_data: TrabajoCreate) -> TrabajoInDB:
@@ -26,6 +27,7 @@ async def create(con: Connection, job_data: TrabajoCreate) -> TrabajoInDB:
             job_data.nombreTrabajo,
             job_data.descripcion
         )
+        catalogo_cache.invalidar("trabajos")
         return TrabajoInDB(**job)
     except UniqueViolationError:
         raise HTTPException(
@@ -40,13 +42,16 @@ async def create(con: Connection, job_data: TrabajoCreate) -> TrabajoInDB:
 
 # SERVICE para obtener todos los trabajos
 async def get_all(con: Connection) -> List[TrabajoInDB]:
-    try:
+    async def cargar():
         query = """
             SELECT *
             FROM "Trabajo";
         """
         res = await con.fetch(query)
         return [TrabajoInDB(**elem) for elem in res]
+
+    try:
+        return await catalogo_cache.obtener(("trabajos",), cargar)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -74,6 +79,7 @@ async def update_desc(con: Connection, nombreTrabajo: str, job_data: TrabajoUpda
         if not job:
             raise NotFoundException("Trabajo", nombreTrabajo)
             
+        catalogo_cache.invalidar("trabajos")
         return TrabajoInDB(**job)
     except NotFoundException:
         raise # Re-lanzamos la excepción para que el handler la capture
@@ -96,6 +102,7 @@ async def delete(con: Connection, nombreTrabajo: str) -> dict:
                 detail=f"Trabajo '{nombreTrabajo}' no encontrado"
             )
             
+        catalogo_cache.invalidar("trabajos")
         return {
             "message": f"El trabajo '{nombreTrabajo}' se eliminó correctamente"
         }
@@ -133,6 +140,7 @@ async def update_trabajo(con: Connection, old_job_name: str, job_data: TrabajoUp
                     RETURNING "nombreTrabajo", descripcion;
                 """
                 updated_job = await con.fetchrow(query, job_data.descripcion, old_job_name)
+                catalogo_cache.invalidar("trabajos")
                 return TrabajoInDB(**updated_job)
             
             # Si el nombre ha cambiado, aplicamos la lógica de migración
@@ -157,6 +165,7 @@ async def update_trabajo(con: Connection, old_job_name: str, job_data: TrabajoUp
             # 5. Eliminar el trabajo antiguo
             await con.execute('DELETE FROM "Trabajo" WHERE "nombreTrabajo" = $1', old_job_name)
             
+            catalogo_cache.invalidar("trabajos")
             return TrabajoInDB(**job_data.dict())
 
         except UniqueViolationError:
@@ -8,6 +8,7 @@ from schemas.ubicacionSchema import (
     ProvinciaConLocalidades
 )
 from utils.exceptions import NotFoundException, DatabaseException, DuplicateEntryException
+from utils.cache import catalogo_cache
 
 async def crear_provincia(conn: Connection, provincia: ProvinciaCreate) -> ProvinciaResponse:
     try:
@@ -17,15 +18,19 @@ async def crear_provincia(conn: Connection, provincia: ProvinciaCreate) -> Provi
         RETURNING "nomProvincia"
         '''
         result = await conn.fetchrow(query, provincia.nomProvincia)
+        catalogo_cache.invalidar("ubicaciones")
         return ProvinciaResponse(**result)
     except Exception as e:
         raise DatabaseException("crear provincia", str(e))
 
 async def obtener_provincias(conn: Connection) -> List[ProvinciaResponse]:
-    try:
+    async def cargar():
         query = 'SELECT "nomProvincia" FROM "Provincia" ORDER BY "nomProvincia"'
         resultados = await conn.fetch(query)
         return [ProvinciaResponse(**dict(row)) for row in resultados]
+
+    try:
+        return await catalogo_cache.obtener(("ubicaciones", "provincias"), cargar)
     except Exception as e:
         raise DatabaseException("obtener provincias", str(e))
 
@@ -45,12 +50,13 @@ async def crear_localidad(conn: Connection, localidad: LocalidadCreate) -> Local
         RETURNING "nomLocalidad", "nomProvincia"
         '''
         result = await conn.fetchrow(query, localidad.nomLocalidad, localidad.nomProvincia)
+        catalogo_cache.invalidar("ubicaciones")
         return LocalidadResponse(**result)
     except Exception as e:
         raise DatabaseException("crear localidad", str(e))
 
 async def obtener_localidades_por_provincia(conn: Connection, nomProvincia: str) -> List[LocalidadResponse]:
-    try:
+    async def cargar():
         query = '''
         SELECT "nomLocalidad", "nomProvincia" 
         FROM "Localidad" 
@@ -59,11 +65,14 @@ async def obtener_localidades_por_provincia(conn: Connection, nomProvincia: str)
         '''
         resultados = await conn.fetch(query, nomProvincia)
         return [LocalidadResponse(**dict(row)) for row in resultados]
+
+    try:
+        return await catalogo_cache.obtener(("ubicaciones", "localidades", nomProvincia), cargar)
     except Exception as e:
         raise DatabaseException("obtener localidades por provincia", str(e))
 
 async def obtener_todas_localidades(conn: Connection) -> List[LocalidadResponse]:
-    try:
+    async def cargar():
         query = '''
         SELECT "nomLocalidad", "nomProvincia" 
         FROM "Localidad" 
@@ -71,6 +80,9 @@ async def obtener_todas_localidades(conn: Connection) -> List[LocalidadResponse]
         '''
         resultados = await conn.fetch(query)
         return [LocalidadResponse(**dict(row)) for row in resultados]
+
+    try:
+        return await catalogo_cache.obtener(("ubicaciones", "localidades"), cargar)
     except Exception as e:
         raise DatabaseException("obtener todas las localidades", str(e))
 
@@ -78,7 +90,7 @@ async def obtener_localidades_agrupadas_por_provincia(conn: Connection) -> List[
     """
     Obtiene todas las localidades agrupadas por provincia
     """
-    try:
+    async def cargar():
         query = '''
         SELECT 
             p."nomProvincia" as provincia,
@@ -100,6 +112,8 @@ async def obtener_localidades_agrupadas_por_provincia(conn: Connection) -> List[
             provincias_con_localidades.append(ProvinciaConLocalidades(**provincia_data))
         
         return provincias_con_localidades
-        
+
+    try:
+        return await catalogo_cache.obtener(("ubicaciones", "agrupadas"), cargar)
     except Exception as e:
         raise DatabaseException("obtener localidades agrupadas por provincia", str(e))
\ No newline at end of file
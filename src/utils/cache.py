@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from asyncpg import Pool
+
+from core.config import settings
+
+class TTLCache:
+    """
+    Caché LRU acotada con expiración por entrada, local al proceso.
+    No es thread-safe: está pensada para usarse desde el event loop.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+
+        # Marcamos la entrada como usada recientemente (LRU)
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+
+        ttl = self.ttl_seconds if ttl is None else min(ttl, self.ttl_seconds)
+        if ttl <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Elimina todas las entradas cuyo valor cumpla el predicado. Devuelve cuántas borró."""
+        keys = [key for key, (_, value) in self._data.items() if predicate(value)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def delete_keys(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Elimina todas las entradas cuya clave cumpla el predicado. Devuelve cuántas borró."""
+        keys = [key for key in self._data if predicate(key)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# ==========================================
+# Caché de usuarios autenticados (principal)
+# ==========================================
+# Clave: hash del JWT (nunca guardamos el token en claro). Valor: principal resuelto.
+principal_cache = TTLCache(
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS
+)
+
+def token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+# Los triggers de scripts/migrations/014_principal_notify.sql publican en este canal el dni de
+# la persona cuya fila o roles cambiaron, para que cada worker invalide su copia (CacheListener).
+CANAL_PRINCIPAL = "principal_cambio"
+
+def invalidar_principal(dni: Optional[str] = None, email: Optional[str] = None) -> int:
+    """
+    Elimina de la caché de este worker los principals de una persona (todas sus sesiones).
+    Los servicios la llaman después de confirmar una escritura sobre Persona o sus roles, para
+    que el cambio valga enseguida en el worker que lo hizo; el resto se entera por NOTIFY.
+    """
+    return principal_cache.delete_where(
+        lambda principal: (dni is not None and principal.get("dni") == dni)
+        or (email is not None and principal.get("email") == email)
+    )
+
+
+# ==========================================
+# Caché de catálogos (horarios, trabajos, suscripciones, ubicaciones)
+# ==========================================
+# Las claves son tuplas cuyo primer elemento es el nombre del catálogo, ej: ("ubicaciones", "provincias").
+# Los triggers de scripts/migrations/006_catalogo_notify.sql publican el nombre del catálogo
+# modificado en este canal al confirmarse la transacción.
+CANAL_CATALOGO = "catalogo_cambio"
+
+class CatalogoCache:
+    """
+    Caché por proceso de listas que cambian poco y se leen en cada página.
+    Se invalida localmente desde los servicios que escriben y, entre workers, con
+    LISTEN/NOTIFY (ver CacheListener). El TTL es solo una red de seguridad.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 256):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._generacion = 0
+
+    async def obtener(self, clave: tuple, cargar: Callable[[], Awaitable[Any]]) -> Any:
+        valor = self._cache.get(clave)
+        if valor is not None:
+            return valor
+
+        generacion = self._generacion
+        valor = await cargar()
+        # Si hubo una invalidación mientras se cargaba, el valor puede estar viejo: no se guarda
+        if generacion == self._generacion:
+            self._cache.set(clave, valor)
+        return valor
+
+    def invalidar(self, *catalogos: str) -> None:
+        """Invalida los catálogos indicados (todos si no se indica ninguno)."""
+        self._generacion += 1
+        if not catalogos:
+            self._cache.clear()
+        else:
+            self._cache.delete_keys(lambda clave: clave[0] in catalogos)
+
+catalogo_cache = CatalogoCache(ttl_seconds=settings.CATALOG_CACHE_TTL_SECONDS)
+
+class CacheListener:
+    """
+    Escucha CANAL_CATALOGO y CANAL_PRINCIPAL en una conexión dedicada del pool e invalida las
+    cachés locales (catálogos y usuarios autenticados). Si la conexión se pierde se vacían las
+    dos (pudieron perderse avisos) y se reconecta.
+    """
+
+    REINTENTO_SEGUNDOS = 5
+
+    def __init__(self, pool: Pool, cache: Optional[CatalogoCache] = None):
+        self.pool = pool
+        self.cache = cache or catalogo_cache
+        self._detener = asyncio.Event()
+        self._tarea: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._tarea = asyncio.create_task(self.run(), name="catalogo-listener")
+
+    async def stop(self) -> None:
+        self._detener.set()
+        if self._tarea:
+            await self._tarea
+
+    def _on_notify(self, conn, pid, canal, payload) -> None:
+        self.cache.invalidar(*([payload] if payload else []))
+
+    def _on_principal(self, conn, pid, canal, payload) -> None:
+        if payload:
+            invalidar_principal(dni=payload)
+        else:
+            principal_cache.clear()
+
+    def _invalidar_todo(self) -> None:
+        self.cache.invalidar()
+        principal_cache.clear()
+
+    async def run(self) -> None:
+        while not self._detener.is_set():
+            try:
+                async with self.pool.acquire() as conn:
+                    perdida = asyncio.Event()
+                    conn.add_termination_listener(lambda c: perdida.set())
+                    await conn.add_listener(CANAL_CATALOGO, self._on_notify)
+                    await conn.add_listener(CANAL_PRINCIPAL, self._on_principal)
+                    # Lo que cambió mientras no escuchábamos
+                    self._invalidar_todo()
+                    logging.info("[Catálogo] Escuchando cambios de catálogos y usuarios")
+
+                    esperas = [asyncio.create_task(self._detener.wait()), asyncio.create_task(perdida.wait())]
+                    await asyncio.wait(esperas, return_when=asyncio.FIRST_COMPLETED)
+                    for tarea in esperas:
+                        tarea.cancel()
+
+                    if not conn.is_closed():
+                        await conn.remove_listener(CANAL_CATALOGO, self._on_notify)
+                        await conn.remove_listener(CANAL_PRINCIPAL, self._on_principal)
+            except Exception as e:
+                logging.error(f"[Catálogo] Error en la conexión de LISTEN: {e}")
+
+            if not self._detener.is_set():
+                self._invalidar_todo()
+                try:
+                    await asyncio.wait_for(self._detener.wait(), timeout=self.REINTENTO_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    pass
+        logging.info("[Catálogo] Listener detenido")
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from core.config import settings
+
+# Subir cuando cambie el diseño del comprobante: cambian todas las claves y se vuelven a generar
+VERSION_DISENIO = 1
+
+def _directorio() -> Path:
+    return Path(settings.COMPROBANTES_DIR)
+
+def clave_comprobante(datos: dict) -> str:
+    """
+    Clave de contenido del comprobante: hash de todos los datos que se imprimen.
+    Si cambia cualquiera (monto, método de pago, nombre del alumno...) cambia la clave,
+    así nunca se sirve una copia vieja aunque no se haya invalidado.
+    """
+    canonico = json.dumps({"version": VERSION_DISENIO, **datos}, sort_keys=True, default=str)
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+def ruta_comprobante(id_cuota: int, clave: str) -> Path:
+    return _directorio() / f"{id_cuota}-{clave}.pdf"
+
+def leer_comprobante(id_cuota: int, clave: str) -> Optional[bytes]:
+    """
+    Contenido del PDF guardado, o None si no está. Se lee entero (son unos pocos KB) en vez de
+    devolver la ruta: si invalidar_comprobante lo borra mientras se envía, la descarga no falla.
+    """
+    try:
+        return ruta_comprobante(id_cuota, clave).read_bytes()
+    except FileNotFoundError:
+        return None
+
+def guardar_comprobante(id_cuota: int, clave: str, contenido: bytes) -> Path:
+    """
+    Escribe el PDF de forma atómica (archivo temporal + rename), así un request concurrente
+    nunca lee un archivo a medio escribir.
+
+    Borra además las otras versiones de la cuota con más de COMPROBANTES_GRACIA_SEGUNDOS: las
+    que dejan los cambios de datos que no pasan por invalidar_comprobante (nombre o email de
+    la persona, VERSION_DISENIO). Las recientes se dejan: otra descarga podría estar leyéndolas.
+    """
+    directorio = _directorio()
+    directorio.mkdir(parents=True, exist_ok=True)
+    destino = ruta_comprobante(id_cuota, clave)
+    temporal = directorio / f".{destino.name}.{uuid.uuid4().hex}.tmp"
+    temporal.write_bytes(contenido)
+    os.replace(temporal, destino)
+
+    limite = time.time() - settings.COMPROBANTES_GRACIA_SEGUNDOS
+    for viejo in directorio.glob(f"{id_cuota}-*.pdf"):
+        try:
+            if viejo != destino and viejo.stat().st_mtime < limite:
+                viejo.unlink()
+        except FileNotFoundError:
+            pass  # Lo borró otro request
+    return destino
+
+def invalidar_comprobante(id_cuota: int) -> None:
+    """Borra las copias guardadas del comprobante de la cuota (se regenera en la próxima descarga)."""
+    directorio = _directorio()
+    if directorio.is_dir():
+        for archivo in directorio.glob(f"{id_cuota}-*.pdf"):
+            archivo.unlink(missing_ok=True)
@@ -1,37 +1,64 @@
+import asyncio
+import logging
 import smtplib
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import List, Optional
+
+from asyncpg import Connection, Pool
+
 from core.config import settings
 
 class EmailService:
+    """
+    Arma los emails de la aplicación y los deja en la tabla "EmailOutbox".
+    El envío real lo hace EmailOutboxSender en segundo plano, así el request
+    no depende de la latencia del servidor SMTP.
+    """
     def __init__(self):
         self.smtp_server = settings.SMTP_SERVER
         self.smtp_port = settings.SMTP_PORT
         self.smtp_username = settings.SMTP_USER
         self.smtp_password = settings.SMTP_PASSWORD.get_secret_value()
+        self.smtp_use_tls = settings.SMTP_USE_TLS
         self.frontend_url = settings.FRONTEND_URL
         self.backend_url = settings.BACKEND_URL
+        # Evento para despertar al sender de este proceso apenas se encola algo
+        self.nuevo_email = asyncio.Event()
     
-    async def send_email(self, to_email: str, subject: str, body_html: str) -> bool:
-        """Función para enviar emails usando SMTP"""
+    async def send_email(self, conn: Connection, to_email: str, subject: str, body_html: str) -> bool:
+        """Encola un email en el outbox. Devuelve True si quedó registrado."""
         try:
-            msg = MIMEMultipart()
-            msg['From'] = self.smtp_username
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            msg.attach(MIMEText(body_html, 'html'))
-            
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_username, self.smtp_password)
-            server.send_message(msg)
-            server.quit()
+            await conn.execute('''
+                INSERT INTO "EmailOutbox" (destinatario, asunto, cuerpo)
+                VALUES ($1, $2, $3)
+            ''', to_email, subject, body_html)
+            self.nuevo_email.set()
             return True
         except Exception as e:
-            print(f"Error enviando email: {e}")
+            print(f"Error encolando email: {e}")
             return False
+
+    def build_message(self, to_email: str, subject: str, body_html: str) -> MIMEMultipart:
+        msg = MIMEMultipart()
+        msg['From'] = self.smtp_username
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body_html, 'html'))
+        return msg
+
+    def open_smtp(self) -> smtplib.SMTP:
+        """Abre y autentica una sesión SMTP (bloqueante, usar desde un hilo)."""
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=settings.SMTP_TIMEOUT)
+        if self.smtp_use_tls:
+            server.starttls()
+        # Un servidor SMTP local de depuración no requiere login
+        if self.smtp_password:
+            server.login(self.smtp_username, self.smtp_password)
+        return server
     
-    async def send_verification_email(self, email: str, token: str) -> bool:
+    async def send_verification_email(self, conn: Connection, email: str, token: str) -> bool:
         """Envía email de verificación"""
         subject = "Verifica tu cuenta - Gimnasio Abito"
         
@@ -51,9 +78,9 @@ class EmailService:
         </html>
         """
         
-        return await self.send_email(email, subject, body_html)
+        return await self.send_email(conn, email, subject, body_html)
     
-    async def send_password_reset_email(self, email: str, token: str) -> bool:
+    async def send_password_reset_email(self, conn: Connection, email: str, token: str) -> bool:
         """Envía email para resetear contraseña"""
         subject = "Restablecer contraseña - Gimnasio Abito"
         
@@ -75,9 +102,9 @@ class EmailService:
         </html>
         """
         
-        return await self.send_email(email, subject, body_html)
+        return await self.send_email(conn, email, subject, body_html)
     
-    async def send_welcome_email(self, email: str, nombre: str) -> bool:
+    async def send_welcome_email(self, conn: Connection, email: str, nombre: str) -> bool:
         """Envía email de bienvenida después de registro completo"""
         subject = "¡Bienvenido a Gimnasio Abito!"
         
@@ -94,7 +121,178 @@ class EmailService:
         </html>
         """
         
-        return await self.send_email(email, subject, body_html)
+        return await self.send_email(conn, email, subject, body_html)
 
 # Instancia global del servicio de email
 email_service = EmailService()
+
+
+class EmailOutboxSender:
+    """
+    Worker en segundo plano que vacía la tabla "EmailOutbox".
+    - Reclama lotes con FOR UPDATE SKIP LOCKED (seguro con varios workers de uvicorn).
+    - Reutiliza una sola sesión SMTP autenticada por lote (el smtplib bloqueante corre en un hilo).
+    - Los fallos se reintentan con backoff exponencial hasta EMAIL_MAX_INTENTOS.
+
+    Para probar en local alcanza con un servidor SMTP de depuración, por ejemplo
+    `python -m aiosmtpd -n -l localhost:1025` con SMTP_PORT=1025, SMTP_USE_TLS=False
+    y SMTP_PASSWORD vacío.
+    """
+
+    def __init__(self, pool: Pool, service: Optional[EmailService] = None):
+        self.pool = pool
+        self.service = service or email_service
+        self._detener = asyncio.Event()
+        self._tarea: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._tarea = asyncio.create_task(self.run(), name="email-outbox-sender")
+
+    async def stop(self) -> None:
+        self._detener.set()
+        self.service.nuevo_email.set()
+        if self._tarea:
+            await self._tarea
+
+    async def run(self) -> None:
+        logging.info("[Outbox] Sender de emails iniciado")
+        while not self._detener.is_set():
+            self.service.nuevo_email.clear()
+            try:
+                procesados = await self.procesar_lote()
+            except Exception as e:
+                logging.error(f"[Outbox] Error procesando lote de emails: {e}")
+                procesados = 0
+
+            # Si el lote vino lleno probablemente hay más pendientes: seguimos sin esperar
+            if procesados >= settings.EMAIL_OUTBOX_BATCH_SIZE:
+                continue
+
+            try:
+                await asyncio.wait_for(
+                    self.service.nuevo_email.wait(),
+                    timeout=settings.EMAIL_OUTBOX_POLL_SECONDS
+                )
+            except asyncio.TimeoutError:
+                pass
+        logging.info("[Outbox] Sender de emails detenido")
+
+    # Timeouts SMTP que puede llevar un email en el peor caso (MAIL, RCPT, DATA y el cuerpo)
+    TIMEOUTS_POR_EMAIL = 4
+
+    @classmethod
+    def lease_segundos(cls) -> float:
+        """
+        Tiempo que un lote reclamado queda reservado para este proceso (si muere con emails
+        'enviando', otro los retoma después). Es corto y fijo (4 minutos con el timeout por
+        defecto), muy por debajo de los 15 minutos que duran los tokens de verificación: no
+        crece con el lote porque el envío deja de arrancar emails cuando el lease está por
+        vencer (ver _enviar_lote_smtp) y esos vuelven a la cola.
+        """
+        return 2 * cls.TIMEOUTS_POR_EMAIL * settings.SMTP_TIMEOUT
+
+    async def procesar_lote(self) -> int:
+        """Reclama, envía y registra el resultado de un lote. Devuelve cuántos emails tomó."""
+        lease = self.lease_segundos()
+        vence = time.monotonic() + lease
+        async with self.pool.acquire() as conn:
+            emails = await conn.fetch('''
+                UPDATE "EmailOutbox" o
+                SET estado = 'enviando',
+                    intentos = o.intentos + 1,
+                    "proximoIntento" = now() + make_interval(secs => $2)
+                WHERE o."idEmail" IN (
+                    SELECT "idEmail"
+                    FROM "EmailOutbox"
+                    WHERE estado IN ('pendiente', 'enviando')
+                        AND "proximoIntento" <= now()
+                    ORDER BY "proximoIntento"
+                    LIMIT $1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING o."idEmail", o.destinatario, o.asunto, o.cuerpo, o.intentos
+            ''', settings.EMAIL_OUTBOX_BATCH_SIZE, lease)
+
+        if not emails:
+            return 0
+
+        # El envío SMTP es bloqueante: lo hacemos fuera del event loop y sin tener la conexión a la BD
+        resultados = await asyncio.to_thread(self._enviar_lote_smtp, [dict(e) for e in emails], vence)
+        # Los que no se llegaron a intentar vuelven a la cola sin gastar un intento
+        sin_enviar = [email["idEmail"] for email in emails if email["idEmail"] not in resultados]
+
+        enviados = [id_email for id_email, error in resultados.items() if error is None]
+        fallidos = []
+        for email in emails:
+            error = resultados.get(email["idEmail"])
+            if error is None:
+                continue
+            intentos = email["intentos"]
+            estado = "fallido" if intentos >= settings.EMAIL_MAX_INTENTOS else "pendiente"
+            espera = settings.EMAIL_RETRY_BASE_SECONDS * (2 ** (intentos - 1))
+            fallidos.append((email["idEmail"], estado, error[:500], float(espera)))
+
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if enviados:
+                    await conn.execute('''
+                        UPDATE "EmailOutbox"
+                        SET estado = 'enviado', "fechaEnvio" = now(), "ultimoError" = NULL
+                        WHERE "idEmail" = ANY($1::bigint[])
+                    ''', enviados)
+                if fallidos:
+                    await conn.executemany('''
+                        UPDATE "EmailOutbox"
+                        SET estado = $2,
+                            "ultimoError" = $3,
+                            "proximoIntento" = now() + make_interval(secs => $4)
+                        WHERE "idEmail" = $1
+                    ''', fallidos)
+                if sin_enviar:
+                    await conn.execute('''
+                        UPDATE "EmailOutbox"
+                        SET estado = 'pendiente', intentos = intentos - 1, "proximoIntento" = now()
+                        WHERE "idEmail" = ANY($1::bigint[])
+                    ''', sin_enviar)
+
+        if fallidos:
+            logging.warning(f"[Outbox] {len(enviados)} enviados, {len(fallidos)} con error (se reintentarán)")
+        if sin_enviar:
+            logging.warning(f"[Outbox] Lote cortado antes de que venza el lease: {len(sin_enviar)} emails vuelven a la cola")
+        return len(emails)
+
+    def _enviar_lote_smtp(self, emails: List[dict], vence: float) -> dict:
+        """
+        Envía el lote con UNA sesión SMTP. Devuelve {idEmail: None | mensaje_de_error}.
+        Corre en un hilo (bloqueante). No arranca un email si para `vence` (time.monotonic()
+        en que vence el lease) no alcanza el peor caso de un envío: esos quedan fuera del
+        resultado, para que otro worker no los retome mientras se envían.
+        """
+        try:
+            server = self.service.open_smtp()
+        except Exception as e:
+            return {email["idEmail"]: f"Conexión SMTP: {e}" for email in emails}
+
+        resultados = {}
+        try:
+            for i, email in enumerate(emails):
+                if time.monotonic() > vence - self.TIMEOUTS_POR_EMAIL * settings.SMTP_TIMEOUT:
+                    break
+                try:
+                    msg = self.service.build_message(email["destinatario"], email["asunto"], email["cuerpo"])
+                    server.send_message(msg)
+                    resultados[email["idEmail"]] = None
+                except smtplib.SMTPServerDisconnected as e:
+                    # Se cayó la sesión: este y los que faltan se reintentan más tarde
+                    for pendiente in emails[i:]:
+                        resultados[pendiente["idEmail"]] = f"Desconectado: {e}"
+                    break
+                except Exception as e:
+                    resultados[email["idEmail"]] = str(e)
+        finally:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+        return resultados
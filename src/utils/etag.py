@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+def etag_fuerte(clave: str) -> str:
+    return f'"{clave}"'
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    True si el header If-None-Match del cliente incluye `etag` (o es '*').
+    La comparación es débil, como pide RFC 9110 para If-None-Match: se ignora el prefijo W/.
+    """
+    if not if_none_match:
+        return False
+    buscado = etag.removeprefix("W/")
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == buscado:
+            return True
+    return False
+
+def fecha_http(momento: datetime) -> str:
+    """Formato de fecha HTTP (IMF-fixdate) para Last-Modified."""
+    return format_datetime(momento.astimezone(timezone.utc), usegmt=True)
+
+def no_modificado_desde(if_modified_since: Optional[str], modificado: datetime) -> bool:
+    """
+    True si el recurso no cambió desde If-Modified-Since. La fecha HTTP tiene resolución de
+    segundos, así que se compara truncando `modificado`. Un header inválido se ignora.
+    """
+    if not if_modified_since:
+        return False
+    try:
+        desde = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if desde.tzinfo is None:
+        desde = desde.replace(tzinfo=timezone.utc)
+    return modificado.replace(microsecond=0) <= desde
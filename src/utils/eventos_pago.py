@@ -0,0 +1,112 @@
+import asyncio
+import json
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Set
+
+from asyncpg import Pool
+
+# Canal publicado por el trigger de scripts/migrations/010_cuota_pago_notify.sql
+CANAL_PAGO = "cuota_pago"
+
+class PagoEventos:
+    """
+    Reparte los cambios de estado de pago a los streams abiertos de este proceso.
+    Cada suscriptor recibe en su cola el nuevo valor de "pagada", o None cuando pudieron
+    perderse avisos (se cortó el LISTEN) y debe releer el estado de la base.
+    """
+
+    def __init__(self):
+        self._suscriptores: Dict[int, Set[asyncio.Queue]] = {}
+        # True mientras PagoEstadoListener tiene el LISTEN activo
+        self.escuchando = False
+
+    @contextmanager
+    def suscribir(self, id_cuota: int) -> Iterator[asyncio.Queue]:
+        cola: asyncio.Queue = asyncio.Queue()
+        self._suscriptores.setdefault(id_cuota, set()).add(cola)
+        try:
+            yield cola
+        finally:
+            colas = self._suscriptores.get(id_cuota)
+            if colas is not None:
+                colas.discard(cola)
+                if not colas:
+                    del self._suscriptores[id_cuota]
+
+    def publicar(self, id_cuota: int, pagada: Optional[bool]) -> None:
+        for cola in self._suscriptores.get(id_cuota, ()):
+            cola.put_nowait(pagada)
+
+    def resincronizar(self) -> None:
+        """Pide a todos los suscriptores que relean el estado de la base."""
+        for id_cuota in list(self._suscriptores):
+            self.publicar(id_cuota, None)
+
+    @property
+    def suscriptores(self) -> int:
+        return sum(len(colas) for colas in self._suscriptores.values())
+
+pago_eventos = PagoEventos()
+
+class PagoEstadoListener:
+    """
+    Escucha CANAL_PAGO en una conexión dedicada del pool (una por proceso, sin importar
+    cuántos streams haya abiertos) y reparte los avisos con PagoEventos.
+    Si la conexión se pierde, los streams releen el estado y se reconecta.
+    """
+
+    REINTENTO_SEGUNDOS = 5
+
+    def __init__(self, pool: Pool, eventos: Optional[PagoEventos] = None):
+        self.pool = pool
+        self.eventos = eventos or pago_eventos
+        self._detener = asyncio.Event()
+        self._tarea: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._tarea = asyncio.create_task(self.run(), name="pago-estado-listener")
+
+    async def stop(self) -> None:
+        self._detener.set()
+        if self._tarea:
+            await self._tarea
+
+    def _on_notify(self, conn, pid, canal, payload) -> None:
+        try:
+            aviso = json.loads(payload)
+            self.eventos.publicar(int(aviso["idCuota"]), bool(aviso["pagada"]))
+        except (ValueError, KeyError, TypeError):
+            logging.warning(f"[Pagos] Aviso de pago inválido: {payload!r}")
+
+    async def run(self) -> None:
+        while not self._detener.is_set():
+            try:
+                async with self.pool.acquire() as conn:
+                    perdida = asyncio.Event()
+                    conn.add_termination_listener(lambda c: perdida.set())
+                    await conn.add_listener(CANAL_PAGO, self._on_notify)
+                    self.eventos.escuchando = True
+                    # Lo que cambió mientras no escuchábamos
+                    self.eventos.resincronizar()
+                    logging.info("[Pagos] Escuchando cambios de estado de pago")
+
+                    esperas = [asyncio.create_task(self._detener.wait()), asyncio.create_task(perdida.wait())]
+                    await asyncio.wait(esperas, return_when=asyncio.FIRST_COMPLETED)
+                    for tarea in esperas:
+                        tarea.cancel()
+
+                    if not conn.is_closed():
+                        await conn.remove_listener(CANAL_PAGO, self._on_notify)
+            except Exception as e:
+                logging.error(f"[Pagos] Error en la conexión de LISTEN: {e}")
+            finally:
+                self.eventos.escuchando = False
+
+            if not self._detener.is_set():
+                self.eventos.resincronizar()
+                try:
+                    await asyncio.wait_for(self._detener.wait(), timeout=self.REINTENTO_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    pass
+        logging.info("[Pagos] Listener de estado de pago detenido")
@@ -76,6 +76,16 @@ class AuthorizationException(AppException):
             status_code=status.HTTP_403_FORBIDDEN
         )
 
+class ServiceUnavailableException(AppException):
+    """Excepción para recursos saturados temporalmente (el cliente debe reintentar)"""
+    
+    def __init__(self, detail: str = "Servicio saturado, intente nuevamente", retry_after: int = 5):
+        super().__init__(
+            detail=detail, 
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(retry_after)}
+        )
+
 class BusinessRuleException(AppException):
     """Excepción para violaciones de reglas de negocio"""
     
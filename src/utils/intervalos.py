@@ -0,0 +1,45 @@
+from bisect import bisect_left
+from datetime import time
+from typing import Hashable, Iterable, List, Optional, Tuple
+
+class IndiceIntervalos:
+    """
+    Índice ordenado de intervalos semiabiertos [inicio, fin) que no se superponen entre sí
+    (invariante garantizado en la base por la exclusion constraint de "Horario").
+
+    Al estar ordenados por inicio y ser disjuntos, también quedan ordenados por fin: el único
+    candidato a superponerse con [inicio, fin) es el último intervalo que empieza antes de `fin`
+    (o el anterior, si ese es el que se excluye). La consulta es una búsqueda binaria: O(log n).
+    """
+
+    def __init__(self, intervalos: Iterable[Tuple[Hashable, time, time]]):
+        ordenados = sorted(intervalos, key=lambda i: (i[1], i[2]))
+        self._claves = [clave for clave, _, _ in ordenados]
+        self._inicios = [inicio for _, inicio, _ in ordenados]
+        self._fines = [fin for _, _, fin in ordenados]
+
+    def __len__(self) -> int:
+        return len(self._claves)
+
+    def superpuesto(self, inicio: time, fin: time, excluir: Optional[Hashable] = None) -> Optional[Hashable]:
+        """Devuelve la clave de un intervalo que se superpone con [inicio, fin), o None."""
+        idx = bisect_left(self._inicios, fin) - 1
+        if idx >= 0 and self._claves[idx] == excluir:
+            idx -= 1
+        if idx >= 0 and self._fines[idx] > inicio:
+            return self._claves[idx]
+        return None
+
+def superposiciones(intervalos: Iterable[Tuple[Hashable, time, time]]) -> List[Tuple[Hashable, Hashable]]:
+    """
+    Todos los pares de intervalos [inicio, fin) que se superponen entre sí (barrido ordenado,
+    O(n log n + pares)). A diferencia de IndiceIntervalos no asume que sean disjuntos.
+    """
+    ordenados = sorted(intervalos, key=lambda i: (i[1], i[2]))
+    pares = []
+    activos: List[Tuple[Hashable, time]] = []
+    for clave, inicio, fin in ordenados:
+        activos = [(c, f) for c, f in activos if f > inicio]
+        pares.extend((c, clave) for c, _ in activos)
+        activos.append((clave, fin))
+    return pares
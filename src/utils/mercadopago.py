@@ -0,0 +1,84 @@
+from typing import Optional
+
+import httpx
+
+from core.config import settings
+
+class MercadoPagoError(Exception):
+    """Error de la API de Mercado Pago (status_code None si no hubo respuesta)."""
+
+    def __init__(self, mensaje: str, status_code: Optional[int] = None):
+        super().__init__(mensaje)
+        self.status_code = status_code
+
+    @property
+    def reintentable(self) -> bool:
+        # Timeouts, errores de red, rate limit y errores del lado de MP
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+class MercadoPagoClient:
+    """
+    Cliente asíncrono de la API REST de Mercado Pago compartido por todo el proceso.
+
+    Reemplaza al mercadopago.SDK (bloqueante y creado de nuevo en cada llamada): un solo
+    httpx.AsyncClient con conexiones keep-alive reutilizadas y un límite de conexiones
+    simultáneas. La cuenta ('administrador' o 'empleado') solo decide el token.
+    Con MP_API_URL se puede apuntar a un servidor falso local (scripts/fake_mercadopago.py).
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url or settings.MP_API_URL
+        self._http: Optional[httpx.AsyncClient] = None
+
+    def _cliente(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=settings.MP_HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=settings.MP_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.MP_HTTP_MAX_CONNECTIONS
+                )
+            )
+        return self._http
+
+    @staticmethod
+    def _token(cuenta: str) -> str:
+        if cuenta == "empleado":
+            return settings.MP_ACCESS_TOKEN_EMP.get_secret_value()
+        # Por defecto usamos la cuenta del administrador
+        return settings.MP_ACCESS_TOKEN_ADM.get_secret_value()
+
+    async def _request(self, metodo: str, ruta: str, cuenta: str, **kwargs) -> dict:
+        headers = {"Authorization": f"Bearer {self._token(cuenta)}"}
+        try:
+            respuesta = await self._cliente().request(metodo, ruta, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            raise MercadoPagoError(f"{metodo} {ruta}: {e!r}")
+
+        if respuesta.status_code >= 400:
+            raise MercadoPagoError(f"{metodo} {ruta}: {respuesta.status_code} {respuesta.text[:300]}", respuesta.status_code)
+
+        # Un 2xx con un cuerpo que no es un objeto JSON (p. ej. la página de error de un proxy)
+        # se trata como falla de red: sin status_code, así se reintenta
+        try:
+            datos = respuesta.json()
+        except ValueError:
+            datos = None
+        if not isinstance(datos, dict):
+            raise MercadoPagoError(f"{metodo} {ruta}: respuesta inesperada {respuesta.text[:300]!r}")
+        return datos
+
+    async def obtener_pago(self, cuenta: str, payment_id: str) -> dict:
+        return await self._request("GET", f"/v1/payments/{payment_id}", cuenta)
+
+    async def crear_preferencia(self, cuenta: str, preferencia: dict) -> dict:
+        return await self._request("POST", "/checkout/preferences", cuenta, json=preferencia)
+
+    async def close(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+# Instancia global (una por proceso)
+mp_client = MercadoPagoClient()
@@ -0,0 +1,85 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from core.config import settings
+from utils.exceptions import ServiceUnavailableException
+
+# ==========================================
+# GENERACIÓN DE PDFs EN UN POOL DE PROCESOS
+# ==========================================
+# reportlab es Python puro y no libera el GIL: un reporte grande en un hilo igual frena al
+# event loop. Las plantillas (utils/pdf_plantillas.py) corren en procesos aparte y reciben
+# datos planos. Como en el hashing de contraseñas, un semáforo acota lo que puede estar en
+# curso o en cola: pasado PDF_QUEUE_TIMEOUT esperando lugar se responde 503.
+_pdf_executor: Optional[ProcessPoolExecutor] = None
+_pdf_slots = asyncio.Semaphore(settings.PDF_MAX_PENDING)
+
+def _executor() -> ProcessPoolExecutor:
+    global _pdf_executor
+    if _pdf_executor is None:
+        # spawn: no hereda el event loop ni los hilos del proceso de uvicorn
+        _pdf_executor = ProcessPoolExecutor(
+            max_workers=settings.PDF_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pdf_executor
+
+async def renderizar_pdf(plantilla: Callable[[dict], bytes], datos: dict) -> bytes:
+    """
+    Ejecuta `plantilla(datos)` en el pool de procesos y devuelve los bytes del PDF.
+    `plantilla` debe ser una función de módulo (se envía por nombre) y `datos` algo serializable.
+    """
+    try:
+        await asyncio.wait_for(_pdf_slots.acquire(), timeout=settings.PDF_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ServiceUnavailableException("Hay demasiados PDFs generándose, intente nuevamente")
+
+    loop = asyncio.get_running_loop()
+    executor = _executor()
+    try:
+        futuro = executor.submit(plantilla, datos)
+    except BrokenProcessPool:
+        _pdf_slots.release()
+        _descartar_executor(executor)
+        raise ServiceUnavailableException("El generador de PDFs se reinició, intente nuevamente")
+    except BaseException:
+        _pdf_slots.release()
+        raise
+
+    # El lugar se libera cuando el proceso termina, no cuando se rinde el request: así
+    # PDF_MAX_PENDING acota también los trabajos que siguen corriendo tras un timeout
+    futuro.add_done_callback(lambda _: _liberar_lugar(loop))
+
+    try:
+        # El proceso no se puede interrumpir: al vencer el timeout se libera el request,
+        # el trabajo termina por su cuenta y su resultado se descarta
+        return await asyncio.wait_for(asyncio.wrap_future(futuro), timeout=settings.PDF_RENDER_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ServiceUnavailableException("La generación del PDF tardó demasiado, intente nuevamente")
+    except BrokenProcessPool:
+        # Murió un proceso del pool (ej. OOM): se recrea en la próxima llamada
+        _descartar_executor(executor)
+        raise ServiceUnavailableException("El generador de PDFs se reinició, intente nuevamente")
+
+def _liberar_lugar(loop: asyncio.AbstractEventLoop) -> None:
+    # Corre en un hilo del executor: el semáforo de asyncio solo se toca desde su loop
+    try:
+        loop.call_soon_threadsafe(_pdf_slots.release)
+    except RuntimeError:
+        pass  # El loop ya cerró (apagado)
+
+def _descartar_executor(executor: ProcessPoolExecutor) -> None:
+    """Apaga un pool roto, salvo que otro request ya lo haya reemplazado por uno sano."""
+    global _pdf_executor
+    executor.shutdown(wait=False, cancel_futures=True)
+    if _pdf_executor is executor:
+        _pdf_executor = None
+
+def shutdown_pdf_executor(wait: bool = True) -> None:
+    global _pdf_executor
+    if _pdf_executor is not None:
+        _pdf_executor.shutdown(wait=wait, cancel_futures=True)
+        _pdf_executor = None
@@ -0,0 +1,254 @@
+"""
+Plantillas reportlab de los PDFs de la aplicación.
+
+Son funciones puras: reciben datos planos (dicts con str, números, date/time) y devuelven
+los bytes del PDF. No importan nada de la app (settings, asyncpg, schemas) para que los
+procesos de utils/pdf.py las carguen rápido y los datos viajen serializados sin problemas.
+"""
+from datetime import date
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.pdfgen import canvas
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+def comprobante_pago(row: dict) -> bytes:
+    """
+    Comprobante de pago con diseño premium y marca de seguridad.
+    Todo lo impreso sale de `row`, así el mismo pago produce siempre el mismo comprobante.
+    """
+    id_cuota = row['idCuota']
+
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    # METADATOS VITALES:
+    c.setTitle(f"Comprobante de Pago - {row['nombre']} {row['apellido']}")
+    c.setAuthor("Gimnasio Abito")
+    c.setSubject(f"Cuota ID: {id_cuota}")
+    width, height = A4
+
+    # --- 1. MARCA DE AGUA (GRANDE Y DISTRIBUIDA) ---
+    c.saveState()
+    c.setFillColorRGB(0.96, 0.96, 0.96) 
+    c.setFont("Helvetica-Bold", 110) 
+    c.translate(width/2, height/2)
+    c.rotate(35)
+    
+    for x in range(-3, 4):
+        for y in range(-5, 6):
+            c.drawCentredString(x*700, y*280, "GYM ABITO")
+    c.restoreState()
+
+    # --- 2. ENCABEZADO ---
+    c.setFillColorRGB(0.89, 0.04, 0.08) # Rojo Abito
+    c.rect(0, height - 4*cm, 1.2*cm, 3*cm, fill=1, stroke=0)
+    
+    c.setFillColorRGB(0.1, 0.1, 0.1)
+    c.setFont("Helvetica-Bold", 26)
+    c.drawString(2*cm, height - 2.5*cm, "GIMNASIO")
+    
+    c.setFillColorRGB(0.89, 0.04, 0.08)
+    c.drawString(7.2*cm, height - 2.5*cm, "ABITO") 
+    
+    c.setFont("Helvetica", 11)
+    c.setFillColorRGB(0.4, 0.4, 0.4)
+    c.drawString(2*cm, height - 3.2*cm, "COMPROBANTE DE PAGO") 
+    
+    c.setFont("Helvetica", 10)
+    # Fecha de emisión = fecha de pago (no la de descarga): el comprobante no cambia con los días
+    emitido = row['fechaDePago'] or date.today()
+    c.drawRightString(width - 2*cm, height - 2.5*cm, f"Emitido: {emitido.strftime('%d/%m/%Y')}")
+
+    # --- 3. TARJETA DE INFORMACIÓN DEL ALUMNO ---
+    c.setStrokeColorRGB(0.9, 0.9, 0.9)
+    c.setFillColorRGB(0.98, 0.98, 0.98)
+    c.roundRect(1.8*cm, height - 7.5*cm, width - 3.6*cm, 3*cm, 15, stroke=1, fill=1)
+    
+    c.setFillColorRGB(0.2, 0.2, 0.2)
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(2.5*cm, height - 5.5*cm, "TITULAR DEL PAGO")
+    
+    c.setFont("Helvetica", 11)
+    c.drawString(2.5*cm, height - 6.2*cm, f"{row['nombre'].upper()} {row['apellido'].upper()}")
+    c.setFont("Helvetica", 10)
+    c.setFillColorRGB(0.5, 0.5, 0.5)
+    c.drawString(2.5*cm, height - 6.8*cm, f"DNI: {row['dni']}  |  {row['email']}")
+
+    # --- 4. DETALLES DE TRANSACCIÓN ---
+    y_detalle = height - 9.5*cm
+    c.setFillColorRGB(0.1, 0.1, 0.1)
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(2*cm, y_detalle, "DETALLE DE TRANSACCIÓN")
+    
+    c.setStrokeColorRGB(0.89, 0.04, 0.08)
+    c.setLineWidth(2)
+    c.line(2*cm, y_detalle - 0.2*cm, 4*cm, y_detalle - 0.2*cm)
+
+    fecha_p = row['fechaDePago'].strftime('%d/%m/%Y') if row['fechaDePago'] else "-"
+    hora_p = row['horaDePago'].strftime('%H:%M') if row['horaDePago'] else "-"
+
+    c.setLineWidth(1)
+    c.setStrokeColorRGB(0.92, 0.92, 0.92)
+    y_pos = y_detalle - 1.5*cm
+    
+    items = [
+        ("SERVICIO", f"{row['nombreTrabajo']} - {row['nombreSuscripcion']}"),
+        ("PERIODO", f"Cuota de {row['mes']}"),
+        ("FECHA DE PAGO", f"{fecha_p} a las {hora_p} hs"),
+        ("MÉTODO DE PAGO", row['metodoDePago'].upper() if row['metodoDePago'] else "TRANSFERENCIA / QR"),
+        ("ID TRANSACCIÓN", f"#{row['idCuota']}")
+    ]
+
+    for label, val in items:
+        c.setFont("Helvetica-Bold", 9)
+        c.setFillColorRGB(0.5, 0.5, 0.5)
+        c.drawString(2.5*cm, y_pos, label)
+        c.setFont("Helvetica", 11)
+        c.setFillColorRGB(0.15, 0.15, 0.15)
+        c.drawRightString(width - 2.5*cm, y_pos, str(val))
+        c.line(2.5*cm, y_pos - 0.3*cm, width - 2.5*cm, y_pos - 0.3*cm)
+        y_pos -= 1*cm
+
+    # --- 5. TOTAL (AJUSTE FINAL DE POSICIÓN) ---
+    y_total = y_pos - 1.0*cm
+    c.setStrokeColorRGB(0.89, 0.04, 0.08)
+    c.setLineWidth(2.5)
+    
+    # La línea ahora es más larga para dar soporte visual a ambos textos separados
+    c.line(2.5*cm, y_total + 1.2*cm, width - 2*cm, y_total + 1.2*cm)
+    
+    # ETIQUETA: Alineada a la IZQUIERDA (2.5cm)
+    c.setFillColorRGB(0.1, 0.1, 0.1)
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(2.5*cm, y_total + 0.4*cm, "TOTAL ABONADO") 
+    
+    # MONTO: Alineado a la DERECHA (width - 2.2cm)
+    c.setFillColorRGB(0.89, 0.04, 0.08)
+    c.setFont("Helvetica-Bold", 24)
+    c.drawRightString(width - 2.2*cm, y_total + 0.4*cm, f"$ {row['monto']:,.2f}") 
+
+    # --- 6. PIE DE PÁGINA ---
+    c.setFillColorRGB(0.5, 0.5, 0.5)
+    c.setFont("Helvetica-Oblique", 8)
+    hash_seguridad = f"AUTH-{row['idCuota']}Z{row['dni'][-4:]}"
+    c.drawCentredString(width/2, 2*cm, f"Código de autenticación: {hash_seguridad}")
+    c.drawCentredString(width/2, 1.5*cm, "Gimnasio Abito - Las Breñas, Chaco")
+
+    c.save()
+    return buffer.getvalue()
+
+def reporte_facturacion(reporte: dict) -> bytes:
+    """
+    Reporte de facturación con diseño técnico minimalista (ReporteFacturacion.model_dump()).
+    Retorna los bytes del PDF con metadatos de título corregidos.
+    """
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, 
+        pagesize=A4,
+        rightMargin=1.5*cm, leftMargin=1.5*cm, 
+        topMargin=1.5*cm, bottomMargin=1.5*cm
+    )
+    
+    # Formateamos las fechas para el título interno
+    f_inicio = reporte['fechaInicio'].strftime("%d/%m/%Y")
+    f_fin = reporte['fechaFin'].strftime("%d/%m/%Y")
+    titulo_metadato = f"ReporteFacturacion ({f_inicio} - {f_fin})"
+
+    # --- Función interna para fijar el título en el canvas ---
+    def fijar_metadatos(canvas, doc):
+        canvas.setTitle(titulo_metadato)
+        canvas.setAuthor("Gimnasio Abito")
+
+    elements = []
+    styles = getSampleStyleSheet()
+
+    # --- 1. Encabezado Minimalista ---
+    title_style = ParagraphStyle(
+        'TechnicalTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        leading=20,
+        alignment=1, # Center
+        spaceAfter=10,
+        fontName='Helvetica-Bold'
+    )
+    
+    elements.append(Paragraph(f"REPORTE DE FACTURACIÓN #{reporte['idFacturacion']}", title_style))
+    elements.append(Spacer(1, 0.5*cm))
+
+    # --- 2. Información General ---
+    info_data = [
+        [f"TITULAR: {reporte['titular'].upper()}", ""],
+        [f"PERIODO: {f_inicio} - {f_fin}", f"TOTAL CUOTAS: {reporte['cantidadCuotas']}"],
+        [f"MONTO TOTAL :", f"$ {reporte['montoTotal']:,.2f}"]
+    ]
+
+    t_info = Table(info_data, colWidths=[10*cm, 8*cm])
+    t_info.setStyle(TableStyle([
+        ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+        ('FONTSIZE', (0,0), (-1,-1), 10),
+        ('FONTNAME', (0,2), (0,2), 'Helvetica-Bold'),
+        ('FONTNAME', (1,2), (1,2), 'Helvetica-Bold'),
+        ('TEXTCOLOR', (0,0), (-1,-1), colors.darkgray),
+        ('BOTTOMPADDING', (0,0), (-1,-1), 6),
+    ]))
+    elements.append(t_info)
+    elements.append(Spacer(1, 1*cm))
+
+    # --- 3. Tabla de Detalles ---
+    headers = ["FECHA", "HORA", "CONCEPTO", "MÉTODO", "MONTO"]
+    data_tabla = [headers]
+    
+    for det in reporte['detalles']:
+        fecha_fmt = det['fechaPago'].strftime("%d/%m/%Y") if det['fechaPago'] else "-"
+        
+        hora_fmt = "-"
+        if det.get('horaDePago'):
+            try:
+                hora_fmt = det['horaDePago'].strftime("%H:%M:%S")
+            except AttributeError:
+                hora_fmt = str(det['horaDePago'])
+        
+        row = [
+            fecha_fmt,
+            hora_fmt,
+            det['concepto'][:35],
+            det['metodoDePago'].upper() if det['metodoDePago'] else "-",
+            f"$ {det['monto']:,.0f}"
+        ]
+        data_tabla.append(row)
+
+    col_widths = [3*cm, 2.5*cm, 7.5*cm, 2.5*cm, 2.5*cm]
+    t_detalles = Table(data_tabla, colWidths=col_widths)
+
+    style_tabla = TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.Color(0.9, 0.9, 0.9)),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.black),
+        ('ALIGN', (0,0), (-1,0), 'CENTER'),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0,0), (-1,0), 8),
+        ('BOTTOMPADDING', (0,0), (-1,0), 8),
+        ('TOPPADDING', (0,0), (-1,0), 8),
+        ('FONTNAME', (0,1), (-1,-1), 'Helvetica'),
+        ('FONTSIZE', (0,1), (-1,-1), 8),
+        ('ALIGN', (0,1), (-1,-1), 'CENTER'),
+        ('ALIGN', (2,1), (2,-1), 'LEFT'),
+        ('ALIGN', (-1,1), (-1,-1), 'RIGHT'),
+        ('LINEBELOW', (0,0), (-1,0), 1, colors.black),
+        ('LINEBELOW', (0,1), (-1,-1), 0.5, colors.lightgrey),
+    ])
+    
+    t_detalles.setStyle(style_tabla)
+    elements.append(t_detalles)
+
+    # --- CAMBIO CLAVE ---
+    # Pasamos la función fijar_metadatos a onFirstPage
+    doc.build(elements, onFirstPage=fijar_metadatos)
+    
+    pdf = buffer.getvalue()
+    buffer.close()
+    return pdf
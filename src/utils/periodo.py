@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+from dateutil.relativedelta import relativedelta
+
+@dataclass(frozen=True)
+class Periodo:
+    """
+    Rango de fechas semiabierto [inicio, fin).
+
+    Las consultas filtran con `col >= inicio AND col < fin` en lugar de
+    `EXTRACT(MONTH/YEAR FROM col) = ...`, así Postgres puede usar los índices
+    sobre la columna de fecha (ver scripts/migrations/003_cuota_indices_periodo.sql).
+    """
+    inicio: date
+    fin: date
+
+    @classmethod
+    def mensual(cls, mes: Optional[int] = None, anio: Optional[int] = None) -> "Periodo":
+        """Mes calendario pedido; si falta mes o año se toma el del día de hoy."""
+        hoy = date.today()
+        inicio = date(hoy.year if anio is None else anio, hoy.month if mes is None else mes, 1)
+        return cls(inicio, inicio + relativedelta(months=1))
+
+    @classmethod
+    def ultimos_meses(cls, cantidad: int, hasta: Optional[date] = None) -> "Periodo":
+        """Los últimos `cantidad` meses calendario, incluyendo el mes de `hasta` (hoy por defecto)."""
+        hasta = hasta or date.today()
+        actual = cls.mensual(hasta.month, hasta.year)
+        return cls(actual.inicio - relativedelta(months=cantidad - 1), actual.fin)
+
+    @classmethod
+    def quincena_cerrada(cls, hoy: Optional[date] = None) -> "Periodo":
+        """
+        Última quincena ya terminada a la fecha `hoy` (que no cuenta como terminada): desde el
+        día 16 es la primera del mes actual (1 al 15); antes, la segunda del mes anterior.
+        """
+        hoy = hoy or date.today()
+        mes = date(hoy.year, hoy.month, 1)
+        if hoy.day >= 16:
+            return cls(mes, mes.replace(day=16))
+        return cls((mes - relativedelta(months=1)).replace(day=16), mes)
+
+    @property
+    def mes(self) -> int:
+        return self.inicio.month
+
+    @property
+    def anio(self) -> int:
+        return self.inicio.year
+
+    def __iter__(self):
+        # Permite `inicio, fin = periodo` y `conn.fetch(query, *periodo)`
+        yield self.inicio
+        yield self.fin
@@ -1,10 +1,13 @@
+import asyncio
 import secrets
 import string
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from core.config import settings
+from utils.exceptions import ServiceUnavailableException
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -16,6 +19,43 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# ==========================================
+# HASHING ASÍNCRONO (POOL ACOTADO)
+# ==========================================
+# bcrypt tarda ~200-300 ms por llamada y libera el GIL, así que lo corremos en un pool
+# de hilos dedicado. El semáforo limita cuántas operaciones pueden estar en curso o en
+# cola: si hay una ráfaga de logins, las que excedan el límite esperan hasta
+# PASSWORD_HASH_QUEUE_TIMEOUT y luego se rechazan con 503 en lugar de agotar el pool.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="bcrypt"
+)
+_hash_slots = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_PENDING)
+
+async def _run_in_hash_pool(func, *args):
+    try:
+        await asyncio.wait_for(_hash_slots.acquire(), timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ServiceUnavailableException("Demasiados intentos de autenticación simultáneos, intente nuevamente")
+
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_slots.release()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Versión no bloqueante de verify_password para usar dentro de handlers async."""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Versión no bloqueante de get_password_hash para usar dentro de handlers async."""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+def shutdown_hash_executor() -> None:
+    _hash_executor.shutdown(wait=True, cancel_futures=True)
+
+
 def create_registration_token(data: dict) -> str:
     """Crea un token JWT de corta duración para el proceso de registro."""
     to_encode = data.copy()
@@ -4,19 +4,48 @@ from typing import Optional
 
 import uuid
 
+from core.consultas import registrar
+
+# Consultas de autenticación: se hacen en cada login / validación de token
+CONSULTA_PERSONA_POR_EMAIL = registrar("persona_por_email", 'SELECT * FROM "Persona" WHERE email = $1')
+CONSULTA_PERSONA_POR_USUARIO = registrar("persona_por_usuario", 'SELECT * FROM "Persona" WHERE usuario = $1')
+CONSULTA_PERSONA_POR_DNI = registrar("persona_por_dni", 'SELECT * FROM "Persona" WHERE dni = $1')
+CONSULTA_PRINCIPAL = registrar("principal_por_usuario", '''
+    SELECT
+        p.*,
+        EXISTS (SELECT 1 FROM "Empleado" e WHERE e.dni = p.dni) AS "esEmpleado",
+        EXISTS (SELECT 1 FROM "Alumno" a WHERE a.dni = p.dni) AS "esAlumno",
+        EXISTS (SELECT 1 FROM "AlumnoActivo" aa WHERE aa.dni = p.dni) AS "esAlumnoActivo",
+        EXISTS (SELECT 1 FROM "AlumnoInactivo" ai WHERE ai.dni = p.dni) AS "esAlumnoInactivo"
+    FROM "Persona" p
+    WHERE p.usuario = $1
+''')
+
 # ==============================
 # Funciones para authServices.py
 # ==============================
 async def get_user_by_email(conn: Connection, email: str) -> Optional[dict]:
-    result = await conn.fetchrow('SELECT * FROM "Persona" WHERE email = $1', email)
+    result = await CONSULTA_PERSONA_POR_EMAIL.fetchrow(conn, email)
     return dict(result) if result else None
 
 async def get_user_by_username(conn: Connection, username: str) -> Optional[dict]:
-    result = await conn.fetchrow('SELECT * FROM "Persona" WHERE usuario = $1', username)
+    result = await CONSULTA_PERSONA_POR_USUARIO.fetchrow(conn, username)
     return dict(result) if result else None
 
+async def get_principal_by_username(conn: Connection, username: str) -> Optional[dict]:
+    """
+    Obtiene la Persona junto con todos sus flags de rol en una sola consulta.
+    Es lo que usan las dependencias de seguridad para no consultar cada tabla de rol por separado.
+    """
+    result = await CONSULTA_PRINCIPAL.fetchrow(conn, username)
+    if not result:
+        return None
+    principal = dict(result)
+    principal["esAdmin"] = bool(principal.get("esAdmin"))
+    return principal
+
 async def get_user_by_dni(conn: Connection, dni: str) -> Optional[dict]:
-    result = await conn.fetchrow('SELECT * FROM "Persona" WHERE dni = $1', dni)
+    result = await CONSULTA_PERSONA_POR_DNI.fetchrow(conn, dni)
     return dict(result) if result else None
 
 async def create_email_verification_token(conn: Connection, email: str, token: str) -> None:
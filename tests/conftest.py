@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos de la API se importan desde src/ (igual que al correr uvicorn desde ahí)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,30 @@
+from datetime import date
+
+import pytest
+
+from utils.periodo import Periodo
+
+@pytest.mark.parametrize("hoy, inicio, fin", [
+    # Día 16 en adelante: la primera quincena del mes ya terminó
+    (date(2026, 3, 16), date(2026, 3, 1), date(2026, 3, 16)),
+    (date(2026, 3, 31), date(2026, 3, 1), date(2026, 3, 16)),
+    # El día 15 la primera quincena todavía está en curso: toca la segunda del mes anterior
+    (date(2026, 3, 15), date(2026, 2, 16), date(2026, 3, 1)),
+    (date(2026, 3, 1), date(2026, 2, 16), date(2026, 3, 1)),
+    # Cambio de año
+    (date(2026, 1, 1), date(2025, 12, 16), date(2026, 1, 1)),
+])
+def test_quincena_cerrada(hoy, inicio, fin):
+    assert Periodo.quincena_cerrada(hoy) == Periodo(inicio, fin)
+
+def test_quincena_cerrada_no_incluye_hoy():
+    for dia in range(1, 32):
+        hoy = date(2026, 1, dia)
+        assert Periodo.quincena_cerrada(hoy).fin <= hoy
+
+def test_mensual_mes_cero_no_es_el_actual():
+    with pytest.raises(ValueError):
+        Periodo.mensual(0, 2026)
+
+def test_mensual():
+    assert Periodo.mensual(12, 2025) == Periodo(date(2025, 12, 1), date(2026, 1, 1))